@@ -1,6 +1,7 @@
 import express from 'express';
 import pool from '../config/database.js';
 import { authenticate } from '../middleware/auth.js';
+import { invalidateMLFeatures } from '../services/mlFeatureCache.js';
 
 const router = express.Router();
 
@@ -73,6 +74,7 @@ router.put('/profile', authenticate, async (req, res) => {
     const query = `UPDATE user_gamification SET ${updates.join(', ')}, updated_at = CURRENT_TIMESTAMP WHERE user_id = $${paramCount} RETURNING *`;
 
     const result = await pool.query(query, values);
+    invalidateMLFeatures(req.userId);
     res.json(result.rows[0]);
   } catch (error) {
     console.error('Update profile error:', error);
@@ -99,6 +101,7 @@ router.post('/award-points', authenticate, async (req, res) => {
       [points, req.userId]
     );
 
+    invalidateMLFeatures(req.userId);
     res.json(result.rows[0]);
   } catch (error) {
     console.error('Award points error:', error);
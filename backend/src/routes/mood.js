@@ -1,6 +1,7 @@
 import express from 'express';
 import pool from '../config/database.js';
 import { authenticate } from '../middleware/auth.js';
+import { invalidateMLFeatures } from '../services/mlFeatureCache.js';
 
 const router = express.Router();
 
@@ -45,6 +46,7 @@ router.post('/', authenticate, async (req, res) => {
       created_at: result.rows[0].created_at
     });
 
+    invalidateMLFeatures(req.userId);
     res.status(201).json(result.rows[0]);
   } catch (error) {
     console.error('❌ Create mood log error:', error);
@@ -76,6 +78,7 @@ router.put('/:id', authenticate, async (req, res) => {
       return res.status(404).json({ message: 'Mood log not found' });
     }
 
+    invalidateMLFeatures(req.userId);
     res.json(result.rows[0]);
   } catch (error) {
     console.error('Update mood log error:', error);
@@ -97,6 +100,7 @@ router.delete('/:id', authenticate, async (req, res) => {
       return res.status(404).json({ message: 'Mood log not found' });
     }
 
+    invalidateMLFeatures(req.userId);
     res.json({ message: 'Mood log deleted successfully' });
   } catch (error) {
     console.error('Delete mood log error:', error);
@@ -1,6 +1,7 @@
 import express from 'express';
 import pool from '../config/database.js';
 import { authenticate } from '../middleware/auth.js';
+import { invalidateMLFeatures } from '../services/mlFeatureCache.js';
 
 const router = express.Router();
 
@@ -30,6 +31,7 @@ router.post('/sessions', authenticate, async (req, res) => {
       completed_at: result.rows[0].completed_at
     });
 
+    invalidateMLFeatures(req.userId);
     res.status(201).json(result.rows[0]);
   } catch (error) {
     console.error('❌ Save session error:', error);
@@ -0,0 +1,15 @@
+import axios from 'axios';
+
+const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:8001';
+
+/**
+ * Tell the ML service to drop its cached features for a user.
+ * Fire-and-forget: a failure only means predictions stay stale until the cache TTL expires.
+ */
+export function invalidateMLFeatures(userId) {
+  axios
+    .post(`${ML_SERVICE_URL}/ml/features/${userId}/invalidate`, null, { timeout: 2000 })
+    .catch((error) => {
+      console.warn('⚠️ ML feature cache invalidation failed:', error.message);
+    });
+}
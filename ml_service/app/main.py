@@ -6,7 +6,12 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
+# Record per-module import times for the startup report
+from utils.lazy_imports import import_profiler
+import_profiler.start()
+
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional, Dict
@@ -14,7 +19,18 @@ from loguru import logger
 import uvicorn
 
 from config.config import settings
-from app.routers import pomodoro, sentiment, coach, distraction
+from app.routers import pomodoro, sentiment, coach, distraction, features, admin
+from utils.db_pool import close_pool
+from utils.async_data_loaders import close_async_pool
+from inference.sentiment_batcher import close_sentiment_batcher
+from utils.sentiment_cache import save_sentiment_cache
+from inference.model_reloader import get_model_reloader
+from inference.inference_pool import start_inference_pool, close_inference_pool
+from utils.executors import shutdown_executors
+from app.warmup import start_warmup, warmup_state
+from utils.precomputed_coaching import start_precomputed_refresher, stop_precomputed_refresher
+
+import_profiler.stop()
 
 # Configure logging
 logger.remove()
@@ -44,6 +60,36 @@ app.include_router(pomodoro.router, prefix="/ml", tags=["Pomodoro"])
 app.include_router(sentiment.router, prefix="/ml", tags=["Sentiment"])
 app.include_router(coach.router, prefix="/ml", tags=["Coach"])
 app.include_router(distraction.router, prefix="/ml", tags=["Distraction"])
+app.include_router(features.router, prefix="/ml", tags=["Features"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+
+# Keep a reference so the warm-up task is not garbage collected
+_warmup_task = None
+
+@app.on_event("startup")
+async def startup():
+    """Start the inference workers (INFERENCE_WORKERS), the warm-up (ML_EAGER_STARTUP), the model reloader and the precomputed coaching refresher"""
+    global _warmup_task
+    slowest = ", ".join(f"{name} {ms:.0f}ms" for name, ms in import_profiler.slowest(5))
+    logger.info(f"📦 Imports took {import_profiler.total_ms:.0f}ms (slowest: {slowest})")
+    start_inference_pool()
+    _warmup_task = start_warmup()
+    get_model_reloader().start()
+    start_precomputed_refresher()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close database pools and background workers"""
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+    get_model_reloader().stop()
+    stop_precomputed_refresher()
+    await close_async_pool()
+    close_pool()
+    close_sentiment_batcher()
+    close_inference_pool()
+    shutdown_executors()
+    save_sentiment_cache()
 
 @app.get("/")
 async def root():
@@ -66,6 +112,14 @@ async def health():
         "service": "ml-service"
     }
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 until the startup warm-up has finished"""
+    state = warmup_state.to_dict()
+    if not warmup_state.ready:
+        return JSONResponse(status_code=503, content=state)
+    return state
+
 if __name__ == "__main__":
     uvicorn.run(
         app,
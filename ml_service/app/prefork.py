@@ -0,0 +1,189 @@
+import os
+import sys
+
+# Add ml_service root to path
+ml_service_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ml_service_root not in sys.path:
+    sys.path.insert(0, ml_service_root)
+
+import gc
+import random
+import signal
+import time
+from typing import Dict
+from loguru import logger
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from config.config import settings
+
+
+class PreforkServer:
+    """
+    Pre-forking supervisor for multi-core serving.
+
+    The master imports the app and loads the forest models once, closes its
+    DB pool, freezes the GC heap and binds the listening socket; then it
+    forks the workers, which share the model pages copy-on-write and accept
+    on the same socket. Each worker opens its own DB pools on first use (the
+    pools are per process). Workers that exit are replaced, workers can be
+    recycled after a number of requests, SIGHUP recycles all of them one by
+    one and SIGTERM/SIGINT shut everything down gracefully.
+    """
+
+    def __init__(self, app_import: str = "app.main:app", host: str = None, port: int = None, workers: int = None):
+        self.app_import = app_import
+        self.host = host or settings.ML_SERVICE_HOST
+        self.port = port or settings.ML_SERVICE_PORT
+        self.workers = max(1, workers or settings.ML_WORKERS)
+        self.max_requests = settings.ML_WORKER_MAX_REQUESTS
+        self.max_requests_jitter = settings.ML_WORKER_MAX_REQUESTS_JITTER
+
+        self.app = None
+        self.socket = None
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.retiring = set()  # replaced workers that should not be respawned
+        self._stopping = False
+        self._recycle = False
+
+    def preload(self):
+        """Import the app and load the models in the master, before forking"""
+        started = time.perf_counter()
+        self.app = import_from_string(self.app_import)
+
+        from app.routers.pomodoro import get_recommender
+        from app.routers.distraction import get_predictor
+        get_recommender()
+        get_predictor()
+        if settings.ML_PRELOAD_SENTIMENT and settings.INFERENCE_WORKERS <= 0:
+            # With inference workers the model lives in their processes, not in the web workers
+            # Only safe for backends without native thread pools at load time
+            from inference.sentiment_analyzer import SentimentAnalyzer
+            SentimentAnalyzer()._load_model()
+
+        # Connections must never be shared across a fork
+        from utils.db_pool import close_pool
+        close_pool()
+
+        # Move everything loaded so far out of the collector's reach, so GC
+        # passes in the workers do not write to (and un-share) those pages
+        gc.collect()
+        gc.freeze()
+        logger.info(f"✅ Preloaded models in {(time.perf_counter() - started) * 1000:.0f}ms ({gc.get_freeze_count()} objects frozen)")
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+        self._run_worker()
+
+    def _run_worker(self):
+        """Worker process body; never returns"""
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            random.seed()
+
+            max_requests = None
+            if self.max_requests > 0:
+                # Jitter so the workers do not all restart at the same moment
+                max_requests = self.max_requests + random.randint(0, max(0, self.max_requests_jitter))
+            config = uvicorn.Config(
+                self.app,
+                log_level=settings.LOG_LEVEL.lower(),
+                limit_max_requests=max_requests,
+            )
+            uvicorn.Server(config).run(sockets=[self.socket])
+        except BaseException as e:
+            logger.error(f"❌ Worker {os.getpid()} crashed: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_hup(self, signum, frame):
+        self._recycle = True
+
+    def _reap(self):
+        """Collect exited workers and replace them"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self._stopping or pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if code == 0:
+                logger.info(f"🔄 Worker {pid} exited (recycled), starting a new one")
+            else:
+                logger.warning(f"⚠️ Worker {pid} exited with code {code}, starting a new one")
+                if time.monotonic() - started < 1:
+                    time.sleep(1)  # do not spin if workers die on startup
+            self.spawn()
+
+    def _recycle_all(self):
+        """Replace every worker one at a time (new one first, then stop the old)"""
+        self._recycle = False
+        logger.info("🔄 Recycling all workers")
+        for pid in list(self.children):
+            self.spawn()
+            self.retiring.add(pid)
+            self._kill(pid, signal.SIGTERM)
+
+    def _kill(self, pid: int, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            self.children.pop(pid, None)
+
+    def _shutdown(self):
+        logger.info(f"Stopping {len(self.children)} workers...")
+        for pid in list(self.children):
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.ML_WORKER_GRACEFUL_TIMEOUT
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning(f"⚠️ Worker {pid} did not stop in time, killing it")
+            self._kill(pid, signal.SIGKILL)
+        while self.children:
+            self._reap()
+            time.sleep(0.05)
+        self.socket.close()
+
+    def run(self):
+        self.preload()
+        self.socket = uvicorn.Config(self.app, host=self.host, port=self.port).bind_socket()
+        logger.info(f"🚀 Master {os.getpid()} listening on http://{self.host}:{self.port} with {self.workers} workers")
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_hup)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self._stopping:
+            self._reap()
+            if self._recycle:
+                self._recycle_all()
+            time.sleep(0.2)
+        self._shutdown()
+
+
+def run_prefork(workers: int = None, host: str = None, port: int = None):
+    """Serve the app with preforked workers sharing the master's models"""
+    PreforkServer(host=host, port=port, workers=workers).run()
@@ -0,0 +1,89 @@
+import os
+import sys
+
+# Add ml_service root to path
+ml_service_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ml_service_root not in sys.path:
+    sys.path.insert(0, ml_service_root)
+
+import asyncio
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+from loguru import logger
+
+from config.config import settings
+from inference.model_reloader import get_model_reloader
+from inference.inference_pool import get_inference_pool
+from utils.executors import executor_stats
+from inference.llm_gateway import get_llm_gateway
+from utils.response_cache import response_cache
+from utils.precomputed_coaching import precomputed_stats
+from utils.lazy_imports import import_profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Check X-Admin-Token when ADMIN_TOKEN is configured"""
+    if settings.ADMIN_TOKEN and not secrets.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/reload-models")
+async def reload_models(model: Optional[str] = None, force: bool = False):
+    """
+    Load the current registered version of the models and swap it in
+
+    - **model**: Only reload this model (pomodoro_recommender, distraction_predictor)
+    - **force**: Reload even if the loaded version is already the current one
+
+    The new model is loaded and smoke-tested in a worker thread; serving
+    continues on the old model until the swap.
+    """
+    reloader = get_model_reloader()
+    if model is not None and model not in reloader.targets:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model}'")
+
+    try:
+        results = await asyncio.to_thread(reloader.reload, model, force)
+        return {"results": results}
+    except Exception as e:
+        logger.error(f"Error reloading models: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/models")
+async def model_status():
+    """Loaded vs registered version of each model, with the last reload result"""
+    return {"models": await asyncio.to_thread(get_model_reloader().status)}
+
+@router.get("/import-times")
+async def import_times(limit: int = 25):
+    """Slowest module imports of this worker's startup (ms, inclusive of nested imports)"""
+    return import_profiler.report(limit)
+
+@router.get("/inference-pool")
+async def inference_pool_status():
+    """Worker and slot usage of this process's inference pool"""
+    pool = get_inference_pool()
+    return {"enabled": pool is not None, **(pool.stats() if pool else {})}
+
+@router.get("/executors")
+async def executors_status():
+    """Threads, queue depth, waits and rejections of the db, cpu and llm executors"""
+    return {"executors": executor_stats()}
+
+@router.get("/llm")
+async def llm_status():
+    """LLM providers in use with call, error, timeout and hedging counts"""
+    return get_llm_gateway().stats()
+
+@router.get("/llm/response-cache")
+async def llm_response_cache_status():
+    """Hits, misses and fills of the feature-bucketed LLM response cache"""
+    return {"enabled": settings.LLM_RESPONSE_CACHE_ENABLED, **response_cache.stats()}
+
+@router.get("/coaching/precomputed")
+async def precomputed_coaching_status():
+    """Answers stored by jobs/precompute_coaching.py and how often this worker served them"""
+    return precomputed_stats()
@@ -6,7 +6,9 @@ ml_service_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspat
 if ml_service_root not in sys.path:
     sys.path.insert(0, ml_service_root)
 
+import json
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict
 from loguru import logger
@@ -46,7 +48,7 @@ async def get_coaching(request: CoachRequest):
         logger.info(f"Coaching requested for user {request.user_id}")
         
         coach_service = get_coach()
-        result = coach_service.get_coaching(request.user_id, request.context)
+        result = await coach_service.get_coaching_async(request.user_id, request.context)
         
         return CoachResponse(
             message=result["message"],
@@ -57,3 +59,37 @@ async def get_coaching(request: CoachRequest):
         logger.error(f"Error in coaching service: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating coaching: {str(e)}")
 
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/coach/stream")
+async def stream_coaching(user_id: int, message: Optional[str] = None):
+    """
+    Stream AI coaching as Server-Sent Events
+    
+    - **user_id**: User ID to get coaching for
+    - **message**: Optional question or message from the user
+    
+    Sends `token` events ({"text"}) as the LLM produces them, then one `done`
+    event with the full message and suggested action. The rule-based coach
+    sends its answer as a single `token` event.
+    """
+    logger.info(f"Streaming coaching requested for user {user_id}")
+    coach_service = get_coach()
+    context = {"user_message": message} if message else None
+    
+    async def events():
+        try:
+            async for event, data in coach_service.stream_coaching(user_id, context):
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Error in coaching stream: {e}")
+            yield _sse("error", {"detail": f"Error generating coaching: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -8,9 +8,14 @@ if ml_service_root not in sys.path:
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
+from typing import List
 from loguru import logger
 
+from config.config import settings
 from inference.distraction_predictor import DistractionPredictor
+from inference.model_reloader import get_model_reloader
+from inference.inference_pool import InferencePoolBusy
+from utils.executors import ExecutorBusy
 
 router = APIRouter()
 
@@ -23,6 +28,13 @@ def get_predictor():
         predictor = DistractionPredictor()
     return predictor
 
+def swap_predictor(new_predictor: DistractionPredictor):
+    """Install a reloaded predictor; requests already holding the old one finish on it"""
+    global predictor
+    predictor = new_predictor
+
+get_model_reloader().register("distraction_predictor", DistractionPredictor, lambda: predictor, swap_predictor)
+
 class DistractionRequest(BaseModel):
     user_id: int = Field(..., description="User ID", example=1)
     session_duration: int = Field(25, description="Planned session duration in minutes", example=25)
@@ -31,6 +43,15 @@ class DistractionResponse(BaseModel):
     distraction_probability: float = Field(..., description="Probability of distraction (0-1)", example=0.35)
     top_trigger: str = Field(..., description="Top distraction trigger", example="high_task_load")
 
+class DistractionBatchRequest(BaseModel):
+    items: List[DistractionRequest] = Field(..., description="User sessions to score")
+
+class DistractionBatchItem(DistractionResponse):
+    user_id: int = Field(..., description="User ID", example=1)
+
+class DistractionBatchResponse(BaseModel):
+    results: List[DistractionBatchItem]
+
 @router.post("/distraction-predict", response_model=DistractionResponse)
 async def predict_distraction(request: DistractionRequest):
     """
@@ -45,14 +66,46 @@ async def predict_distraction(request: DistractionRequest):
         logger.info(f"Distraction prediction requested for user {request.user_id}")
         
         predictor = get_predictor()
-        result = predictor.predict(request.user_id, request.session_duration)
+        result = await predictor.predict_async(request.user_id, request.session_duration)
         
         return DistractionResponse(
             distraction_probability=result["distraction_probability"],
             top_trigger=result["top_trigger"]
         )
         
+    except (InferencePoolBusy, ExecutorBusy) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error in distraction prediction: {e}")
         raise HTTPException(status_code=500, detail=f"Error predicting distraction: {str(e)}")
 
+@router.post("/distraction-predict/batch", response_model=DistractionBatchResponse)
+async def predict_distraction_batch(request: DistractionBatchRequest):
+    """
+    Predict distraction probability for many user sessions in one call
+    
+    Features are loaded with a single bulk query and predict_proba runs once
+    on the whole feature matrix. Results are returned in request order.
+    """
+    if len(request.items) > settings.ML_MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {settings.ML_MAX_BATCH_SIZE} items)")
+    
+    try:
+        logger.info(f"Batch distraction prediction requested for {len(request.items)} users")
+        
+        predictor = get_predictor()
+        results = await predictor.predict_batch_async(
+            [item.user_id for item in request.items],
+            [item.session_duration for item in request.items]
+        )
+        
+        return DistractionBatchResponse(results=[
+            DistractionBatchItem(user_id=item.user_id, **result)
+            for item, result in zip(request.items, results)
+        ])
+        
+    except (InferencePoolBusy, ExecutorBusy) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error in batch distraction prediction: {e}")
+        raise HTTPException(status_code=500, detail=f"Error predicting distraction: {str(e)}")
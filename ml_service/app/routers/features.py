@@ -0,0 +1,36 @@
+import os
+import sys
+
+# Add ml_service root to path
+ml_service_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ml_service_root not in sys.path:
+    sys.path.insert(0, ml_service_root)
+
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+from loguru import logger
+
+from utils.feature_cache import feature_cache, invalidate_features
+
+router = APIRouter()
+
+class InvalidateResponse(BaseModel):
+    user_id: int = Field(..., description="User ID", example=1)
+    invalidated: bool = Field(..., description="Whether cached features were dropped", example=True)
+
+@router.post("/features/{user_id}/invalidate", response_model=InvalidateResponse)
+async def invalidate_user_features(user_id: int):
+    """
+    Drop the cached inference features of a user
+    
+    Called by the backend after it writes a timer session, task or mood log
+    so the next prediction sees the new data.
+    """
+    invalidated = invalidate_features(user_id)
+    logger.debug(f"Feature cache invalidated for user {user_id} (was cached: {invalidated})")
+    return InvalidateResponse(user_id=user_id, invalidated=invalidated)
+
+@router.get("/features/cache-stats")
+async def feature_cache_stats():
+    """Hit/miss counters and occupancy of the per-user feature cache"""
+    return feature_cache.stats()
@@ -8,10 +8,14 @@ if ml_service_root not in sys.path:
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from loguru import logger
 
+from config.config import settings
 from inference.pomodoro_recommender import PomodoroRecommender
+from inference.model_reloader import get_model_reloader
+from inference.inference_pool import InferencePoolBusy
+from utils.executors import ExecutorBusy
 
 router = APIRouter()
 
@@ -24,6 +28,13 @@ def get_recommender():
         recommender = PomodoroRecommender()
     return recommender
 
+def swap_recommender(new_recommender: PomodoroRecommender):
+    """Install a reloaded recommender; requests already holding the old one finish on it"""
+    global recommender
+    recommender = new_recommender
+
+get_model_reloader().register("pomodoro_recommender", PomodoroRecommender, lambda: recommender, swap_recommender)
+
 class PomodoroRequest(BaseModel):
     user_id: int = Field(..., description="User ID", example=1)
     task_priority: Optional[str] = Field("medium", description="Task priority: low, medium, high", example="high")
@@ -34,6 +45,15 @@ class PomodoroResponse(BaseModel):
     confidence: float = Field(..., description="Confidence score (0-1)", example=0.85)
     explanation: str = Field(..., description="Human-readable explanation", example="Recommended based on your activity pattern")
 
+class PomodoroBatchRequest(BaseModel):
+    items: List[PomodoroRequest] = Field(..., description="Users to get recommendations for")
+
+class PomodoroBatchItem(PomodoroResponse):
+    user_id: int = Field(..., description="User ID", example=1)
+
+class PomodoroBatchResponse(BaseModel):
+    results: List[PomodoroBatchItem]
+
 @router.post("/recommend-pomodoro", response_model=PomodoroResponse)
 async def recommend_pomodoro(request: PomodoroRequest):
     """
@@ -48,7 +68,7 @@ async def recommend_pomodoro(request: PomodoroRequest):
         logger.info(f"Pomodoro recommendation requested for user {request.user_id}")
         
         recommender = get_recommender()
-        result = recommender.recommend(request.user_id, request.task_priority)
+        result = await recommender.recommend_async(request.user_id, request.task_priority)
         
         return PomodoroResponse(
             focus_minutes=result["focus_minutes"],
@@ -57,7 +77,39 @@ async def recommend_pomodoro(request: PomodoroRequest):
             explanation=result["explanation"]
         )
         
+    except (InferencePoolBusy, ExecutorBusy) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error in pomodoro recommendation: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating recommendation: {str(e)}")
 
+@router.post("/recommend-pomodoro/batch", response_model=PomodoroBatchResponse)
+async def recommend_pomodoro_batch(request: PomodoroBatchRequest):
+    """
+    Get Pomodoro recommendations for many users in one call
+    
+    Features are loaded with a single bulk query and the model runs once on
+    the whole feature matrix. Results are returned in request order.
+    """
+    if len(request.items) > settings.ML_MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {settings.ML_MAX_BATCH_SIZE} items)")
+    
+    try:
+        logger.info(f"Batch Pomodoro recommendation requested for {len(request.items)} users")
+        
+        recommender = get_recommender()
+        results = await recommender.recommend_batch_async(
+            [item.user_id for item in request.items],
+            [item.task_priority for item in request.items]
+        )
+        
+        return PomodoroBatchResponse(results=[
+            PomodoroBatchItem(user_id=item.user_id, **result)
+            for item, result in zip(request.items, results)
+        ])
+        
+    except (InferencePoolBusy, ExecutorBusy) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error in batch pomodoro recommendation: {e}")
+        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
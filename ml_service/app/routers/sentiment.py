@@ -11,20 +11,14 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from loguru import logger
 
-from inference.sentiment_analyzer import SentimentAnalyzer
+from inference.sentiment_batcher import analyze_sentiment_async, get_sentiment_batcher
 from inference.mood_suggestions import MoodSuggestionsService
+from inference.inference_pool import InferencePoolBusy
+from utils.sentiment_cache import sentiment_cache
+from utils.executors import ExecutorBusy
 
 router = APIRouter()
 
-# Initialize analyzer (singleton)
-analyzer = None
-
-def get_analyzer():
-    global analyzer
-    if analyzer is None:
-        analyzer = SentimentAnalyzer()
-    return analyzer
-
 # Initialize mood suggestions service (singleton)
 mood_suggestions_service = None
 
@@ -65,14 +59,16 @@ async def analyze_sentiment(request: SentimentRequest):
     try:
         logger.info(f"Sentiment analysis requested for text: {request.text[:50]}...")
         
-        analyzer = get_analyzer()
-        result = analyzer.analyze(request.text)
+        # Coalesced with concurrent requests into one forward pass
+        result = await analyze_sentiment_async(request.text)
         
         return SentimentResponse(
             sentiment_score=result["sentiment_score"],
             label=result["label"]
         )
         
+    except (InferencePoolBusy, ExecutorBusy) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error in sentiment analysis: {e}")
         raise HTTPException(status_code=500, detail=f"Error analyzing sentiment: {str(e)}")
@@ -92,7 +88,7 @@ async def get_mood_suggestions(request: MoodSuggestionsRequest):
         logger.info(f"Mood suggestions requested for user {request.user_id}, mood: {request.mood}")
         
         service = get_mood_suggestions_service()
-        result = service.get_mood_suggestions(
+        result = await service.get_mood_suggestions_async(
             user_id=request.user_id,
             mood=request.mood,
             note=request.note or ""
@@ -112,3 +108,12 @@ async def get_mood_suggestions(request: MoodSuggestionsRequest):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error generating mood suggestions: {str(e)}")
 
+@router.get("/sentiment/batcher-stats")
+async def sentiment_batcher_stats():
+    """Micro-batching queue counters (batches run, average batch size, queue depth)"""
+    return get_sentiment_batcher().stats()
+
+@router.get("/sentiment/cache-stats")
+async def sentiment_cache_stats():
+    """Hit/miss counters of the sentiment result cache"""
+    return sentiment_cache.stats()
@@ -0,0 +1,130 @@
+import os
+import sys
+
+# Add ml_service root to path
+ml_service_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ml_service_root not in sys.path:
+    sys.path.insert(0, ml_service_root)
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from loguru import logger
+
+from config.config import settings
+
+WARMUP_TEXT = "Feeling focused and ready to get things done today."
+
+
+class WarmupState:
+    """Progress of the startup warm-up, reported by /ready"""
+
+    def __init__(self):
+        self.status = "pending"  # pending -> running -> ready
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def to_dict(self) -> Dict:
+        return {
+            'status': self.status,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'timings_ms': self.timings,
+            'errors': self.errors,
+        }
+
+
+warmup_state = WarmupState()
+
+
+def _warm_pomodoro():
+    from app.routers.pomodoro import get_recommender
+    recommender = get_recommender()
+    if recommender.model and not recommender.smoke_test():
+        raise RuntimeError("Pomodoro model smoke test failed")
+
+
+def _warm_distraction():
+    from app.routers.distraction import get_predictor
+    predictor = get_predictor()
+    if predictor.model and not predictor.smoke_test():
+        raise RuntimeError("Distraction model smoke test failed")
+
+
+def _warm_sentiment():
+    from inference.sentiment_analyzer import SentimentAnalyzer
+    from inference.sentiment_batcher import get_sentiment_batcher
+    analyzer = SentimentAnalyzer()
+    analyzer._load_model()
+    if settings.SENTIMENT_BATCHING_ENABLED and analyzer.uses_transformer:
+        # Also starts the batcher's worker thread
+        get_sentiment_batcher().analyze(WARMUP_TEXT)
+    else:
+        analyzer.analyze_batch([WARMUP_TEXT], check_cache=False)
+
+
+def _warm_db_pool():
+    from utils.db_pool import get_pool
+    with get_pool().cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+async def _warm_async_db_pool():
+    from utils.async_data_loaders import ASYNCPG_AVAILABLE, get_async_pool
+    if ASYNCPG_AVAILABLE:
+        pool = await get_async_pool()
+        await pool.fetchval("SELECT 1")
+
+
+async def _timed(name: str, step):
+    """Run one warm-up step, recording its duration or error"""
+    started = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(step):
+            await step()
+        else:
+            # Model loads are blocking; keep the event loop (and /health) responsive
+            await asyncio.to_thread(step)
+    except Exception as e:
+        warmup_state.errors[name] = str(e)
+        logger.error(f"❌ Warm-up step '{name}' failed: {e}")
+    warmup_state.timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def run_warmup():
+    """
+    Open the DB pools, load every model and run one inference through each.
+
+    Failed steps are logged and reported but do not block readiness: the
+    predictors fall back to defaults when their model is missing.
+    """
+    warmup_state.status = "running"
+    warmup_state.started_at = datetime.now().isoformat()
+    started = time.perf_counter()
+    logger.info("🔥 Warming up models and connection pools...")
+
+    await _timed("db_pool", _warm_db_pool)
+    await _timed("async_db_pool", _warm_async_db_pool)
+    await _timed("pomodoro_recommender", _warm_pomodoro)
+    await _timed("distraction_predictor", _warm_distraction)
+    await _timed("sentiment_analyzer", _warm_sentiment)
+
+    warmup_state.timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    warmup_state.finished_at = datetime.now().isoformat()
+    warmup_state.status = "ready"
+    logger.info(f"✅ Warm-up finished in {warmup_state.timings['total']:.0f}ms")
+
+
+def start_warmup() -> Optional[asyncio.Task]:
+    """Start the warm-up in the background when ML_EAGER_STARTUP is set; otherwise mark ready at once"""
+    if not settings.ML_EAGER_STARTUP:
+        warmup_state.status = "ready"
+        return None
+    return asyncio.get_running_loop().create_task(run_warmup())
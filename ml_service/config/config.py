@@ -28,16 +28,60 @@ class Settings(BaseSettings):
     DB_NAME: str = os.getenv("DB_NAME", "focuswave")
     DB_USER: str = os.getenv("DB_USER", "postgres")
     DB_PASSWORD: Optional[str] = os.getenv("DB_PASSWORD") or "postgres"  # Default to "postgres" if not set
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))  # seconds
+    
+    # Database connection pool (shared by all services in a process)
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+    DB_POOL_HEALTHCHECK_INTERVAL: float = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))  # re-check idle connections older than this
+    
+    # Compute inference features in one SQL round trip instead of five pandas queries
+    FEATURES_SINGLE_QUERY: bool = os.getenv("FEATURES_SINGLE_QUERY", "true").lower() == "true"
+    
+    # Per-user feature cache (LRU + TTL), invalidated by the backend on writes
+    FEATURE_CACHE_ENABLED: bool = os.getenv("FEATURE_CACHE_ENABLED", "true").lower() == "true"
+    FEATURE_CACHE_SIZE: int = int(os.getenv("FEATURE_CACHE_SIZE", "10000"))
+    FEATURE_CACHE_TTL_SECONDS: float = float(os.getenv("FEATURE_CACHE_TTL_SECONDS", "60"))
+    FEATURE_CACHE_INVALIDATION_SLOTS: int = int(os.getenv("FEATURE_CACHE_INVALIDATION_SLOTS", "65536"))  # invalidation stamps shared by prefork workers
     
     # ML Service
     ML_SERVICE_PORT: int = int(os.getenv("ML_SERVICE_PORT", "8001"))
     ML_SERVICE_HOST: str = os.getenv("ML_SERVICE_HOST", "0.0.0.0")
+    ML_MAX_BATCH_SIZE: int = int(os.getenv("ML_MAX_BATCH_SIZE", "5000"))  # users per batch prediction request
+    ML_COMPILED_FORESTS: bool = os.getenv("ML_COMPILED_FORESTS", "true").lower() == "true"  # array-based forest evaluator
+    ML_EAGER_STARTUP: bool = os.getenv("ML_EAGER_STARTUP", "false").lower() == "true"  # load and warm all models before /ready
+    
+    # Preforked serving (run.py with ML_WORKERS > 1, see app/prefork.py)
+    ML_WORKERS: int = int(os.getenv("ML_WORKERS", "1"))
+    ML_WORKER_MAX_REQUESTS: int = int(os.getenv("ML_WORKER_MAX_REQUESTS", "0"))  # recycle a worker after this many requests (0 = never)
+    ML_WORKER_MAX_REQUESTS_JITTER: int = int(os.getenv("ML_WORKER_MAX_REQUESTS_JITTER", "0"))
+    ML_WORKER_GRACEFUL_TIMEOUT: float = float(os.getenv("ML_WORKER_GRACEFUL_TIMEOUT", "30"))
+    ML_PRELOAD_SENTIMENT: bool = os.getenv("ML_PRELOAD_SENTIMENT", "false").lower() == "true"  # load the sentiment model before forking
+    
+    # Inference worker processes (see inference/inference_pool.py); 0 = run models in the web process
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "0"))
+    INFERENCE_QUEUE_SIZE: int = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))  # shared-memory request slots = max requests in flight
+    INFERENCE_SLOT_BYTES: int = int(os.getenv("INFERENCE_SLOT_BYTES", str(1024 * 1024)))
+    INFERENCE_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("INFERENCE_QUEUE_TIMEOUT_SECONDS", "2"))  # wait for a free slot before answering 503
+    INFERENCE_TIMEOUT_SECONDS: float = float(os.getenv("INFERENCE_TIMEOUT_SECONDS", "30"))
+    
+    # Bounded thread pools for blocking work, one per dependency (see utils/executors.py)
+    DB_EXECUTOR_WORKERS: int = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+    DB_EXECUTOR_QUEUE: int = int(os.getenv("DB_EXECUTOR_QUEUE", "64"))
+    CPU_EXECUTOR_WORKERS: int = int(os.getenv("CPU_EXECUTOR_WORKERS", "0"))  # 0 = number of CPUs
+    CPU_EXECUTOR_QUEUE: int = int(os.getenv("CPU_EXECUTOR_QUEUE", "64"))
+    LLM_EXECUTOR_WORKERS: int = int(os.getenv("LLM_EXECUTOR_WORKERS", "16"))  # concurrent outbound LLM calls
+    LLM_EXECUTOR_QUEUE: int = int(os.getenv("LLM_EXECUTOR_QUEUE", "32"))  # beyond this, fall back to the rule-based coach
     
     # Model Paths
     MODEL_DIR: str = os.getenv("MODEL_DIR", "./models")
     POMODORO_MODEL_PATH: str = os.path.join(MODEL_DIR, "pomodoro_recommender.joblib")
     DISTRACTION_MODEL_PATH: str = os.path.join(MODEL_DIR, "distraction_predictor.joblib")
     SENTIMENT_MODEL_PATH: str = os.path.join(MODEL_DIR, "sentiment_analyzer")
+    SENTIMENT_ONNX_DIR: str = os.path.join(MODEL_DIR, "sentiment_onnx")
+    USE_MODEL_ARTIFACTS: bool = os.getenv("USE_MODEL_ARTIFACTS", "true").lower() == "true"  # load manifest + npz instead of joblib
+    MODEL_ARTIFACT_MMAP: bool = os.getenv("MODEL_ARTIFACT_MMAP", "true").lower() == "true"  # memory-map artifact arrays
     
     # OpenAI API (for AI Coach) - read from environment after .env is loaded
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY") or None
@@ -49,14 +93,59 @@ class Settings(BaseSettings):
     
     # LLM Provider preference (openai, gemini, or auto - uses Gemini if available, else OpenAI)
     LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "gemini")  # Default to Gemini
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "6"))  # per-request deadline, below the backend's 8s timeout
+    LLM_HEDGE_DELAY_MS: int = int(os.getenv("LLM_HEDGE_DELAY_MS", "0"))  # race the other provider after this delay (0 = no hedging)
+    LLM_SINGLEFLIGHT: bool = os.getenv("LLM_SINGLEFLIGHT", "true").lower() == "true"  # share one upstream call between identical in-flight prompts
+    # Per-provider circuit breaker (see utils/circuit_breaker.py)
+    LLM_BREAKER_WINDOW_SECONDS: float = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "60"))
+    LLM_BREAKER_MIN_CALLS: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))  # calls in the window before it can open
+    LLM_BREAKER_ERROR_RATE: float = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+    LLM_BREAKER_P95_MS: float = float(os.getenv("LLM_BREAKER_P95_MS", "5000"))  # 0 = ignore latency
+    LLM_BREAKER_OPEN_SECONDS: float = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))  # fail fast this long before probing
+    LLM_BREAKER_HALF_OPEN_PROBES: int = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+    # Responses to prompts without free text, keyed by bucketed features (see utils/response_cache.py)
+    LLM_RESPONSE_CACHE_ENABLED: bool = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    LLM_RESPONSE_CACHE_SIZE: int = int(os.getenv("LLM_RESPONSE_CACHE_SIZE", "5000"))
+    LLM_RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    LLM_RESPONSE_CACHE_VARIANTS: int = int(os.getenv("LLM_RESPONSE_CACHE_VARIANTS", "3"))  # distinct responses kept per key before serving from cache
+    # Coaching pre-generated for recently active users (jobs/precompute_coaching.py)
+    COACHING_PRECOMPUTE_ENABLED: bool = os.getenv("COACHING_PRECOMPUTE_ENABLED", "false").lower() == "true"  # serve stored answers from /ml/coach
+    COACHING_PRECOMPUTE_PATH: str = os.getenv("COACHING_PRECOMPUTE_PATH", os.path.join(MODEL_DIR, "precomputed_coaching.json"))
+    COACHING_PRECOMPUTE_ACTIVE_HOURS: int = int(os.getenv("COACHING_PRECOMPUTE_ACTIVE_HOURS", "24"))  # users with activity in this window
+    COACHING_PRECOMPUTE_MAX_AGE_HOURS: float = float(os.getenv("COACHING_PRECOMPUTE_MAX_AGE_HOURS", "12"))  # older answers are not served
+    COACHING_PRECOMPUTE_REFRESH_SECONDS: float = float(os.getenv("COACHING_PRECOMPUTE_REFRESH_SECONDS", "30"))  # how often web workers reload the stored answers
+    COACHING_PRECOMPUTE_INTERVAL_MINUTES: int = int(os.getenv("COACHING_PRECOMPUTE_INTERVAL_MINUTES", "60"))
+    COACHING_PRECOMPUTE_CONCURRENCY: int = int(os.getenv("COACHING_PRECOMPUTE_CONCURRENCY", "4"))  # LLM calls in flight
+    COACHING_PRECOMPUTE_RPM: int = int(os.getenv("COACHING_PRECOMPUTE_RPM", "30"))  # LLM calls started per minute (0 = no limit)
+    COACHING_PRECOMPUTE_DAILY_TOKENS: int = int(os.getenv("COACHING_PRECOMPUTE_DAILY_TOKENS", "200000"))  # estimated prompt + response tokens per day
     
     # Hugging Face
     HF_MODEL_NAME: str = os.getenv("HF_MODEL_NAME", "distilbert-base-uncased-finetuned-sst-2-english")
     
+    # Sentiment backend: "torch" (transformers) or "onnx" (ONNX Runtime, no torch import)
+    SENTIMENT_BACKEND: str = os.getenv("SENTIMENT_BACKEND", "torch").lower()
+    SENTIMENT_ONNX_QUANTIZED: bool = os.getenv("SENTIMENT_ONNX_QUANTIZED", "true").lower() == "true"
+    SENTIMENT_ONNX_THREADS: int = int(os.getenv("SENTIMENT_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+    
+    # Sentiment micro-batching: concurrent requests are coalesced into one forward pass
+    SENTIMENT_BATCHING_ENABLED: bool = os.getenv("SENTIMENT_BATCHING_ENABLED", "true").lower() == "true"
+    SENTIMENT_MAX_BATCH_SIZE: int = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", "32"))
+    SENTIMENT_MAX_WAIT_MS: float = float(os.getenv("SENTIMENT_MAX_WAIT_MS", "5"))
+    
+    # Sentiment result cache keyed by a hash of the normalized text
+    SENTIMENT_CACHE_ENABLED: bool = os.getenv("SENTIMENT_CACHE_ENABLED", "true").lower() == "true"
+    SENTIMENT_CACHE_SIZE: int = int(os.getenv("SENTIMENT_CACHE_SIZE", "50000"))
+    SENTIMENT_CACHE_PATH: str = os.getenv("SENTIMENT_CACHE_PATH", "")  # e.g. ./models/sentiment_cache.json to persist across restarts
+    
     # Retraining
+    POMODORO_MULTI_OUTPUT: bool = os.getenv("POMODORO_MULTI_OUTPUT", "true").lower() == "true"  # one forest for [focus, break]
     RETRAIN_INTERVAL_HOURS: int = int(os.getenv("RETRAIN_INTERVAL_HOURS", "24"))
     MIN_SAMPLES_FOR_TRAINING: int = int(os.getenv("MIN_SAMPLES_FOR_TRAINING", "50"))
     
+    # Hot reload of newly registered model versions
+    MODEL_RELOAD_INTERVAL_SECONDS: float = float(os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", "30"))  # 0 disables the versions.json watcher
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")  # required as X-Admin-Token on /admin endpoints when set
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -2,116 +2,47 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Dict, Optional
+import asyncio
+from typing import AsyncIterator, Dict, Optional, Tuple
+import pandas as pd
 from loguru import logger
-from config.config import settings
 from utils.data_loaders import DataLoader
+from utils.async_data_loaders import AsyncDataLoader
 from inference.sentiment_analyzer import SentimentAnalyzer
+from utils.executors import run_blocking, ExecutorBusy
+from inference.llm_gateway import get_llm_gateway, LLMBlocked, LLMUnavailable
+from utils.response_cache import response_cache, coach_cache_key, bucket_labels
+from utils.precomputed_coaching import coaching_signature, get_precomputed_coaching
 
-# Try importing OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("OpenAI library not available")
+COACH_SYSTEM_PROMPT = """You are a supportive, ADHD-friendly productivity coach for FocusWave. 
+- Answer questions directly and helpfully
+- Provide short, encouraging, actionable advice
+- Be empathetic and understanding
+- Keep responses under 150 words
+- Focus on one clear suggestion
+- Use the user's data (streak, tasks, mood) to personalize your response"""
 
-# Try importing Gemini
-try:
-    import google.generativeai as genai
-    from google.generativeai.types import HarmCategory, HarmBlockThreshold
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    genai = None
-    HarmCategory = None
-    HarmBlockThreshold = None
-    logger.warning("Google Generative AI library not available")
+# Generation options shared by every coaching call (including jobs/precompute_coaching.py).
+# Only block high-risk content; productivity and wellness topics trip stricter filters
+COACH_LLM_OPTIONS = {"max_tokens": 200, "temperature": 0.7, "safety_threshold": "BLOCK_ONLY_HIGH"}
 
 class CoachService:
     def __init__(self):
         self.data_loader = DataLoader()
+        self.async_data_loader = AsyncDataLoader()
         self.sentiment_analyzer = SentimentAnalyzer()
-        self.openai_client = None
-        self.gemini_client = None
+        self.llm = None
         self.llm_provider = None
         
         # Determine which LLM provider to use
         self._initialize_llm()
     
     def _initialize_llm(self):
-        """Initialize LLM client based on configuration"""
-        provider_preference = settings.LLM_PROVIDER.lower()
-        
-        # Clean up API keys
-        openai_key = None
-        if settings.OPENAI_API_KEY:
-            openai_key = settings.OPENAI_API_KEY.strip().strip('"').strip("'")
-            if openai_key == "" or openai_key == "your_openai_api_key_here":
-                openai_key = None
-        
-        gemini_key = None
-        if settings.GEMINI_API_KEY:
-            gemini_key = settings.GEMINI_API_KEY.strip().strip('"').strip("'")
-            if gemini_key == "" or gemini_key == "your_gemini_api_key_here":
-                gemini_key = None
-        
-        # Initialize based on preference
-        if provider_preference == "gemini" or (provider_preference == "auto" and gemini_key):
-            # Try Gemini first
-            if GEMINI_AVAILABLE and gemini_key:
-                try:
-                    genai.configure(api_key=gemini_key)
-                    # Try the configured model, with fallback to common models
-                    model_name = settings.GEMINI_MODEL
-                    models_to_try = [model_name, "gemini-2.5-flash", "gemini-2.0-flash", "gemini-flash-latest", "gemini-pro-latest"]
-                    
-                    for model in models_to_try:
-                        try:
-                            self.gemini_client = genai.GenerativeModel(model)
-                            self.llm_provider = "gemini"
-                            logger.info("✅ Gemini client initialized successfully")
-                            logger.info(f"   Using model: {model}")
-                            return
-                        except Exception as model_error:
-                            logger.debug(f"Model {model} failed: {model_error}")
-                            continue
-                    
-                    # If all models failed, log and continue
-                    logger.warning(f"⚠️ All Gemini models failed, falling back")
-                    self.gemini_client = None
-                except Exception as e:
-                    logger.warning(f"⚠️ Gemini initialization failed: {e}")
-                    self.gemini_client = None
-        
-        # Fall back to OpenAI
-        if provider_preference == "openai" or (provider_preference == "auto" and openai_key):
-            if OPENAI_AVAILABLE and openai_key:
-                try:
-                    self.openai_client = OpenAI(api_key=openai_key)
-                    self.llm_provider = "openai"
-                    logger.info("✅ OpenAI client initialized successfully")
-                    logger.info(f"   Using model: {settings.OPENAI_MODEL}")
-                    return
-                except Exception as e:
-                    logger.warning(f"⚠️ OpenAI initialization failed: {e}")
-                    self.openai_client = None
-        
-        # Try Gemini if OpenAI failed
-        if provider_preference == "auto" and not self.llm_provider:
-            if GEMINI_AVAILABLE and gemini_key:
-                try:
-                    genai.configure(api_key=gemini_key)
-                    self.gemini_client = genai.GenerativeModel(settings.GEMINI_MODEL)
-                    self.llm_provider = "gemini"
-                    logger.info("✅ Gemini client initialized successfully (fallback)")
-                    logger.info(f"   Using model: {settings.GEMINI_MODEL}")
-                    return
-                except Exception as e:
-                    logger.warning(f"⚠️ Gemini initialization failed: {e}")
-        
-        # No LLM available
-        if not self.llm_provider:
+        """Use the shared LLM gateway if a provider is configured"""
+        self.llm = get_llm_gateway()
+        if self.llm.available:
+            self.llm_provider = self.llm.primary
+        else:
             logger.info("Using rule-based coach (no LLM API key provided)")
             self.llm_provider = "rule-based"
     
@@ -125,32 +56,75 @@ class CoachService:
                 "suggested_action": str
             }
         """
+        # Get user context and recent mood logs
+        user_features = self.data_loader.get_user_features(user_id)
+        moods = self.data_loader.get_user_moods(user_id=user_id, days=1)
+        precomputed = self._precomputed_coaching(user_id, user_features, moods, context)
+        if precomputed is not None:
+            return precomputed
+        return self.coach_from_data(user_features, moods, context)
+    
+    async def get_coaching_async(self, user_id: int, context: Optional[Dict] = None) -> Dict:
+        """Async variant of get_coaching() that loads user context without blocking the event loop"""
+        user_features, moods = await asyncio.gather(
+            self.async_data_loader.get_user_features(user_id),
+            self.async_data_loader.get_user_moods(user_id=user_id, days=1),
+        )
+        precomputed = self._precomputed_coaching(user_id, user_features, moods, context)
+        if precomputed is not None:
+            return precomputed
+        if self.llm.available:
+            # Waiting on the LLM takes seconds, so coaching runs on the bounded llm executor
+            try:
+                return await run_blocking("llm", self.coach_from_data, user_features, moods, context)
+            except ExecutorBusy as e:
+                logger.warning(f"⚠️ {e}, using rule-based coach")
+        return self.coach_from_data(user_features, moods, context, use_llm=False)
+    
+    def _prepare_context(self, user_features: Dict, moods: pd.DataFrame, context: Optional[Dict] = None) -> Tuple[Dict, str, Optional[str]]:
+        """Recent mood notes and the user's message; other context keys are merged into user_features"""
+        recent_mood_text = ""
+        if not moods.empty and 'note' in moods.columns:
+            recent_notes = moods['note'].dropna().tolist()
+            if recent_notes:
+                recent_mood_text = " ".join(recent_notes[-3:])  # Last 3 mood notes
+        
+        # Extract user message from context
+        user_message = None
+        if context:
+            user_message = context.get('user_message') or context.get('message') or context.get('question')
+            # Merge other context into user_features
+            for key, value in context.items():
+                if key not in ['user_message', 'message', 'question']:
+                    user_features[key] = value
+        return user_features, recent_mood_text, user_message
+    
+    def _precomputed_coaching(self, user_id: int, user_features: Dict, moods: pd.DataFrame,
+                              context: Optional[Dict] = None) -> Optional[Dict]:
+        """Answer stored by the precompute job, if it was generated for the prompt this request would send"""
+        if not self.llm.available:
+            return None
+        features, mood_text, user_message = self._prepare_context(dict(user_features), moods, context)
+        if user_message:
+            return None
+        signature = coaching_signature(COACH_SYSTEM_PROMPT, self._build_context_prompt(features, mood_text))
+        return get_precomputed_coaching(user_id, signature)
+    
+    def coach_from_data(self, user_features: Dict, moods: pd.DataFrame, context: Optional[Dict] = None,
+                        use_llm: bool = True) -> Dict:
+        """Generate coaching from already loaded user features and mood logs"""
         try:
-            # Get user context
-            user_features = self.data_loader.get_user_features(user_id)
-            
-            # Get recent mood logs for context
-            moods = self.data_loader.get_user_moods(user_id=user_id, days=1)
-            recent_mood_text = ""
-            if not moods.empty and 'note' in moods.columns:
-                recent_notes = moods['note'].dropna().tolist()
-                if recent_notes:
-                    recent_mood_text = " ".join(recent_notes[-3:])  # Last 3 mood notes
+            user_features, recent_mood_text, user_message = self._prepare_context(user_features, moods, context)
             
-            # Extract user message from context
-            user_message = None
-            if context:
-                user_message = context.get('user_message') or context.get('message') or context.get('question')
-                # Merge other context into user_features
-                for key, value in context.items():
-                    if key not in ['user_message', 'message', 'question']:
-                        user_features[key] = value
+            # Without a message or mood notes the prompt only depends on bucketed features
+            cache_key = coach_cache_key(user_features, recent_mood_text, user_message) if self.llm.available else None
+            cached = response_cache.get(cache_key) if cache_key else None
             
             # Generate coaching message
-            if self.llm_provider == "gemini" and self.gemini_client:
-                message, action = self._gemini_coach(user_features, recent_mood_text, user_message)
-            elif self.llm_provider == "openai" and self.openai_client:
-                message, action = self._openai_coach(user_features, recent_mood_text, user_message)
+            if cached is not None:
+                message, action = cached, self._extract_action(cached, user_features)
+            elif use_llm and self.llm.available:
+                message, action = self._llm_coach(user_features, recent_mood_text, user_message, cache_key)
             else:
                 # Enhanced rule-based coach that handles user questions
                 message, action = self._rule_based_coach(user_features, recent_mood_text, user_message)
@@ -169,251 +143,127 @@ class CoachService:
                 "suggested_action": "Take a 5-minute break"
             }
     
-    def _gemini_coach(self, features: Dict, mood_text: str, user_message: str = None) -> tuple:
-        """Generate coaching using Gemini"""
-        try:
-            context_prompt = self._build_context_prompt(features, mood_text, user_message)
-            
-            system_instruction = """You are a supportive, ADHD-friendly productivity coach for FocusWave. 
-- Answer questions directly and helpfully
-- Provide short, encouraging, actionable advice
-- Be empathetic and understanding
-- Keep responses under 150 words
-- Focus on one clear suggestion
-- Use the user's data (streak, tasks, mood) to personalize your response"""
-            
-            # Combine system instruction with user prompt
-            full_prompt = f"{system_instruction}\n\n{context_prompt}"
-            
-            # Generate response with updated API
-            generation_config = {
-                "temperature": 0.7,
-                "max_output_tokens": 200,
-            }
-            
-            # Safety settings - allow productivity and wellness content
-            # Use more permissive settings to avoid false positives
-            safety_settings = None
-            if GEMINI_AVAILABLE and HarmCategory and HarmBlockThreshold:
-                try:
-                    # More permissive settings for wellness content - only block high-risk content
-                    safety_settings = [
-                        {
-                            "category": HarmCategory.HARM_CATEGORY_HARASSMENT,
-                            "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                        },
-                        {
-                            "category": HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                            "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                        },
-                        {
-                            "category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                            "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                        },
-                        {
-                            "category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                            "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                        },
-                    ]
-                except Exception as safety_err:
-                    logger.debug(f"Could not set safety settings: {safety_err}, using defaults")
-                    safety_settings = None
-            
-            # Try to generate content - handle different model API versions
+    async def stream_coaching(self, user_id: int, context: Optional[Dict] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Stream coaching as ("token", {"text"}) events followed by one
+        ("done", {"message", "suggested_action", "source"}) event.
+        
+        LLM tokens are relayed as the provider produces them. The rule-based
+        coach (no provider, open circuits, blocked or failed before the first
+        token) sends its whole answer as a single token event. If the stream
+        breaks off midway, "done" carries what was sent and truncated=True.
+        """
+        user_features, moods = await asyncio.gather(
+            self.async_data_loader.get_user_features(user_id),
+            self.async_data_loader.get_user_moods(user_id=user_id, days=1),
+        )
+        precomputed = self._precomputed_coaching(user_id, user_features, moods, context)
+        if precomputed is not None:
+            yield "token", {"text": precomputed["message"]}
+            yield "done", {**precomputed, "source": "precomputed"}
+            return
+        features, mood_text, user_message = self._prepare_context(user_features, moods, context)
+        
+        cache_key = coach_cache_key(features, mood_text, user_message) if self.llm.available else None
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            yield "token", {"text": cached}
+            yield "done", {"message": cached, "suggested_action": self._extract_action(cached, features), "source": "cache"}
+            return
+        
+        parts = []
+        if self.llm.available:
             try:
-                # Build API call with optional safety_settings
-                if safety_settings:
-                    response = self.gemini_client.generate_content(
-                        full_prompt,
-                        generation_config=generation_config,
-                        safety_settings=safety_settings
-                    )
-                else:
-                    response = self.gemini_client.generate_content(
-                        full_prompt,
-                        generation_config=generation_config
-                    )
-                
-                # Check if response was blocked by safety filters
-                # finish_reason 2 = SAFETY (blocked by safety filters)
-                if response.candidates and len(response.candidates) > 0:
-                    candidate = response.candidates[0]
-                    finish_reason = getattr(candidate, 'finish_reason', None)
-                    
-                    # Check if blocked (finish_reason can be enum or int)
-                    is_blocked = False
-                    if finish_reason is not None:
-                        # Handle both enum and integer values
-                        if hasattr(finish_reason, '__int__'):
-                            is_blocked = int(finish_reason) == 2
-                        else:
-                            is_blocked = finish_reason == 2
-                        
-                        # Also check enum name if available
-                        if not is_blocked and hasattr(finish_reason, 'name'):
-                            is_blocked = finish_reason.name == 'SAFETY'
-                    
-                    if is_blocked:
-                        logger.warning("Gemini response blocked by safety filters (finish_reason=SAFETY), using rule-based fallback")
-                        raise ValueError("Response blocked by safety filters")
-                
-                # Safely extract text
-                try:
-                    message = response.text.strip()
-                except ValueError as text_error:
-                    # If text extraction fails, try alternative methods
-                    if response.candidates and len(response.candidates) > 0:
-                        candidate = response.candidates[0]
-                        if candidate.content and candidate.content.parts:
-                            message = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
-                            if not message:
-                                logger.warning(f"Could not extract text from Gemini response: {text_error}")
-                                raise text_error
-                        else:
-                            logger.warning(f"Gemini response has no content: {text_error}")
-                            raise text_error
-                    else:
-                        logger.warning(f"Gemini response has no candidates: {text_error}")
-                        raise text_error
-                        
-            except ValueError as safety_error:
-                # Safety filter or text extraction error - use rule-based fallback
-                logger.warning(f"Gemini safety/text error: {safety_error}, using rule-based fallback")
-                raise safety_error
-            except Exception as api_error:
-                # If model name is wrong or other API error, try alternative models
-                logger.warning(f"Model API error: {api_error}. Trying alternative approach...")
-                # Re-initialize with correct model name
-                import google.generativeai as genai
-                model_name = settings.GEMINI_MODEL
-                # Try common model names if the configured one doesn't work
-                for alt_model in ["gemini-2.5-flash", "gemini-2.0-flash", "gemini-flash-latest"]:
-                    try:
-                        temp_client = genai.GenerativeModel(alt_model)
-                        if safety_settings:
-                            response = temp_client.generate_content(
-                                full_prompt,
-                                generation_config=generation_config,
-                                safety_settings=safety_settings
-                            )
-                        else:
-                            response = temp_client.generate_content(
-                                full_prompt,
-                                generation_config=generation_config
-                            )
-                        
-                        # Check safety filters for alternative model too
-                        if response.candidates and len(response.candidates) > 0:
-                            candidate = response.candidates[0]
-                            finish_reason = getattr(candidate, 'finish_reason', None)
-                            
-                            is_blocked = False
-                            if finish_reason is not None:
-                                if hasattr(finish_reason, '__int__'):
-                                    is_blocked = int(finish_reason) == 2
-                                else:
-                                    is_blocked = finish_reason == 2
-                                if not is_blocked and hasattr(finish_reason, 'name'):
-                                    is_blocked = finish_reason.name == 'SAFETY'
-                            
-                            if is_blocked:
-                                logger.warning(f"Alternative model {alt_model} also blocked by safety filters")
-                                continue
-                        
-                        # Extract text safely
-                        try:
-                            message = response.text.strip()
-                        except ValueError:
-                            # Try alternative extraction
-                            if response.candidates and len(response.candidates) > 0:
-                                candidate = response.candidates[0]
-                                if candidate.content and candidate.content.parts:
-                                    message = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
-                                    if not message:
-                                        continue
-                                else:
-                                    continue
-                            else:
-                                continue
-                        
-                        logger.info(f"✅ Using alternative model: {alt_model}")
-                        # Update the client for future use
-                        self.gemini_client = temp_client
-                        break
-                    except Exception as alt_error:
-                        logger.debug(f"Alternative model {alt_model} failed: {alt_error}")
-                        continue
+                async for text in self.llm.stream(
+                    COACH_SYSTEM_PROMPT,
+                    self._build_context_prompt(features, mood_text, user_message, bucketed=cache_key is not None),
+                    **COACH_LLM_OPTIONS,
+                ):
+                    parts.append(text)
+                    yield "token", {"text": text}
+            except LLMUnavailable:
+                pass
+            except Exception as e:
+                if not parts:
+                    logger.warning(f"LLM coaching stream failed ({self.llm_provider}): {e}, using rule-based fallback")
                 else:
-                    # All models failed - raise original error to trigger fallback
-                    raise api_error
-            
-            # Extract suggested action (simple heuristic)
-            action = self._extract_action(message, features)
-            
-            return message, action
-            
-        except (ValueError, Exception) as e:
-            # Handle both safety filter errors and other API errors
-            error_msg = str(e)
-            if "safety" in error_msg.lower() or "finish_reason" in error_msg.lower() or "blocked" in error_msg.lower():
-                logger.warning(f"Gemini response blocked or safety filter triggered: {error_msg}")
-            else:
-                logger.error(f"Gemini coaching error: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-            # Fall back to rule-based coaching
-            return self._rule_based_coach(features, mood_text, user_message)
+                    logger.error(f"LLM coaching stream broke off ({self.llm_provider}): {e}")
+                    message = "".join(parts).strip()
+                    yield "done", {
+                        "message": message,
+                        "suggested_action": self._extract_action(message, features),
+                        "source": self.llm_provider,
+                        "truncated": True,
+                    }
+                    return
+            if parts:
+                message = "".join(parts).strip()
+                if cache_key:
+                    response_cache.add(cache_key, message)
+                yield "done", {
+                    "message": message,
+                    "suggested_action": self._extract_action(message, features),
+                    "source": self.llm_provider,
+                }
+                return
+        
+        message, action = self._rule_based_coach(features, mood_text, user_message)
+        yield "token", {"text": message}
+        yield "done", {"message": message, "suggested_action": action, "source": "rule-based"}
     
-    def _openai_coach(self, features: Dict, mood_text: str, user_message: str = None) -> tuple:
-        """Generate coaching using OpenAI"""
+    def _llm_coach(self, features: Dict, mood_text: str, user_message: str = None, cache_key: Optional[tuple] = None) -> tuple:
+        """Generate coaching through the LLM gateway (rule-based on failure)"""
         try:
-            context_prompt = self._build_context_prompt(features, mood_text, user_message)
-            
-            system_prompt = """You are a supportive, ADHD-friendly productivity coach for FocusWave. 
-- Answer questions directly and helpfully
-- Provide short, encouraging, actionable advice
-- Be empathetic and understanding
-- Keep responses under 150 words
-- Focus on one clear suggestion
-- Use the user's data (streak, tasks, mood) to personalize your response"""
-            
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": context_prompt}
-            ]
-            
-            response = self.openai_client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=messages,
-                max_tokens=200,
-                temperature=0.7
+            context_prompt = self._build_context_prompt(features, mood_text, user_message, bucketed=cache_key is not None)
+            result = self.llm.generate_sync(
+                COACH_SYSTEM_PROMPT,
+                context_prompt,
+                **COACH_LLM_OPTIONS,
             )
-            
-            message = response.choices[0].message.content.strip()
+            message = result.text
+            if cache_key:
+                response_cache.add(cache_key, message)
             
             # Extract suggested action (simple heuristic)
             action = self._extract_action(message, features)
             
             return message, action
             
+        except LLMBlocked as e:
+            logger.warning(f"LLM response blocked by safety filters: {e}, using rule-based fallback")
+            return self._rule_based_coach(features, mood_text, user_message)
+        except LLMUnavailable:
+            # Circuit open: answer locally right away
+            return self._rule_based_coach(features, mood_text, user_message)
         except Exception as e:
-            logger.error(f"OpenAI coaching error: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error(f"LLM coaching error ({self.llm_provider}): {e}")
             return self._rule_based_coach(features, mood_text, user_message)
     
-    def _build_context_prompt(self, features: Dict, mood_text: str, user_message: str = None) -> str:
-        """Build context prompt for LLM"""
+    def _build_context_prompt(self, features: Dict, mood_text: str, user_message: str = None, bucketed: bool = False) -> str:
+        """Build context prompt for LLM (with feature ranges instead of exact values when the response is cached)"""
+        if bucketed:
+            profile = bucket_labels(features)
+        else:
+            profile = {
+                'current_streak': features.get('current_streak', 0),
+                'level': features.get('level', 1),
+                'completion_rate': f"{features.get('completion_rate', 50):.1f}",
+                'pending_tasks': features.get('pending_tasks', 0),
+                'recent_mood': features.get('recent_mood', 'neutral'),
+                'sessions_today': features.get('sessions_today', 0),
+            }
         prompt = f"""You are a supportive, ADHD-friendly productivity coach for FocusWave.
 
 User Profile:
-- Current streak: {features.get('current_streak', 0)} days
-- Level: {features.get('level', 1)}
-- Completion rate: {features.get('completion_rate', 50):.1f}%
-- Pending tasks: {features.get('pending_tasks', 0)}
-- Recent mood: {features.get('recent_mood', 'neutral')}
-- Sessions today: {features.get('sessions_today', 0)}
+- Current streak: {profile['current_streak']} days
+- Level: {profile['level']}
+- Completion rate: {profile['completion_rate']}%
+- Pending tasks: {profile['pending_tasks']}
+- Recent mood: {profile['recent_mood']}
+- Sessions today: {profile['sessions_today']}
 """
+        if bucketed:
+            prompt += "\nThe profile gives ranges. Do not quote exact numbers for streak, level, completion rate, tasks or sessions.\n"
         
         if mood_text:
             prompt += f"\nRecent mood notes: {mood_text[:200]}\n"
@@ -2,21 +2,30 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import joblib
 import numpy as np
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from loguru import logger
 from config.config import settings
-from utils.feature_engineering import FeatureEngineer
+from utils.feature_engineering import FeatureEngineer, DISTRACTION_FEATURE_NAMES
 from utils.data_loaders import DataLoader
+from utils.async_data_loaders import AsyncDataLoader
 from utils.model_versioning import ModelVersioning
+from utils.forest_compiler import compile_model, compile_scaler
+from inference.inference_pool import get_inference_pool, InferencePoolBusy
+from utils.executors import run_blocking
 
 class DistractionPredictor:
-    def __init__(self):
+    def __init__(self, version: Optional[str] = None):
         self.model = None
         self.feature_scaler = None
+        self.compiled_model = None
+        self.compiled_scaler = None
+        self.feature_mean = None
+        self.feature_std = None
+        self.version = None
         self.versioning = ModelVersioning()
         self.data_loader = DataLoader()
+        self.async_data_loader = AsyncDataLoader()
         self.distraction_triggers = [
             "high_task_load",
             "low_mood",
@@ -25,19 +34,25 @@ class DistractionPredictor:
             "low_streak",
             "stress"
         ]
-        self.load_model()
+        self.load_model(version)
     
-    def load_model(self):
-        """Load the trained model"""
+    def load_model(self, version: Optional[str] = None):
+        """Load the trained model (the current version unless one is given)"""
         try:
-            model_path = self.versioning.get_model_path("distraction_predictor")
+            self.version = version or self.versioning.get_current_version("distraction_predictor")
+            if self._load_artifact():
+                return
+            
+            model_path = self.versioning.get_model_path("distraction_predictor", self.version)
             
             if model_path and os.path.exists(model_path):
+                import joblib  # only needed for models without an artifact
                 model_data = joblib.load(model_path)
                 self.model = model_data.get('model')
                 self.feature_scaler = model_data.get('scaler')
                 self.feature_mean = model_data.get('feature_mean')
                 self.feature_std = model_data.get('feature_std')
+                self._compile()
                 logger.info(f"✅ Loaded distraction predictor from {model_path}")
             else:
                 logger.warning("⚠️ Model not found, using heuristic fallback")
@@ -47,6 +62,52 @@ class DistractionPredictor:
             logger.error(f"❌ Error loading model: {e}")
             self.model = None
     
+    def _load_artifact(self) -> bool:
+        """Load the pickle-free artifact of the loaded version, if it has a compatible one"""
+        if not settings.USE_MODEL_ARTIFACTS:
+            return False
+        try:
+            artifact = self.versioning.load_artifact("distraction_predictor", self.version)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load model artifact, falling back to joblib: {e}")
+            return False
+        if artifact is None:
+            return False
+        if artifact.feature_names != DISTRACTION_FEATURE_NAMES:
+            logger.warning("⚠️ Model artifact was built for different features, falling back to joblib")
+            return False
+        
+        # Artifacts hold the compiled forest and scaler directly
+        self.model = self.compiled_model = artifact.model
+        self.feature_scaler = self.compiled_scaler = artifact.scaler
+        self.feature_mean = artifact.feature_mean
+        self.feature_std = artifact.feature_std
+        logger.info(f"✅ Loaded distraction predictor artifact from {self.versioning.get_artifact_path('distraction_predictor', self.version)}")
+        return True
+    
+    def smoke_test(self) -> bool:
+        """Run the loaded model on one representative row and check the output is usable"""
+        if not self.model:
+            return False
+        if self.feature_mean is not None:
+            features = np.asarray(self.feature_mean, dtype=np.float64).reshape(1, -1)
+        else:
+            features = np.zeros((1, len(DISTRACTION_FEATURE_NAMES)))
+        if self.feature_scaler:
+            features = (self.compiled_scaler or self.feature_scaler).transform(features)
+        proba = np.asarray((self.compiled_model or self.model).predict_proba(features))
+        return proba.shape[0] == 1 and bool(np.isfinite(proba).all()) and abs(proba.sum() - 1.0) < 1e-6
+    
+    def _compile(self):
+        """Flatten the loaded forest (and scaler) for fast inference when enabled"""
+        self.compiled_model = None
+        self.compiled_scaler = None
+        if settings.ML_COMPILED_FORESTS:
+            self.compiled_model = compile_model(self.model)
+            self.compiled_scaler = compile_scaler(self.feature_scaler)
+            if self.compiled_model is not None:
+                logger.info("✅ Using compiled forest evaluator")
+    
     def predict(self, user_id: int, session_duration: int = 25) -> Dict:
         """
         Predict distraction probability
@@ -57,43 +118,112 @@ class DistractionPredictor:
                 "top_trigger": str
             }
         """
+        user_features = self.data_loader.get_user_features(user_id)
+        return self.predict_from_features(user_features, session_duration)
+    
+    async def predict_async(self, user_id: int, session_duration: int = 25) -> Dict:
+        """Async variant of predict() that awaits the DB instead of blocking the event loop"""
+        user_features = await self.async_data_loader.get_user_features(user_id)
+        return (await self.predict_batch_from_features_async([user_features], [session_duration]))[0]
+    
+    def predict_batch(self, user_ids: List[int], session_durations: Optional[List[int]] = None) -> List[Dict]:
+        """Predict distraction probability for many users with one bulk feature load and one model call"""
+        features_by_user = self.data_loader.get_users_features(user_ids)
+        features_list = [features_by_user[user_id] for user_id in user_ids]
+        return self.predict_batch_from_features(features_list, session_durations)
+    
+    async def predict_batch_async(self, user_ids: List[int], session_durations: Optional[List[int]] = None) -> List[Dict]:
+        """Async variant of predict_batch()"""
+        features_by_user = await self.async_data_loader.get_users_features(user_ids)
+        features_list = [features_by_user[user_id] for user_id in user_ids]
+        return await self.predict_batch_from_features_async(features_list, session_durations)
+    
+    def predict_from_features(self, user_features: Dict, session_duration: int = 25) -> Dict:
+        """Predict distraction probability from an already loaded feature dict"""
+        return self.predict_batch_from_features([user_features], [session_duration])[0]
+    
+    def predict_batch_from_features(self, features_list: List[Dict], session_durations: Optional[List[int]] = None) -> List[Dict]:
+        """Predict distraction probability for a list of feature dicts with a single predict_proba call"""
+        if not features_list:
+            return []
+        if session_durations is None:
+            session_durations = [25] * len(features_list)
+        
         try:
-            # Get user features
-            user_features = self.data_loader.get_user_features(user_id)
-            
-            # Prepare features
-            features = FeatureEngineer.prepare_distraction_features(user_features, session_duration)
-            
-            # Normalize if scaler available
-            if self.feature_scaler:
-                features = self.feature_scaler.transform(features)
-            elif hasattr(self, 'feature_mean') and hasattr(self, 'feature_std'):
-                features, _, _ = FeatureEngineer.normalize_features(
-                    features, self.feature_mean, self.feature_std
-                )
-            
-            # Predict if model available
             if self.model:
-                probability = self.model.predict_proba(features)[0][1]  # Probability of distraction
-                probability = float(np.clip(probability, 0, 1))
+                probabilities = self.predict_matrix(self._feature_matrix(features_list, session_durations))
             else:
                 # Fallback: heuristic-based prediction
-                probability = self._heuristic_prediction(user_features, session_duration)
-            
-            # Determine top trigger
-            top_trigger = self._identify_trigger(user_features, session_duration)
-            
-            return {
-                "distraction_probability": round(probability, 3),
-                "top_trigger": top_trigger
-            }
+                probabilities = [
+                    self._heuristic_prediction(user_features, duration)
+                    for user_features, duration in zip(features_list, session_durations)
+                ]
+            return self._build_results(features_list, session_durations, probabilities)
             
         except Exception as e:
             logger.error(f"Error in distraction prediction: {e}")
-            return {
+            return self._default_results(features_list)
+    
+    async def predict_batch_from_features_async(self, features_list: List[Dict], session_durations: Optional[List[int]] = None) -> List[Dict]:
+        """
+        Like predict_batch_from_features(), without blocking the event loop:
+        the model runs in the inference pool when it is enabled and on the CPU
+        executor otherwise.
+        """
+        if not self.model or not features_list:
+            return self.predict_batch_from_features(features_list, session_durations)
+        pool = get_inference_pool()
+        if pool is None:
+            return await run_blocking("cpu", self.predict_batch_from_features, features_list, session_durations)
+        if session_durations is None:
+            session_durations = [25] * len(features_list)
+        
+        try:
+            features = self._feature_matrix(features_list, session_durations)
+            probabilities = await pool.run_async("distraction_predictor", self.version, features)
+            return self._build_results(features_list, session_durations, probabilities)
+        except InferencePoolBusy:
+            raise
+        except Exception as e:
+            logger.error(f"Error in distraction prediction: {e}")
+            return self._default_results(features_list)
+    
+    def _feature_matrix(self, features_list: List[Dict], session_durations: List[int]) -> np.ndarray:
+        """Unscaled model input for a batch"""
+        return FeatureEngineer.prepare_distraction_features_batch(
+            features_list, session_durations, dtype=np.float64
+        )
+    
+    def predict_matrix(self, features: np.ndarray) -> np.ndarray:
+        """Scale a feature matrix and return the distraction probability of each row"""
+        # Normalize if scaler available
+        if self.feature_scaler:
+            features = (self.compiled_scaler or self.feature_scaler).transform(features)
+        elif hasattr(self, 'feature_mean') and hasattr(self, 'feature_std'):
+            features, _, _ = FeatureEngineer.normalize_features(
+                features, self.feature_mean, self.feature_std
+            )
+        
+        model = self.compiled_model or self.model
+        return np.clip(model.predict_proba(features)[:, 1], 0, 1)  # Probability of distraction
+    
+    def _build_results(self, features_list: List[Dict], session_durations: List[int], probabilities) -> List[Dict]:
+        results = []
+        for user_features, duration, probability in zip(features_list, session_durations, probabilities):
+            results.append({
+                "distraction_probability": round(float(probability), 3),
+                "top_trigger": self._identify_trigger(user_features, duration)
+            })
+        return results
+    
+    def _default_results(self, features_list: List[Dict]) -> List[Dict]:
+        return [
+            {
                 "distraction_probability": 0.5,
                 "top_trigger": "unknown"
             }
+            for _ in features_list
+        ]
     
     def _heuristic_prediction(self, features: Dict, session_duration: int) -> float:
         """Heuristic-based distraction prediction"""
@@ -0,0 +1,377 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import connection, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from config.config import settings
+
+
+class InferencePoolBusy(Exception):
+    """No free request slot within INFERENCE_QUEUE_TIMEOUT_SECONDS"""
+
+
+class _Worker:
+    """An inference process and the parent's end of its pipe"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.tasks = set()  # ids of the tasks sent to it and not answered yet
+
+
+class _Task:
+    def __init__(self, future: Future, slot: int, worker: _Worker):
+        self.future = future
+        self.slot = slot
+        self.worker = worker
+
+
+class InferencePool:
+    """
+    Separate processes that host the models and run CPU-bound inference.
+
+    Requests travel through a fixed set of shared-memory slots: the caller
+    copies its feature matrix into a free slot and sends a small message to
+    the least busy worker, which runs the model on the slot and writes the
+    result back into it. The number of slots bounds the work in flight. When
+    all are taken, callers wait up to INFERENCE_QUEUE_TIMEOUT_SECONDS and
+    then get InferencePoolBusy (backpressure) instead of queueing without
+    limit. Each worker has its own pipe, so a crashed worker cannot wedge a
+    lock shared with the others; its tasks fail and it is replaced.
+    """
+
+    def __init__(self, workers: int = None, slots: int = None, slot_bytes: int = None):
+        self.n_workers = max(1, workers or settings.INFERENCE_WORKERS)
+        self.slot_bytes = slot_bytes or settings.INFERENCE_SLOT_BYTES
+        n_slots = max(1, slots or settings.INFERENCE_QUEUE_SIZE)
+
+        self._ctx = multiprocessing.get_context("spawn")  # never fork a threaded web worker
+        self._slots = [shared_memory.SharedMemory(create=True, size=self.slot_bytes) for _ in range(n_slots)]
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for slot in range(n_slots):
+            self._free.put(slot)
+
+        self._tasks: Dict[int, _Task] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._workers: List[_Worker] = []
+        self._closed = False
+        self.restarts = 0
+
+        for _ in range(self.n_workers):
+            self._start_worker()
+        self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+        self._collector.start()
+        logger.info(f"✅ Inference pool started ({self.n_workers} workers, {n_slots} slots of {self.slot_bytes // 1024}KB)")
+
+    def _start_worker(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=([slot.name for slot in self._slots], child_conn),
+            name="inference-worker",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self._workers.append(_Worker(process, parent_conn))
+
+    # -- caller side -------------------------------------------------------
+
+    def _acquire_slot(self) -> int:
+        try:
+            return self._free.get(timeout=settings.INFERENCE_QUEUE_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise InferencePoolBusy("Inference pool is busy, try again shortly")
+
+    async def _acquire_slot_async(self) -> int:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            # Wait off the event loop
+            return await asyncio.to_thread(self._acquire_slot)
+
+    def _submit(self, slot: int, kind: str, version: Optional[str], payload) -> Tuple[int, Future]:
+        """Send a task for a slot the caller holds; the slot is released once the result is read"""
+        if isinstance(payload, np.ndarray):
+            # Matrices go through the slot; only their shape and dtype are pickled
+            view = np.ndarray(payload.shape, dtype=payload.dtype, buffer=self._slots[slot].buf)
+            view[...] = payload
+            array_spec, payload = (payload.shape, payload.dtype.str), None
+        else:
+            array_spec = None
+
+        future = Future()
+        task_id = next(self._ids)
+        with self._lock:
+            worker = min(self._workers, key=lambda w: len(w.tasks))
+            worker.tasks.add(task_id)
+            self._tasks[task_id] = _Task(future, slot, worker)
+        try:
+            with worker.send_lock:
+                worker.conn.send((task_id, kind, version, slot, array_spec, payload))
+        except (OSError, EOFError) as e:
+            # The worker just died; the collector replaces it
+            self._finish(task_id, error=f"Inference worker unavailable: {e}")
+        return task_id, future
+
+    def _chunks(self, features: np.ndarray) -> List[np.ndarray]:
+        """Split a matrix into row blocks that each fit in one slot"""
+        features = np.ascontiguousarray(features)
+        row_bytes = max(1, features[:1].nbytes)
+        rows_per_slot = max(1, self.slot_bytes // row_bytes)
+        if len(features) <= rows_per_slot:
+            return [features]
+        return [features[start:start + rows_per_slot] for start in range(0, len(features), rows_per_slot)]
+
+    def _wait(self, tasks: List[Tuple[int, Future]]) -> List:
+        """Results of submitted tasks; on timeout their workers are restarted"""
+        deadline = time.monotonic() + settings.INFERENCE_TIMEOUT_SECONDS
+        try:
+            return [future.result(timeout=max(0.0, deadline - time.monotonic())) for _, future in tasks]
+        except FutureTimeoutError:
+            self._abandon([task_id for task_id, _ in tasks])
+            raise TimeoutError(f"Inference did not finish within {settings.INFERENCE_TIMEOUT_SECONDS:g}s")
+
+    def run(self, kind: str, version: Optional[str], features: np.ndarray) -> np.ndarray:
+        """Run a model on a feature matrix in a worker (blocking)"""
+        tasks = []
+        for chunk in self._chunks(features):
+            tasks.append(self._submit(self._acquire_slot(), kind, version, chunk))
+        results = self._wait(tasks)
+        return results[0] if len(results) == 1 else np.concatenate(results)
+
+    async def run_async(self, kind: str, version: Optional[str], features: np.ndarray) -> np.ndarray:
+        """Run a model on a feature matrix in a worker without blocking the event loop"""
+        tasks = []
+        for chunk in self._chunks(features):
+            tasks.append(self._submit(await self._acquire_slot_async(), kind, version, chunk))
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(asyncio.wrap_future(future) for _, future in tasks)),
+                timeout=settings.INFERENCE_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            self._abandon([task_id for task_id, _ in tasks])
+            raise TimeoutError(f"Inference did not finish within {settings.INFERENCE_TIMEOUT_SECONDS:g}s")
+        return results[0] if len(results) == 1 else np.concatenate(results)
+
+    def run_sentiment(self, texts: List[str]) -> List[tuple]:
+        """One sentiment forward pass in a worker; returns (label, probability) per text"""
+        return self._wait([self._submit(self._acquire_slot(), "sentiment", None, list(texts))])[0]
+
+    def _abandon(self, task_ids: List[int]):
+        """Restart the workers still holding these tasks; a hung worker would otherwise keep their slots forever"""
+        with self._lock:
+            stuck = {self._tasks[task_id].worker for task_id in task_ids if task_id in self._tasks}
+        for worker in stuck:
+            logger.warning(f"⚠️ Inference worker {worker.process.pid} timed out, restarting it")
+            worker.process.terminate()
+            self._replace_worker(worker, reason="Inference worker timed out")
+
+    # -- result handling ---------------------------------------------------
+
+    def _finish(self, task_id: int, result=None, error: Optional[str] = None):
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            if task is not None:
+                task.worker.tasks.discard(task_id)
+        if task is None:
+            return
+        if error is None and isinstance(result, tuple) and len(result) == 2 and result[0] == "__slot__":
+            shape, dtype = result[1]
+            result = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._slots[task.slot].buf).copy()
+        self._free.put(task.slot)
+        if task.future.cancelled():
+            return
+        if error is None:
+            task.future.set_result(result)
+        else:
+            task.future.set_exception(RuntimeError(error))
+
+    def _collect(self):
+        """Read results from all workers; replace workers whose pipe closes"""
+        while not self._closed:
+            with self._lock:
+                workers = {worker.conn: worker for worker in self._workers}
+            for conn in connection.wait(list(workers), timeout=0.5):
+                worker = workers[conn]
+                try:
+                    task_id, value, error = conn.recv()
+                except (EOFError, OSError):
+                    self._replace_worker(worker)
+                    continue
+                self._finish(task_id, result=value, error=error)
+
+    def _replace_worker(self, worker: _Worker, reason: str = "Inference worker crashed"):
+        """Fail the tasks of a dead (or terminated) worker and start a new one"""
+        with self._lock:
+            if worker not in self._workers:
+                return
+            self._workers.remove(worker)
+            lost = list(worker.tasks)
+        worker.conn.close()
+        worker.process.join(timeout=1)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join(timeout=1)
+        if self._closed:
+            return
+        logger.warning(f"⚠️ Inference worker {worker.process.pid} exited with code {worker.process.exitcode}, restarting it")
+        for task_id in lost:
+            # The worker is gone, so nothing else can write to its slot
+            self._finish(task_id, error=reason)
+        self.restarts += 1
+        self._start_worker()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            workers = list(self._workers)
+        return {
+            'workers': self.n_workers,
+            'alive_workers': sum(worker.process.is_alive() for worker in workers),
+            'restarts': self.restarts,
+            'slots': len(self._slots),
+            'free_slots': self._free.qsize(),
+            'in_flight': len(self._tasks),
+        }
+
+    def close(self):
+        self._closed = True
+        self._collector.join(timeout=5)
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except (OSError, EOFError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        with self._lock:
+            pending = list(self._tasks)
+        for task_id in pending:
+            self._finish(task_id, error="Inference pool closed")
+        for slot in self._slots:
+            slot.close()
+            slot.unlink()
+        logger.info("Inference pool closed")
+
+
+# -- worker side -----------------------------------------------------------
+
+_MODEL_CLASSES = {
+    "pomodoro_recommender": ("inference.pomodoro_recommender", "PomodoroRecommender"),
+    "distraction_predictor": ("inference.distraction_predictor", "DistractionPredictor"),
+}
+
+
+# Versions of one model a worker keeps loaded (old and new overlap during a hot reload)
+_VERSIONS_PER_MODEL = 2
+
+
+def _load_predictor(kind: str, version: Optional[str]):
+    """Load exactly the requested version; never answer with a different one"""
+    import importlib
+    module_name, class_name = _MODEL_CLASSES[kind]
+    predictor = getattr(importlib.import_module(module_name), class_name)(version=version)
+    if predictor.version != version or (version is not None and predictor.model is None):
+        raise RuntimeError(f"Could not load {kind} version {version}")
+    return predictor
+
+
+def _worker_main(slot_names: List[str], conn):
+    """Inference worker loop: load models on demand and run tasks until a None arrives"""
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    predictors = {}
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        task_id, kind, version, slot, array_spec, payload = message
+        try:
+            if kind == "sentiment":
+                from inference.sentiment_analyzer import SentimentAnalyzer
+                analyzer = SentimentAnalyzer()
+                analyzer._load_model()
+                conn.send((task_id, analyzer._forward_batch(payload), None))
+                continue
+
+            predictor = predictors.get((kind, version))
+            if predictor is None:
+                # First use, or the web worker has hot-reloaded (or rolled back) to another version
+                predictor = _load_predictor(kind, version)
+                loaded = [key for key in predictors if key[0] == kind]
+                for key in loaded[:max(0, len(loaded) - _VERSIONS_PER_MODEL + 1)]:
+                    del predictors[key]
+                predictors[(kind, version)] = predictor
+            shape, dtype = array_spec
+            features = np.ndarray(shape, dtype=np.dtype(dtype), buffer=slots[slot].buf)
+            result = np.ascontiguousarray(predictor.predict_matrix(features.copy()))
+
+            if result.nbytes <= slots[slot].size:
+                # Write the result over the input in the same slot
+                np.ndarray(result.shape, dtype=result.dtype, buffer=slots[slot].buf)[...] = result
+                conn.send((task_id, ("__slot__", (result.shape, result.dtype.str)), None))
+            else:
+                conn.send((task_id, result, None))
+        except Exception as e:
+            conn.send((task_id, None, str(e) or type(e).__name__))
+
+    for shm in slots:
+        shm.close()
+
+
+# One pool per (web worker) process
+_pool: Optional[InferencePool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def start_inference_pool() -> Optional[InferencePool]:
+    """Start this process's inference pool (no-op when INFERENCE_WORKERS is 0)"""
+    global _pool, _pool_pid
+    if settings.INFERENCE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = InferencePool()
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def get_inference_pool() -> Optional[InferencePool]:
+    """The pool of this process, or None when inference runs in-process"""
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    return None
+
+
+def close_inference_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+        _pool_pid = None
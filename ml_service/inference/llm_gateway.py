@@ -0,0 +1,588 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from loguru import logger
+from config.config import settings
+from utils.lazy_imports import module_available
+from utils.circuit_breaker import CircuitBreaker
+
+# The LLM SDKs are slow to import, so they are only imported when a provider is created
+OPENAI_AVAILABLE = module_available("openai")
+if not OPENAI_AVAILABLE:
+    logger.warning("OpenAI library not available")
+
+GEMINI_AVAILABLE = module_available("google.generativeai")
+if not GEMINI_AVAILABLE:
+    logger.warning("Google Generative AI library not available")
+
+# Gemini models tried after GEMINI_MODEL when a model name is rejected
+GEMINI_FALLBACK_MODELS = ["gemini-2.5-flash", "gemini-2.0-flash", "gemini-flash-latest"]
+
+
+class LLMError(Exception):
+    """An LLM call failed"""
+
+
+class LLMBlocked(LLMError):
+    """The provider's safety filters blocked the response"""
+
+
+class LLMTimeout(LLMError):
+    """No provider answered before the deadline"""
+
+
+class LLMUnavailable(LLMError):
+    """Every configured provider's circuit is open"""
+
+
+class LLMRequest:
+    def __init__(self, system: str, prompt: str, max_tokens: int, temperature: float,
+                 safety_threshold: Optional[str] = None, timeout: float = None):
+        self.system = system
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.safety_threshold = safety_threshold  # Gemini HarmBlockThreshold name, None = API defaults
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+
+    def fingerprint(self) -> str:
+        """Hash of everything that determines the completion"""
+        parts = [self.system, self.prompt, str(self.max_tokens), str(self.temperature), str(self.safety_threshold)]
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class LLMResult:
+    def __init__(self, text: str, provider: str, model: str, latency_ms: float, hedged: bool = False):
+        self.text = text
+        self.provider = provider
+        self.model = model
+        self.latency_ms = latency_ms
+        self.hedged = hedged
+
+
+def clean_api_key(key: Optional[str], placeholder: str) -> Optional[str]:
+    """Strip quotes and whitespace; None for empty or placeholder keys"""
+    if not key:
+        return None
+    key = key.strip().strip('"').strip("'")
+    if key == "" or key == placeholder:
+        return None
+    return key
+
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - asyncio.get_running_loop().time()
+    if remaining <= 0:
+        raise LLMTimeout("LLM deadline exceeded")
+    return remaining
+
+
+def _gemini_safety_settings(threshold: Optional[str]):
+    if not threshold:
+        return None
+    try:
+        from google.generativeai.types import HarmCategory, HarmBlockThreshold
+        block = getattr(HarmBlockThreshold, threshold, HarmBlockThreshold.BLOCK_ONLY_HIGH)
+        return [
+            {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": block},
+            {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": block},
+            {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": block},
+            {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": block},
+        ]
+    except Exception as e:
+        logger.debug(f"Could not set safety settings: {e}, using defaults")
+        return None
+
+
+async def _iterate_until(iterator, deadline: float):
+    """Iterate an async stream, raising asyncio.TimeoutError if it runs past the deadline"""
+    iterator = iterator.__aiter__()
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), timeout=_remaining(deadline))
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+def _gemini_text(response, allow_empty: bool = False) -> str:
+    """Text of a Gemini response (or stream chunk); raises LLMBlocked when the safety filters stopped it"""
+    if response.candidates and len(response.candidates) > 0:
+        candidate = response.candidates[0]
+        # finish_reason 2 = SAFETY (can be an enum or an int)
+        finish_reason = getattr(candidate, 'finish_reason', None)
+        is_blocked = False
+        if finish_reason is not None:
+            if hasattr(finish_reason, '__int__'):
+                is_blocked = int(finish_reason) == 2
+            else:
+                is_blocked = finish_reason == 2
+            if not is_blocked and hasattr(finish_reason, 'name'):
+                is_blocked = finish_reason.name == 'SAFETY'
+        if is_blocked:
+            raise LLMBlocked("Response blocked by safety filters")
+
+    try:
+        text = response.text.strip()
+    except ValueError as text_error:
+        text = ""
+        if response.candidates and len(response.candidates) > 0:
+            candidate = response.candidates[0]
+            if candidate.content and candidate.content.parts:
+                text = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text')).strip()
+        if not text and not allow_empty:
+            raise LLMError(f"Could not extract text from Gemini response: {text_error}")
+    if not text and not allow_empty:
+        raise LLMError("Gemini returned an empty message")
+    return text
+
+
+class GeminiProvider:
+    """Gemini through persistent GenerativeModel clients, one per model"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self.models = list(dict.fromkeys([model] + GEMINI_FALLBACK_MODELS))
+        self._clients = {}
+
+    @property
+    def model(self) -> str:
+        return self.models[0]
+
+    def _client(self, model: str):
+        client = self._clients.get(model)
+        if client is None:
+            client = self._clients[model] = self._genai.GenerativeModel(model)
+        return client
+
+    async def generate(self, request: LLMRequest, deadline: float) -> Tuple[str, str]:
+        last_error = None
+        for model in list(self.models):
+            try:
+                response = await self._client(model).generate_content_async(
+                    f"{request.system}\n\n{request.prompt}",
+                    generation_config={"temperature": request.temperature, "max_output_tokens": request.max_tokens},
+                    safety_settings=_gemini_safety_settings(request.safety_threshold),
+                    request_options={"timeout": _remaining(deadline)},
+                )
+                text = _gemini_text(response)
+            except LLMError:
+                raise
+            except Exception as e:
+                # Most likely a retired model name; try the next one
+                logger.warning(f"Gemini model {model} failed: {e}")
+                last_error = e
+                continue
+
+            if model != self.models[0]:
+                # Keep using the model that works
+                self.models.remove(model)
+                self.models.insert(0, model)
+                logger.info(f"✅ Using alternative Gemini model: {model}")
+            return text, model
+        raise LLMError(f"All Gemini models failed: {last_error}")
+
+    async def stream(self, request: LLMRequest, deadline: float) -> AsyncIterator[str]:
+        response = await self._client(self.model).generate_content_async(
+            f"{request.system}\n\n{request.prompt}",
+            generation_config={"temperature": request.temperature, "max_output_tokens": request.max_tokens},
+            safety_settings=_gemini_safety_settings(request.safety_threshold),
+            request_options={"timeout": _remaining(deadline)},
+            stream=True,
+        )
+        async for chunk in response:
+            text = _gemini_text(chunk, allow_empty=True)
+            if text:
+                yield text
+
+
+class OpenAIProvider:
+    """OpenAI through one AsyncOpenAI client (its HTTP connection pool is reused)"""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str):
+        from openai import AsyncOpenAI
+        # Retries would overrun the deadline; the gateway hedges instead
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.model = model
+
+    async def generate(self, request: LLMRequest, deadline: float) -> Tuple[str, str]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": request.system},
+                {"role": "user", "content": request.prompt},
+            ],
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            timeout=_remaining(deadline),
+        )
+        text = (response.choices[0].message.content or "").strip()
+        if not text:
+            raise LLMError("OpenAI returned an empty message")
+        return text, self.model
+
+    async def stream(self, request: LLMRequest, deadline: float) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": request.system},
+                {"role": "user", "content": request.prompt},
+            ],
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            timeout=_remaining(deadline),
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class LLMGateway:
+    """
+    Single entry point for LLM calls.
+
+    Providers and their clients are created once per process and all calls
+    run on the gateway's own event loop thread, so the async SDK clients
+    keep their connections. Every call has a deadline (LLM_TIMEOUT_SECONDS).
+    With LLM_HEDGE_DELAY_MS set and both providers configured, a primary
+    call that has not answered (or has failed) by then is raced against the
+    backup provider and the first answer wins. Each provider has a circuit
+    breaker: while the primary's circuit is open, calls go to the other
+    provider, and with no provider available they fail at once
+    (LLMUnavailable) so callers can fall back to the rule-based generators.
+    Works from async code (generate) and from worker threads (generate_sync).
+    """
+
+    def __init__(self):
+        self.providers: Dict[str, object] = {}
+        self.primary: Optional[str] = None
+        self.backup: Optional[str] = None
+        self.fallbacks: List[str] = []
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats_by_provider: Dict[str, Dict] = {}
+        self.hedged = 0
+        self.coalesced = 0
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._create_providers()
+
+    def _create_providers(self):
+        gemini_key = clean_api_key(settings.GEMINI_API_KEY, "your_gemini_api_key_here")
+        openai_key = clean_api_key(settings.OPENAI_API_KEY, "your_openai_api_key_here")
+
+        if GEMINI_AVAILABLE and gemini_key:
+            try:
+                self.providers["gemini"] = GeminiProvider(gemini_key, settings.GEMINI_MODEL)
+                logger.info(f"✅ Gemini client initialized (model {settings.GEMINI_MODEL})")
+            except Exception as e:
+                logger.warning(f"⚠️ Gemini initialization failed: {e}")
+        if OPENAI_AVAILABLE and openai_key:
+            try:
+                self.providers["openai"] = OpenAIProvider(openai_key, settings.OPENAI_MODEL)
+                logger.info(f"✅ OpenAI client initialized (model {settings.OPENAI_MODEL})")
+            except Exception as e:
+                logger.warning(f"⚠️ OpenAI initialization failed: {e}")
+
+        preference = settings.LLM_PROVIDER.lower()
+        if preference == "auto":
+            order = ["gemini", "openai"]
+        else:
+            order = [preference]
+        self.primary = next((name for name in order if name in self.providers), None)
+        # Hedging is an explicit opt-in to using the other provider as well
+        others = [name for name in self.providers if name != self.primary]
+        # Used when the primary's circuit is open
+        self.fallbacks = others if self.primary else []
+        if self.primary and others and settings.LLM_HEDGE_DELAY_MS > 0:
+            self.backup = others[0]
+
+        for name in self.providers:
+            self.breakers[name] = CircuitBreaker(name)
+            self.stats_by_provider[name] = {'calls': 0, 'errors': 0, 'timeouts': 0, 'cancelled': 0, 'wins': 0, 'total_ms': 0.0}
+        if self.primary:
+            logger.info(f"LLM gateway: primary {self.primary}" + (f", hedging with {self.backup}" if self.backup else ""))
+
+    @property
+    def available(self) -> bool:
+        return self.primary is not None
+
+    # -- event loop --------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True)
+                self._thread.start()
+                self._loop = loop
+        return self._loop
+
+    def submit(self, request: LLMRequest) -> Future:
+        """
+        Schedule a request on the gateway loop.
+
+        Identical requests (same provider, model and prompt fingerprint) made
+        while one is in flight share its upstream call and result
+        (LLM_SINGLEFLIGHT). Each caller still gets its own future, so a
+        caller that gives up does not cancel the call for the others.
+        """
+        if not self.available:
+            raise LLMError("No LLM provider configured")
+        if not settings.LLM_SINGLEFLIGHT:
+            return asyncio.run_coroutine_threadsafe(self._generate(request), self._ensure_loop())
+
+        key = (self.primary, self.providers[self.primary].model, request.fingerprint())
+        with self._inflight_lock:
+            shared = self._inflight.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._inflight[key] = asyncio.run_coroutine_threadsafe(self._generate(request), self._ensure_loop())
+            else:
+                self.coalesced += 1
+        if leader:
+            # Outside the lock: the callback runs right here if the call has already finished
+            shared.add_done_callback(lambda _: self._forget(key, shared))
+
+        mine = Future()
+        shared.add_done_callback(lambda done: _copy_outcome(done, mine))
+        return mine
+
+    def _forget(self, key: tuple, future: Future):
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def generate(self, system: str, prompt: str, max_tokens: int, temperature: float,
+                       safety_threshold: Optional[str] = None, timeout: float = None) -> LLMResult:
+        """Generate a completion without blocking the caller's event loop"""
+        request = LLMRequest(system, prompt, max_tokens, temperature, safety_threshold, timeout)
+        return await asyncio.wrap_future(self.submit(request))
+
+    def generate_sync(self, system: str, prompt: str, max_tokens: int, temperature: float,
+                      safety_threshold: Optional[str] = None, timeout: float = None) -> LLMResult:
+        """Blocking variant of generate() for worker threads"""
+        request = LLMRequest(system, prompt, max_tokens, temperature, safety_threshold, timeout)
+        return self.submit(request).result(timeout=request.timeout + 1)
+
+    async def stream(self, system: str, prompt: str, max_tokens: int, temperature: float,
+                     safety_threshold: Optional[str] = None, timeout: float = None) -> AsyncIterator[str]:
+        """
+        Yield the completion's text chunks as the provider produces them.
+
+        Streams are neither hedged nor coalesced. A provider that fails
+        before its first chunk is replaced by the next one whose circuit
+        allows it; a failure after that raises from the iterator. Closing
+        the iterator early cancels the upstream call.
+        """
+        if not self.available:
+            raise LLMError("No LLM provider configured")
+        request = LLMRequest(system, prompt, max_tokens, temperature, safety_threshold, timeout)
+        caller_loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        def push(item):
+            caller_loop.call_soon_threadsafe(chunks.put_nowait, item)
+
+        future = asyncio.run_coroutine_threadsafe(self._stream(request, push), self._ensure_loop())
+        try:
+            while True:
+                kind, value = await chunks.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    # -- calls -------------------------------------------------------------
+
+    async def _call(self, name: str, request: LLMRequest, deadline: float) -> LLMResult:
+        """One provider call; the caller has already been let through by its breaker"""
+        stats = self.stats_by_provider[name]
+        breaker = self.breakers[name]
+        stats['calls'] += 1
+        started = time.perf_counter()
+
+        def elapsed_ms() -> float:
+            return (time.perf_counter() - started) * 1000
+
+        try:
+            text, model = await asyncio.wait_for(
+                self.providers[name].generate(request, deadline), timeout=_remaining(deadline)
+            )
+        except (asyncio.TimeoutError, LLMTimeout):
+            stats['timeouts'] += 1
+            breaker.record(False, elapsed_ms())
+            raise LLMTimeout(f"{name} did not answer within {request.timeout:g}s")
+        except asyncio.CancelledError:
+            # Lost a hedged race
+            stats['cancelled'] += 1
+            breaker.release()
+            raise
+        except LLMBlocked:
+            # The provider is healthy, it just refused this prompt
+            stats['errors'] += 1
+            breaker.record(True, elapsed_ms())
+            raise
+        except Exception:
+            stats['errors'] += 1
+            breaker.record(False, elapsed_ms())
+            raise
+        latency_ms = elapsed_ms()
+        stats['total_ms'] += latency_ms
+        breaker.record(True, latency_ms)
+        return LLMResult(text, name, model, round(latency_ms, 1))
+
+    async def _stream(self, request: LLMRequest, push):
+        """Relay one streamed completion through push(("chunk" | "end" | "error", value))"""
+        deadline = asyncio.get_running_loop().time() + request.timeout
+        candidates = [self.primary] + self.fallbacks
+        last_error: Optional[BaseException] = None
+        while candidates:
+            name = self._pick(candidates)
+            if name is None:
+                break
+            candidates.remove(name)
+            stats = self.stats_by_provider[name]
+            breaker = self.breakers[name]
+            stats['calls'] += 1
+            started = time.perf_counter()
+            sent = False
+            try:
+                async for text in _iterate_until(self.providers[name].stream(request, deadline), deadline):
+                    push(("chunk", text))
+                    sent = True
+            except asyncio.CancelledError:
+                stats['cancelled'] += 1
+                breaker.release()
+                raise
+            except Exception as e:
+                timed_out = isinstance(e, (asyncio.TimeoutError, LLMTimeout))
+                stats['timeouts' if timed_out else 'errors'] += 1
+                breaker.record(isinstance(e, LLMBlocked), (time.perf_counter() - started) * 1000)
+                last_error = LLMTimeout(f"{name} did not finish within {request.timeout:g}s") if timed_out else e
+                if sent:
+                    # Part of the answer is already out; do not mix in another provider's
+                    push(("error", last_error))
+                    return
+                continue
+
+            latency_ms = (time.perf_counter() - started) * 1000
+            stats['total_ms'] += latency_ms
+            stats['wins'] += 1
+            breaker.record(True, latency_ms)
+            push(("end", None))
+            return
+        push(("error", last_error or LLMUnavailable("All LLM provider circuits are open")))
+
+    def _pick(self, candidates: List[str]) -> Optional[str]:
+        """First provider whose circuit lets a call through"""
+        for name in candidates:
+            if self.breakers[name].allow():
+                return name
+        return None
+
+    async def _generate(self, request: LLMRequest) -> LLMResult:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + request.timeout
+        candidates = [self.primary] + self.fallbacks
+        lead = self._pick(candidates)
+        if lead is None:
+            raise LLMUnavailable("All LLM provider circuits are open")
+        tasks = [asyncio.ensure_future(self._call(lead, request, deadline))]
+        try:
+            if self.backup is not None:
+                done, _ = await asyncio.wait(tasks, timeout=settings.LLM_HEDGE_DELAY_MS / 1000)
+                if not done or tasks[0].exception() is not None:
+                    hedge = self._pick([name for name in candidates if name != lead])
+                    if hedge is not None:
+                        self.hedged += 1
+                        logger.info(f"Hedging slow or failed {lead} call with {hedge}")
+                        tasks.append(asyncio.ensure_future(self._call(hedge, request, deadline)))
+
+            # Every call ends by the deadline (LLMTimeout), so this wait is bounded too
+            pending = set(tasks)
+            errors: List[BaseException] = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        result = task.result()
+                        result.hedged = len(tasks) > 1
+                        self.stats_by_provider[result.provider]['wins'] += 1
+                        return result
+                    errors.append(task.exception())
+            raise errors[0]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict:
+        providers = {}
+        for name, stats in self.stats_by_provider.items():
+            succeeded = stats['calls'] - stats['errors'] - stats['timeouts'] - stats['cancelled']
+            providers[name] = {
+                **{key: value for key, value in stats.items() if key != 'total_ms'},
+                'model': self.providers[name].model,
+                'avg_ms': round(stats['total_ms'] / succeeded, 1) if succeeded > 0 else None,
+            }
+        return {
+            'primary': self.primary,
+            'backup': self.backup,
+            'hedged': self.hedged,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._inflight),
+            'providers': providers,
+            'breakers': {name: breaker.status() for name, breaker in self.breakers.items()},
+        }
+
+
+def _copy_outcome(source: Future, target: Future):
+    """Resolve one caller's future from the shared call"""
+    try:
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+    except InvalidStateError:
+        pass  # the caller cancelled its own future
+
+
+# One gateway per process (clients and the loop thread do not survive a fork)
+_gateway: Optional[LLMGateway] = None
+_gateway_pid: Optional[int] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway, _gateway_pid
+    if _gateway is None or _gateway_pid != os.getpid():
+        with _gateway_lock:
+            if _gateway is None or _gateway_pid != os.getpid():
+                _gateway = LLMGateway()
+                _gateway_pid = os.getpid()
+    return _gateway
@@ -0,0 +1,154 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from loguru import logger
+from config.config import settings
+from utils.model_versioning import ModelVersioning
+
+
+class ReloadTarget:
+    """A hot-reloadable predictor: how to build it, read the live instance and swap it"""
+
+    def __init__(self, model_name: str, factory: Callable, current: Callable, swap: Callable):
+        self.model_name = model_name
+        self.factory = factory
+        self.current = current
+        self.swap = swap
+        self.last_result: Optional[Dict] = None
+
+
+class ModelReloader:
+    """
+    Swaps in newly registered model versions without a restart.
+
+    A reload builds a fresh predictor (which loads the current version from
+    versions.json), runs its smoke test and only then replaces the router
+    singleton with a single reference assignment. Requests already holding
+    the old instance finish on it; new requests get the new one, so there is
+    no pause. A watcher thread triggers reloads when versions.json changes.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = settings.MODEL_RELOAD_INTERVAL_SECONDS if interval is None else interval
+        self.targets: Dict[str, ReloadTarget] = {}
+        self.version_file = os.path.join(settings.MODEL_DIR, "versions.json")
+
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamp = None
+
+    def register(self, model_name: str, factory: Callable, current: Callable, swap: Callable):
+        """Register a predictor; current() returns the live instance (or None), swap(new) installs one"""
+        self.targets[model_name] = ReloadTarget(model_name, factory, current, swap)
+
+    def reload(self, model_name: str = None, force: bool = False) -> Dict[str, Dict]:
+        """Reload one or all registered models whose current version changed (or all, with force)"""
+        if model_name is not None and model_name not in self.targets:
+            raise KeyError(model_name)
+        targets = [self.targets[model_name]] if model_name else list(self.targets.values())
+
+        with self._reload_lock:
+            versioning = ModelVersioning()
+            return {target.model_name: self._reload_target(target, versioning, force) for target in targets}
+
+    def _reload_target(self, target: ReloadTarget, versioning: ModelVersioning, force: bool) -> Dict:
+        live = target.current()
+        registered = versioning.get_current_version(target.model_name)
+        previous = getattr(live, "version", None)
+        result = {'previous_version': previous, 'version': registered, 'at': datetime.now().isoformat()}
+
+        if live is None:
+            # Never used in this process yet; the first request loads the current version
+            result['status'] = 'not_loaded'
+            return result
+        if registered is None or (registered == previous and not force):
+            result['status'] = 'unchanged'
+            return result
+
+        started = time.perf_counter()
+        try:
+            candidate = target.factory()
+            if not candidate.smoke_test():
+                raise ValueError("smoke test failed")
+        except Exception as e:
+            logger.error(f"❌ Reload of {target.model_name} version {registered} failed, keeping {previous}: {e}")
+            result.update(status='failed', error=str(e))
+            target.last_result = result
+            return result
+
+        target.swap(candidate)
+        result.update(status='reloaded', version=candidate.version, load_ms=round((time.perf_counter() - started) * 1000, 1))
+        target.last_result = result
+        logger.info(f"🔄 Swapped in {target.model_name} version {candidate.version} (was {previous})")
+        return result
+
+    def _version_file_stamp(self):
+        try:
+            stat = os.stat(self.version_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def check(self) -> Optional[Dict[str, Dict]]:
+        """Reload if versions.json changed since the last check"""
+        stamp = self._version_file_stamp()
+        if stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        return self.reload()
+
+    def start(self):
+        """Start watching versions.json (no-op when the interval is 0)"""
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stamp = self._version_file_stamp()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+        self._thread.start()
+        logger.info(f"✅ Model reloader watching {self.version_file} every {self.interval:g}s")
+
+    def _run(self):
+        # A freshly forked worker may hold models preloaded before a newer version was registered
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Error checking for new model versions: {e}")
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking for new model versions: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self) -> Dict[str, Dict]:
+        versioning = ModelVersioning()
+        return {
+            name: {
+                'loaded_version': getattr(target.current(), "version", None),
+                'registered_version': versioning.get_current_version(name),
+                'last_reload': target.last_result,
+            }
+            for name, target in self.targets.items()
+        }
+
+
+_reloader: Optional[ModelReloader] = None
+
+
+def get_model_reloader() -> ModelReloader:
+    """Return the process-wide model reloader"""
+    global _reloader
+    if _reloader is None:
+        _reloader = ModelReloader()
+    return _reloader
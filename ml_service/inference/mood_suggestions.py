@@ -2,41 +2,58 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Dict, List
+import asyncio
+from typing import Dict, List, Optional
 import random
 import re
 from datetime import datetime
+import pandas as pd
 from loguru import logger
-from config.config import settings
 from utils.data_loaders import DataLoader
+from utils.async_data_loaders import AsyncDataLoader
 from inference.sentiment_analyzer import SentimentAnalyzer
+from inference.sentiment_batcher import analyze_sentiment_async
 from inference.coach_service import CoachService
+from utils.executors import run_blocking, ExecutorBusy
+from inference.llm_gateway import LLMBlocked, LLMUnavailable
+from utils.response_cache import response_cache, mood_cache_key, bucket_labels
 
-# Try importing OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+MOOD_SYSTEM_PROMPT = """You are a compassionate, empathetic AI wellness coach for FocusWave. 
+- CRITICAL: Generate UNIQUE, DIFFERENT suggestions each time - avoid generic or repetitive responses
+- Provide personalized, actionable suggestions based on the SPECIFIC mood and description provided
+- Be supportive, understanding, and encouraging
+- Give 3-5 specific, practical suggestions that are RELEVANT to what the user actually wrote
+- Include insights about their mood pattern if relevant, but make them PERSONALIZED
+- Suggest 2-3 concrete activities they can do right now - vary these based on context
+- Provide a warm, positive affirmation that feels GENUINE and SPECIFIC
+- Keep responses concise and helpful
+- Be ADHD-friendly (simple, clear, actionable)
+- IMPORTANT: If they mention specific topics (work, study, relationships, sleep, etc.), address those directly in your suggestions
+- Vary your language and approach - don't use the same phrases every time
 
-# Try importing Gemini
-try:
-    import google.generativeai as genai
-    from google.generativeai.types import HarmCategory, HarmBlockThreshold
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    genai = None
-    HarmCategory = None
-    HarmBlockThreshold = None
+Format your response as:
+SUGGESTIONS:
+1. [suggestion]
+2. [suggestion]
+3. [suggestion]
+
+INSIGHT:
+[insight about their mood]
+
+ACTIVITIES:
+1. [activity]
+2. [activity]
+
+AFFIRMATION:
+[positive affirmation]"""
 
 class MoodSuggestionsService:
     def __init__(self):
         self.data_loader = DataLoader()
+        self.async_data_loader = AsyncDataLoader()
         self.sentiment_analyzer = SentimentAnalyzer()
         self.coach_service = CoachService()
-        self.openai_client = self.coach_service.openai_client
-        self.gemini_client = self.coach_service.gemini_client
+        self.llm = self.coach_service.llm
         self.llm_provider = self.coach_service.llm_provider
     
     def get_mood_suggestions(self, user_id: int, mood: str, note: str = "") -> Dict:
@@ -52,29 +69,78 @@ class MoodSuggestionsService:
                 "sentiment_analysis": Dict  # Sentiment analysis of the note
             }
         """
+        # Get user context and recent mood history for personalized suggestions
+        user_features = self.data_loader.get_user_features(user_id)
+        moods = self.data_loader.get_user_moods(user_id=user_id, days=7)
+        return self.suggestions_from_data(mood, note, user_features, moods)
+    
+    async def get_mood_suggestions_async(self, user_id: int, mood: str, note: str = "") -> Dict:
+        """Async variant of get_mood_suggestions() that loads user context without blocking the event loop"""
+        user_features, moods, sentiment_result = await asyncio.gather(
+            self.async_data_loader.get_user_features(user_id),
+            self.async_data_loader.get_user_moods(user_id=user_id, days=7),
+            self._analyze_note_async(note),
+        )
+        if self.llm.available:
+            # Waiting on the LLM takes seconds, so this runs on the bounded llm executor
+            try:
+                return await run_blocking("llm", self.suggestions_from_data, mood, note, user_features, moods, sentiment_result)
+            except ExecutorBusy as e:
+                logger.warning(f"⚠️ {e}, using rule-based suggestions")
+        return self.suggestions_from_data(mood, note, user_features, moods, sentiment_result, use_llm=False)
+    
+    async def _analyze_note_async(self, note: str) -> Optional[Dict]:
+        """
+        Sentiment of the note through the batching queue (None without a note).
+
+        On error the note is retried once on the cpu executor, then scored
+        neutral, so the model never runs on the event loop.
+        """
+        if not note:
+            return None
+        try:
+            return await analyze_sentiment_async(note)
+        except Exception as e:
+            logger.error(f"Error in batched sentiment analysis: {e}")
         try:
-            # Analyze sentiment of the note if provided
-            sentiment_result = {
+            return await run_blocking("cpu", self.sentiment_analyzer.analyze, note)
+        except Exception as e:
+            logger.error(f"Error in sentiment analysis: {e}, treating the note as neutral")
+            return {
                 "sentiment_score": 0.0,
                 "label": "neutral"
             }
-            if note:
-                sentiment_result = self.sentiment_analyzer.analyze(note)
-            
-            # Get user context for personalized suggestions
-            user_features = self.data_loader.get_user_features(user_id)
+    
+    def suggestions_from_data(self, mood: str, note: str, user_features: Dict, moods: pd.DataFrame,
+                              sentiment_result: Optional[Dict] = None, use_llm: bool = True) -> Dict:
+        """Generate mood suggestions from already loaded user features and mood logs"""
+        try:
+            # Analyze sentiment of the note if provided (and not analyzed already)
+            if sentiment_result is None:
+                sentiment_result = {
+                    "sentiment_score": 0.0,
+                    "label": "neutral"
+                }
+                if note:
+                    sentiment_result = self.sentiment_analyzer.analyze(note)
             
-            # Get recent mood history for pattern detection
-            moods = self.data_loader.get_user_moods(user_id=user_id, days=7)
+            # Recent mood history for pattern detection
             mood_history = []
             if not moods.empty:
                 mood_history = moods['mood'].tolist()[:5]  # Last 5 moods
             
+            # Without a note the prompt only depends on bucketed features, so a cached response may do
+            cache_key = None
+            if self.llm.available:
+                time_of_day = self._get_time_context(datetime.now().hour)
+                cache_key = mood_cache_key(mood, note, user_features, mood_history, time_of_day)
+            cached = response_cache.get(cache_key) if cache_key else None
+            
             # Generate AI suggestions
-            if self.llm_provider == "gemini" and self.gemini_client:
-                result = self._gemini_mood_suggestions(mood, note, sentiment_result, user_features, mood_history)
-            elif self.llm_provider == "openai" and self.openai_client:
-                result = self._openai_mood_suggestions(mood, note, sentiment_result, user_features, mood_history)
+            if cached is not None:
+                result = cached
+            elif use_llm and self.llm.available:
+                result = self._llm_mood_suggestions(mood, note, sentiment_result, user_features, mood_history, cache_key)
             else:
                 # Enhanced rule-based suggestions
                 result = self._rule_based_mood_suggestions(mood, note, sentiment_result, user_features, mood_history)
@@ -88,191 +154,59 @@ class MoodSuggestionsService:
             # Return fallback suggestions
             return self._get_fallback_suggestions(mood, note)
     
-    def _gemini_mood_suggestions(self, mood: str, note: str, sentiment: Dict, features: Dict, mood_history: List) -> Dict:
-        """Generate mood suggestions using Gemini"""
-        try:
-            prompt = self._build_mood_prompt(mood, note, sentiment, features, mood_history)
-            
-            system_instruction = """You are a compassionate, empathetic AI wellness coach for FocusWave. 
-- CRITICAL: Generate UNIQUE, DIFFERENT suggestions each time - avoid generic or repetitive responses
-- Provide personalized, actionable suggestions based on the SPECIFIC mood and description provided
-- Be supportive, understanding, and encouraging
-- Give 3-5 specific, practical suggestions that are RELEVANT to what the user actually wrote
-- Include insights about their mood pattern if relevant, but make them PERSONALIZED
-- Suggest 2-3 concrete activities they can do right now - vary these based on context
-- Provide a warm, positive affirmation that feels GENUINE and SPECIFIC
-- Keep responses concise and helpful
-- Be ADHD-friendly (simple, clear, actionable)
-- IMPORTANT: If they mention specific topics (work, study, relationships, sleep, etc.), address those directly in your suggestions
-- Vary your language and approach - don't use the same phrases every time"""
-            
-            full_prompt = f"{system_instruction}\n\n{prompt}\n\nFormat your response as:\nSUGGESTIONS:\n1. [suggestion]\n2. [suggestion]\n3. [suggestion]\n\nINSIGHT:\n[insight about their mood]\n\nACTIVITIES:\n1. [activity]\n2. [activity]\n\nAFFIRMATION:\n[positive affirmation]"
-            
-            generation_config = {
-                "temperature": 0.9,  # Increased for more creativity and variety
-                "max_output_tokens": 500,  # Increased for more detailed responses
-            }
-            
-            # Safety settings - DISABLED for wellness content to avoid false positives
-            # Wellness/mental health content often triggers safety filters incorrectly
-            safety_settings = None
-            # Try most permissive settings first, if available
-            if GEMINI_AVAILABLE and HarmCategory and HarmBlockThreshold:
-                try:
-                    # Use BLOCK_NONE for wellness content (most permissive)
-                    # This allows mental health and wellness discussions
-                    if hasattr(HarmBlockThreshold, 'BLOCK_NONE'):
-                        safety_settings = [
-                            {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                            {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                            {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-                            {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH},
-                        ]
-                    else:
-                        # Fallback: Use lowest blocking threshold available
-                        safety_settings = [
-                            {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH},
-                            {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH},
-                            {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH},
-                            {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_ONLY_HIGH},
-                        ]
-                except Exception as safety_err:
-                    logger.debug(f"Could not set safety settings: {safety_err}, using no safety settings")
-                    safety_settings = None
-            
-            try:
-                # Don't pass safety_settings - use API defaults (usually more permissive)
-                # Passing None or omitting it often works better than explicit settings
-                response = self.gemini_client.generate_content(
-                    full_prompt,
-                    generation_config=generation_config
-                )
-                
-                # Check if response was blocked by safety filters
-                # finish_reason 2 = SAFETY (blocked by safety filters)
-                if response.candidates and len(response.candidates) > 0:
-                    candidate = response.candidates[0]
-                    finish_reason = getattr(candidate, 'finish_reason', None)
-                    
-                    # Check if blocked (finish_reason can be enum or int)
-                    is_blocked = False
-                    if finish_reason is not None:
-                        # Handle both enum and integer values
-                        if hasattr(finish_reason, '__int__'):
-                            is_blocked = int(finish_reason) == 2
-                        else:
-                            is_blocked = finish_reason == 2
-                        
-                        # Also check enum name if available
-                        if not is_blocked and hasattr(finish_reason, 'name'):
-                            is_blocked = finish_reason.name == 'SAFETY'
-                    
-                    if is_blocked:
-                        logger.warning("Gemini response blocked by safety filters (finish_reason=SAFETY), using fallback")
-                        return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
-                
-                # Safely extract text
-                try:
-                    message = response.text.strip()
-                except ValueError as text_error:
-                    # If text extraction fails, check for alternative ways to get the content
-                    if response.candidates and len(response.candidates) > 0:
-                        candidate = response.candidates[0]
-                        if candidate.content and candidate.content.parts:
-                            message = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
-                            if not message:
-                                logger.warning(f"Could not extract text from Gemini response: {text_error}")
-                                return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
-                        else:
-                            logger.warning(f"Gemini response has no content: {text_error}")
-                            return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
-                    else:
-                        logger.warning(f"Gemini response has no candidates: {text_error}")
-                        return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
-                        
-            except Exception as api_error:
-                logger.warning(f"Gemini API error: {api_error}")
-                return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
-            
-            # Parse the response
-            if message:
-                return self._parse_ai_response(message, mood, sentiment)
-            else:
-                # Empty message, use fallback
-                logger.warning("Gemini returned empty message, using rule-based fallback")
-                return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
-            
-        except Exception as e:
-            error_msg = str(e)
-            if "safety" in error_msg.lower() or "finish_reason" in error_msg.lower() or "blocked" in error_msg.lower():
-                logger.warning(f"Gemini response blocked by safety filters: {error_msg}")
-            else:
-                logger.error(f"Gemini mood suggestions error: {e}")
-            return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
-    
-    def _openai_mood_suggestions(self, mood: str, note: str, sentiment: Dict, features: Dict, mood_history: List) -> Dict:
-        """Generate mood suggestions using OpenAI"""
+    def _llm_mood_suggestions(self, mood: str, note: str, sentiment: Dict, features: Dict, mood_history: List,
+                              cache_key: Optional[tuple] = None) -> Dict:
+        """Generate mood suggestions through the LLM gateway (rule-based on failure)"""
         try:
-            prompt = self._build_mood_prompt(mood, note, sentiment, features, mood_history)
-            
-            system_prompt = """You are a compassionate, empathetic AI wellness coach for FocusWave. 
-- CRITICAL: Generate UNIQUE, DIFFERENT suggestions each time - avoid generic or repetitive responses
-- Provide personalized, actionable suggestions based on the SPECIFIC mood and description provided
-- Be supportive, understanding, and encouraging
-- Give 3-5 specific, practical suggestions that are RELEVANT to what the user actually wrote
-- Include insights about their mood pattern if relevant, but make them PERSONALIZED
-- Suggest 2-3 concrete activities they can do right now - vary these based on context
-- Provide a warm, positive affirmation that feels GENUINE and SPECIFIC
-- Keep responses concise and helpful
-- Be ADHD-friendly (simple, clear, actionable)
-- IMPORTANT: If they mention specific topics (work, study, relationships, sleep, etc.), address those directly in your suggestions
-- Vary your language and approach - don't use the same phrases every time
-
-Format your response as:
-SUGGESTIONS:
-1. [suggestion]
-2. [suggestion]
-3. [suggestion]
-
-INSIGHT:
-[insight about their mood]
-
-ACTIVITIES:
-1. [activity]
-2. [activity]
-
-AFFIRMATION:
-[positive affirmation]"""
-            
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ]
-            
-            response = self.openai_client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=messages,
+            prompt = self._build_mood_prompt(mood, note, sentiment, features, mood_history, bucketed=cache_key is not None)
+            # No explicit safety settings: wellness and mental health content
+            # trips explicit Gemini filters more often than the API defaults
+            result = self.llm.generate_sync(
+                MOOD_SYSTEM_PROMPT,
+                prompt,
                 max_tokens=500,  # Increased for more detailed responses
-                temperature=0.9  # Increased for more creativity and variety
+                temperature=0.9,  # Increased for more creativity and variety
             )
             
-            message = response.choices[0].message.content.strip()
-            
             # Parse the response
-            return self._parse_ai_response(message, mood, sentiment)
+            suggestions = self._parse_ai_response(result.text, mood, sentiment)
+            if cache_key:
+                response_cache.add(cache_key, suggestions)
+            return suggestions
             
+        except LLMBlocked as e:
+            logger.warning(f"LLM response blocked by safety filters: {e}, using fallback")
+            return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
+        except LLMUnavailable:
+            # Circuit open: answer locally right away
+            return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
         except Exception as e:
-            logger.error(f"OpenAI mood suggestions error: {e}")
+            logger.error(f"LLM mood suggestions error ({self.llm_provider}): {e}")
             return self._rule_based_mood_suggestions(mood, note, sentiment, features, mood_history)
     
-    def _build_mood_prompt(self, mood: str, note: str, sentiment: Dict, features: Dict, mood_history: List) -> str:
-        """Build prompt for mood suggestions"""
+    def _build_mood_prompt(self, mood: str, note: str, sentiment: Dict, features: Dict, mood_history: List,
+                           bucketed: bool = False) -> str:
+        """Build prompt for mood suggestions (with feature ranges instead of exact values when the response is cached)"""
         # Extract keywords from note for better context
         note_keywords = self._extract_keywords_from_note(note) if note else []
         current_hour = datetime.now().hour
         time_of_day = "morning" if 5 <= current_hour < 12 else "afternoon" if 12 <= current_hour < 17 else "evening" if 17 <= current_hour < 22 else "night"
         
-        prompt = f"""User's Current Mood: {mood}
+        if bucketed:
+            # Shared through the response cache, which is keyed by time of day, not hour
+            profile = bucket_labels(features)
+            prompt = f"""User's Current Mood: {mood}
+Time of Day: {time_of_day}
+"""
+        else:
+            profile = {
+                'current_streak': features.get('current_streak', 0),
+                'sessions_today': features.get('sessions_today', 0),
+                'pending_tasks': features.get('pending_tasks', 0),
+                'completion_rate': f"{features.get('completion_rate', 50):.1f}",
+                'recent_mood': features.get('recent_mood', 'unknown'),
+            }
+            prompt = f"""User's Current Mood: {mood}
 Time of Day: {time_of_day} ({current_hour}:00)
 """
         
@@ -284,12 +218,14 @@ Time of Day: {time_of_day} ({current_hour}:00)
         
         prompt += f"""
 User Context:
-- Current streak: {features.get('current_streak', 0)} days
-- Sessions today: {features.get('sessions_today', 0)}
-- Pending tasks: {features.get('pending_tasks', 0)}
-- Completion rate: {features.get('completion_rate', 50):.1f}%
-- Recent mood: {features.get('recent_mood', 'unknown')}
+- Current streak: {profile['current_streak']} days
+- Sessions today: {profile['sessions_today']}
+- Pending tasks: {profile['pending_tasks']}
+- Completion rate: {profile['completion_rate']}%
+- Recent mood: {profile['recent_mood']}
 """
+        if bucketed:
+            prompt += "(The context gives ranges. Do not quote exact numbers for streak, sessions, tasks or completion rate.)\n"
         
         if mood_history:
             prompt += f"Recent mood pattern: {', '.join(mood_history[-3:])}\n"
@@ -2,34 +2,49 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import joblib
 import numpy as np
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from loguru import logger
 from config.config import settings
-from utils.feature_engineering import FeatureEngineer
+from utils.feature_engineering import FeatureEngineer, POMODORO_FEATURE_NAMES
 from utils.data_loaders import DataLoader
+from utils.async_data_loaders import AsyncDataLoader
 from utils.model_versioning import ModelVersioning
+from utils.forest_compiler import compile_model, compile_scaler
+from inference.inference_pool import get_inference_pool, InferencePoolBusy
+from utils.executors import run_blocking
 
 class PomodoroRecommender:
-    def __init__(self):
+    def __init__(self, version: Optional[str] = None):
         self.model = None
         self.feature_scaler = None
+        self.compiled_model = None
+        self.compiled_scaler = None
+        self.feature_mean = None
+        self.feature_std = None
+        self.version = None
         self.versioning = ModelVersioning()
         self.data_loader = DataLoader()
-        self.load_model()
+        self.async_data_loader = AsyncDataLoader()
+        self.load_model(version)
     
-    def load_model(self):
-        """Load the trained model"""
+    def load_model(self, version: Optional[str] = None):
+        """Load the trained model (the current version unless one is given)"""
         try:
-            model_path = self.versioning.get_model_path("pomodoro_recommender")
+            self.version = version or self.versioning.get_current_version("pomodoro_recommender")
+            if self._load_artifact():
+                return
+            
+            model_path = self.versioning.get_model_path("pomodoro_recommender", self.version)
             
             if model_path and os.path.exists(model_path):
+                import joblib  # only needed for models without an artifact
                 model_data = joblib.load(model_path)
                 self.model = model_data.get('model')
                 self.feature_scaler = model_data.get('scaler')
                 self.feature_mean = model_data.get('feature_mean')
                 self.feature_std = model_data.get('feature_std')
+                self._compile()
                 logger.info(f"✅ Loaded Pomodoro model from {model_path}")
             else:
                 logger.warning("⚠️ Model not found, using fallback defaults")
@@ -39,6 +54,52 @@ class PomodoroRecommender:
             logger.error(f"❌ Error loading model: {e}")
             self.model = None
     
+    def _load_artifact(self) -> bool:
+        """Load the pickle-free artifact of the loaded version, if it has a compatible one"""
+        if not settings.USE_MODEL_ARTIFACTS:
+            return False
+        try:
+            artifact = self.versioning.load_artifact("pomodoro_recommender", self.version)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load model artifact, falling back to joblib: {e}")
+            return False
+        if artifact is None:
+            return False
+        if artifact.feature_names != POMODORO_FEATURE_NAMES:
+            logger.warning("⚠️ Model artifact was built for different features, falling back to joblib")
+            return False
+        
+        # Artifacts hold the compiled forest and scaler directly
+        self.model = self.compiled_model = artifact.model
+        self.feature_scaler = self.compiled_scaler = artifact.scaler
+        self.feature_mean = artifact.feature_mean
+        self.feature_std = artifact.feature_std
+        logger.info(f"✅ Loaded Pomodoro model artifact from {self.versioning.get_artifact_path('pomodoro_recommender', self.version)}")
+        return True
+    
+    def smoke_test(self) -> bool:
+        """Run the loaded model on one representative row and check the output is usable"""
+        if not self.model:
+            return False
+        if self.feature_mean is not None:
+            features = np.asarray(self.feature_mean, dtype=np.float64).reshape(1, -1)
+        else:
+            features = np.zeros((1, len(POMODORO_FEATURE_NAMES)))
+        if self.feature_scaler:
+            features = (self.compiled_scaler or self.feature_scaler).transform(features)
+        predictions = np.asarray((self.compiled_model or self.model).predict(features))
+        return predictions.shape == (1, 2) and bool(np.isfinite(predictions).all())
+    
+    def _compile(self):
+        """Flatten the loaded forest (and scaler) for fast inference when enabled"""
+        self.compiled_model = None
+        self.compiled_scaler = None
+        if settings.ML_COMPILED_FORESTS:
+            self.compiled_model = compile_model(self.model)
+            self.compiled_scaler = compile_scaler(self.feature_scaler)
+            if self.compiled_model is not None:
+                logger.info("✅ Using compiled forest evaluator")
+    
     def recommend(self, user_id: int, task_priority: str = 'medium') -> Dict:
         """
         Recommend personalized Pomodoro durations based on daily patterns and trends
@@ -51,10 +112,105 @@ class PomodoroRecommender:
                 "explanation": str
             }
         """
+        user_features = self.data_loader.get_user_features(user_id)
+        return self.recommend_from_features(user_features, task_priority)
+    
+    async def recommend_async(self, user_id: int, task_priority: str = 'medium') -> Dict:
+        """Async variant of recommend() that awaits the DB instead of blocking the event loop"""
+        user_features = await self.async_data_loader.get_user_features(user_id)
+        return (await self.recommend_batch_from_features_async([user_features], [task_priority]))[0]
+    
+    def recommend_batch(self, user_ids: List[int], task_priorities: Optional[List[str]] = None) -> List[Dict]:
+        """Recommend Pomodoro durations for many users with one bulk feature load and one model call"""
+        features_by_user = self.data_loader.get_users_features(user_ids)
+        features_list = [features_by_user[user_id] for user_id in user_ids]
+        return self.recommend_batch_from_features(features_list, task_priorities)
+    
+    async def recommend_batch_async(self, user_ids: List[int], task_priorities: Optional[List[str]] = None) -> List[Dict]:
+        """Async variant of recommend_batch()"""
+        features_by_user = await self.async_data_loader.get_users_features(user_ids)
+        features_list = [features_by_user[user_id] for user_id in user_ids]
+        return await self.recommend_batch_from_features_async(features_list, task_priorities)
+    
+    def recommend_from_features(self, user_features: Dict, task_priority: str = 'medium') -> Dict:
+        """Recommend Pomodoro durations from an already loaded feature dict"""
+        return self.recommend_batch_from_features([user_features], [task_priority])[0]
+    
+    def recommend_batch_from_features(self, features_list: List[Dict], task_priorities: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Recommend Pomodoro durations for a list of feature dicts.
+        
+        The feature matrix is built, scaled and passed to the model once for
+        the whole batch; each row is then turned into a recommendation.
+        """
+        if not features_list:
+            return []
+        if task_priorities is None:
+            task_priorities = ['medium'] * len(features_list)
+        
+        predictions = [None] * len(features_list)
+        if self.model:
+            try:
+                predictions = list(self.predict_matrix(self._feature_matrix(features_list, task_priorities)))
+            except Exception as e:
+                logger.error(f"Error in batch recommendation: {e}")
+                return [self._default_recommendation() for _ in features_list]
+        
+        return self._build_recommendations(features_list, predictions)
+    
+    async def recommend_batch_from_features_async(self, features_list: List[Dict], task_priorities: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Like recommend_batch_from_features(), without blocking the event loop:
+        the model runs in the inference pool when it is enabled and on the CPU
+        executor otherwise.
+        """
+        if not self.model or not features_list:
+            return self.recommend_batch_from_features(features_list, task_priorities)
+        pool = get_inference_pool()
+        if pool is None:
+            return await run_blocking("cpu", self.recommend_batch_from_features, features_list, task_priorities)
+        if task_priorities is None:
+            task_priorities = ['medium'] * len(features_list)
+        
+        try:
+            features = self._feature_matrix(features_list, task_priorities)
+            predictions = list(await pool.run_async("pomodoro_recommender", self.version, features))
+        except InferencePoolBusy:
+            raise
+        except Exception as e:
+            logger.error(f"Error in batch recommendation: {e}")
+            return [self._default_recommendation() for _ in features_list]
+        
+        return self._build_recommendations(features_list, predictions)
+    
+    def _feature_matrix(self, features_list: List[Dict], task_priorities: List[str]) -> np.ndarray:
+        """Unscaled model input for a batch"""
+        # Scalers were fitted on float64 training matrices
+        return FeatureEngineer.prepare_pomodoro_features_batch(
+            features_list, task_priorities, dtype=np.float64
+        )
+    
+    def predict_matrix(self, features: np.ndarray) -> np.ndarray:
+        """Scale a feature matrix and predict (focus, break) minutes per row"""
+        # Normalize features if scaler available
+        if self.feature_scaler:
+            features = (self.compiled_scaler or self.feature_scaler).transform(features)
+        elif hasattr(self, 'feature_mean') and hasattr(self, 'feature_std'):
+            features, _, _ = FeatureEngineer.normalize_features(
+                features, self.feature_mean, self.feature_std
+            )
+        
+        return np.asarray((self.compiled_model or self.model).predict(features))
+    
+    def _build_recommendations(self, features_list: List[Dict], predictions: List) -> List[Dict]:
+        return [
+            self._build_recommendation(user_features, prediction)
+            for user_features, prediction in zip(features_list, predictions)
+        ]
+    
+    def _build_recommendation(self, user_features: Dict, prediction: Optional[np.ndarray]) -> Dict:
+        """Turn one row of model output (None without a model) into a recommendation"""
         try:
-            # Get user features
-            user_features = self.data_loader.get_user_features(user_id)
-            
             # Check if we have daily trend data for trend-based prediction
             yesterday_focus = user_features.get('focus_time_yesterday', 0)
             day_before_focus = user_features.get('focus_time_day_before', 0)
@@ -70,20 +226,8 @@ class PomodoroRecommender:
                     yesterday_focus, day_before_focus, daily_trend, avg_focus_3days
                 )
                 
-                # Prepare features for model (for break time and other adjustments)
-                features = FeatureEngineer.prepare_pomodoro_features(user_features, task_priority)
-                
-                # Normalize features if scaler available
-                if self.feature_scaler:
-                    features = self.feature_scaler.transform(features)
-                elif hasattr(self, 'feature_mean') and hasattr(self, 'feature_std'):
-                    features, _, _ = FeatureEngineer.normalize_features(
-                        features, self.feature_mean, self.feature_std
-                    )
-                
                 # Use model for break time prediction, or calculate based on focus time
-                if self.model:
-                    prediction = self.model.predict(features)[0]
+                if prediction is not None:
                     # Use trend-based focus time, but model's break time
                     focus_minutes = predicted_focus_minutes
                     break_minutes = max(1, min(30, int(round(prediction[1]))))
@@ -98,33 +242,20 @@ class PomodoroRecommender:
                     user_features, focus_minutes, break_minutes, daily_trend
                 )
                 
-            else:
+            elif prediction is not None:
                 # Not enough historical data, use standard model prediction
-                features = FeatureEngineer.prepare_pomodoro_features(user_features, task_priority)
-                
-                # Normalize features if scaler available
-                if self.feature_scaler:
-                    features = self.feature_scaler.transform(features)
-                elif hasattr(self, 'feature_mean') and hasattr(self, 'feature_std'):
-                    features, _, _ = FeatureEngineer.normalize_features(
-                        features, self.feature_mean, self.feature_std
-                    )
+                focus_minutes = max(5, min(60, int(round(prediction[0]))))
+                break_minutes = max(1, min(30, int(round(prediction[1]))))
+                confidence = 0.75
                 
-                # Predict if model available
-                if self.model:
-                    prediction = self.model.predict(features)[0]
-                    focus_minutes = max(5, min(60, int(round(prediction[0]))))
-                    break_minutes = max(1, min(30, int(round(prediction[1]))))
-                    confidence = 0.75
-                    
-                    # Generate explanation
-                    explanation = self._generate_explanation(
-                        user_features, focus_minutes, break_minutes
-                    )
-                else:
-                    # Fallback to defaults with slight adjustments
-                    focus_minutes, break_minutes, explanation = self._fallback_recommendation(user_features)
-                    confidence = 0.5
+                # Generate explanation
+                explanation = self._generate_explanation(
+                    user_features, focus_minutes, break_minutes
+                )
+            else:
+                # Fallback to defaults with slight adjustments
+                focus_minutes, break_minutes, explanation = self._fallback_recommendation(user_features)
+                confidence = 0.5
             
             return {
                 "focus_minutes": focus_minutes,
@@ -135,12 +266,16 @@ class PomodoroRecommender:
             
         except Exception as e:
             logger.error(f"Error in recommendation: {e}")
-            return {
-                "focus_minutes": 25,
-                "break_minutes": 5,
-                "confidence": 0.0,
-                "explanation": "Using default Pomodoro timing due to error"
-            }
+            return self._default_recommendation()
+    
+    def _default_recommendation(self) -> Dict:
+        """Classic 25/5 Pomodoro used when prediction fails"""
+        return {
+            "focus_minutes": 25,
+            "break_minutes": 5,
+            "confidence": 0.0,
+            "explanation": "Using default Pomodoro timing due to error"
+        }
     
     def _predict_from_trend(self, yesterday: float, day_before: float, trend: float, avg_3days: float) -> int:
         """
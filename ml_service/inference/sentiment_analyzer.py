@@ -2,19 +2,41 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Dict, Optional
+import importlib.util
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
 from loguru import logger
 from config.config import settings
+from utils.sentiment_cache import normalize_text, sentiment_cache_key, get_cached_sentiment, cache_sentiment
+from inference.inference_pool import get_inference_pool
 
-# Try to import transformers (optional)
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-    import torch
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+# Optional backends are only imported when the model is loaded, so the
+# ONNX backend can serve without ever importing torch
+TRANSFORMERS_AVAILABLE = (
+    importlib.util.find_spec("transformers") is not None
+    and importlib.util.find_spec("torch") is not None
+)
+ONNX_AVAILABLE = (
+    importlib.util.find_spec("onnxruntime") is not None
+    and importlib.util.find_spec("tokenizers") is not None
+)
+MODEL_BACKEND_AVAILABLE = TRANSFORMERS_AVAILABLE or ONNX_AVAILABLE
+if not MODEL_BACKEND_AVAILABLE:
     logger.warning("Transformers library not available - will use fallback sentiment analysis")
 
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+
+
+def resolve_model_source() -> str:
+    """Local model directory if present, otherwise the Hugging Face model name"""
+    model_path = settings.SENTIMENT_MODEL_PATH
+    if os.path.exists(model_path) and os.path.isdir(model_path):
+        return model_path
+    return settings.HF_MODEL_NAME
+
 # Global singleton instance
 _sentiment_analyzer_instance = None
 _model_loaded = False
@@ -42,8 +64,11 @@ class SentimentAnalyzer:
         self.model = None
         self.tokenizer = None
         self.pipeline = None
+        self.onnx_session = None
+        self.model_name = None
+        self.backend = None  # "torch" or "onnx" once a model (or, with the inference pool, its tokenizer) is loaded
         self._model_loaded = False
-        self._use_transformer = TRANSFORMERS_AVAILABLE
+        self._use_transformer = MODEL_BACKEND_AVAILABLE
         
         # Check if we should disable transformer loading (for macOS compatibility)
         # On macOS, transformer models can cause bus errors, so we disable by default
@@ -57,14 +82,14 @@ class SentimentAnalyzer:
             self._use_transformer = False
         elif env_disable == "false":
             logger.info("✅ Transformer model loading enabled via DISABLE_TRANSFORMER_MODEL env var")
-            self._use_transformer = TRANSFORMERS_AVAILABLE
+            self._use_transformer = MODEL_BACKEND_AVAILABLE
         elif is_macos:
             # On macOS, disable transformer by default to avoid bus errors
             logger.info("⚠️  macOS detected - Transformer model disabled by default (set DISABLE_TRANSFORMER_MODEL=false to enable)")
             self._use_transformer = False
         else:
             # On other platforms, use transformer if available
-            self._use_transformer = TRANSFORMERS_AVAILABLE
+            self._use_transformer = MODEL_BACKEND_AVAILABLE
         
         self._initialized = True
         # Don't load model in __init__ - use lazy loading instead
@@ -81,21 +106,43 @@ class SentimentAnalyzer:
             self.pipeline = None
             self._model_loaded = True
             return
+        
+        if get_inference_pool() is not None:
+            # Forward passes run in the pool's workers; cache keys only need the tokenizer
+            self._load_tokenizer()
+            self._model_loaded = True
+            return
+        
+        if settings.SENTIMENT_BACKEND == "onnx":
+            if self._load_onnx_model():
+                self._model_loaded = True
+                return
+            logger.warning("⚠️  ONNX sentiment model unavailable - falling back to PyTorch")
+        
+        if not TRANSFORMERS_AVAILABLE:
+            logger.info("⚠️  Using fallback sentiment analysis (transformers not installed)")
+            self.pipeline = None
+            self._model_loaded = True
+            return
             
         try:
-            model_path = settings.SENTIMENT_MODEL_PATH
+            import torch
+            from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+            
+            model_source = resolve_model_source()
+            self.model_name = model_source
             
             # Try to load from local path first
-            if os.path.exists(model_path) and os.path.isdir(model_path):
-                logger.info(f"Loading model from local path: {model_path}")
-                self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-                self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
+            if model_source == settings.SENTIMENT_MODEL_PATH:
+                logger.info(f"Loading model from local path: {model_source}")
+                self.tokenizer = AutoTokenizer.from_pretrained(model_source)
+                self.model = AutoModelForSequenceClassification.from_pretrained(model_source)
             else:
                 # Load from Hugging Face
-                logger.info(f"Loading model from Hugging Face: {settings.HF_MODEL_NAME}")
+                logger.info(f"Loading model from Hugging Face: {model_source}")
                 try:
-                    self.tokenizer = AutoTokenizer.from_pretrained(settings.HF_MODEL_NAME)
-                    self.model = AutoModelForSequenceClassification.from_pretrained(settings.HF_MODEL_NAME)
+                    self.tokenizer = AutoTokenizer.from_pretrained(model_source)
+                    self.model = AutoModelForSequenceClassification.from_pretrained(model_source)
                 except Exception as e:
                     logger.warning(f"⚠️  Could not load model from Hugging Face: {e}")
                     logger.warning("⚠️  Falling back to keyword-based sentiment analysis")
@@ -110,6 +157,7 @@ class SentimentAnalyzer:
                 tokenizer=self.tokenizer,
                 device=0 if torch.cuda.is_available() else -1
             )
+            self.backend = "torch"
             
             logger.info("✅ Sentiment analyzer loaded successfully")
             self._model_loaded = True
@@ -121,6 +169,86 @@ class SentimentAnalyzer:
             self.pipeline = None
             self._model_loaded = True
     
+    def _onnx_model_file(self) -> Optional[str]:
+        """The ONNX model to serve (int8 first when SENTIMENT_ONNX_QUANTIZED), or None if not exported"""
+        model_dir = settings.SENTIMENT_ONNX_DIR
+        candidates = [ONNX_INT8_FILE, ONNX_MODEL_FILE] if settings.SENTIMENT_ONNX_QUANTIZED else [ONNX_MODEL_FILE]
+        return next(
+            (os.path.join(model_dir, name) for name in candidates if os.path.exists(os.path.join(model_dir, name))),
+            None
+        )
+    
+    def _load_tokenizer(self):
+        """Load only the tokenizer of the backend the inference pool's workers will use"""
+        try:
+            if settings.SENTIMENT_BACKEND == "onnx" and ONNX_AVAILABLE and self._onnx_model_file():
+                from tokenizers import Tokenizer
+                self.tokenizer = Tokenizer.from_file(os.path.join(settings.SENTIMENT_ONNX_DIR, "tokenizer.json"))
+                self.tokenizer.enable_truncation(max_length=512)
+                self.onnx_model_file = os.path.basename(self._onnx_model_file())
+                self.backend = "onnx"
+            elif TRANSFORMERS_AVAILABLE:
+                from transformers import AutoTokenizer
+                self.model_name = resolve_model_source()
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self.backend = "torch"
+            else:
+                logger.info("⚠️  Using fallback sentiment analysis (no model backend installed)")
+                return
+            logger.info(f"✅ Sentiment tokenizer loaded ({self.backend}); the model runs in the inference pool")
+        except Exception as e:
+            logger.error(f"❌ Error loading sentiment tokenizer: {e}")
+            logger.error("⚠️  Using fallback keyword-based sentiment analysis")
+            self.tokenizer = None
+            self.backend = None
+    
+    def _load_onnx_model(self) -> bool:
+        """Load the exported ONNX model and its fast tokenizer (see training/export_sentiment_onnx.py)"""
+        if not ONNX_AVAILABLE:
+            logger.warning("⚠️  onnxruntime/tokenizers not installed")
+            return False
+        
+        model_dir = settings.SENTIMENT_ONNX_DIR
+        model_file = self._onnx_model_file()
+        if model_file is None:
+            logger.warning(f"⚠️  No ONNX model in {model_dir} - run training/export_sentiment_onnx.py")
+            return False
+        
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+            
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if settings.SENTIMENT_ONNX_THREADS > 0:
+                options.intra_op_num_threads = settings.SENTIMENT_ONNX_THREADS
+            self.onnx_session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+            self.onnx_model_file = os.path.basename(model_file)
+            self.onnx_inputs = {node.name for node in self.onnx_session.get_inputs()}
+            
+            self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+            self.tokenizer.enable_truncation(max_length=512)
+            self.tokenizer.enable_padding()
+            
+            with open(os.path.join(model_dir, "config.json")) as f:
+                self.id2label = {int(k): v for k, v in json.load(f)["id2label"].items()}
+            
+            self.backend = "onnx"
+            logger.info(f"✅ Sentiment analyzer loaded from ONNX ({model_file})")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Error loading ONNX sentiment model: {e}")
+            self.onnx_session = None
+            return False
+    
+    @property
+    def uses_transformer(self) -> bool:
+        """True unless the keyword fallback is (or will be) used"""
+        if self._model_loaded:
+            return self.backend is not None
+        return self._use_transformer
+    
     def analyze(self, text: str) -> Dict:
         """
         Analyze sentiment of text (lazy loads model on first use)
@@ -131,59 +259,175 @@ class SentimentAnalyzer:
                 "label": "negative" | "neutral" | "positive"
             }
         """
-        if not text or not text.strip():
-            return {
-                "sentiment_score": 0.0,
-                "label": "neutral"
-            }
+        return self.analyze_batch([text])[0]
+    
+    def analyze_batch(self, texts: List[str], batch_size: Optional[int] = None, check_cache: bool = True) -> List[Dict]:
+        """
+        Analyze many texts with padded forward passes of up to batch_size texts.
+        
+        Cached texts (and repeats within the batch) are answered without the
+        model. The rest are sorted by length before being split into batches
+        so each batch pads to a similar length; results come back in input order.
+        """
+        results: List[Optional[Dict]] = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = {
+                    "sentiment_score": 0.0,
+                    "label": "neutral"
+                }
+            else:
+                pending.append(i)
+        
+        if not pending:
+            return results
         
         # Lazy load model on first use
         if not self._model_loaded:
             self._load_model()
         
-        try:
-            if self.pipeline:
-                # Use transformer model
-                result = self.pipeline(text, truncation=True, max_length=512)[0]
-                
-                label = result['label'].lower()
-                score = result['score']
-                
-                # Convert to our format
-                if 'positive' in label:
-                    sentiment_score = score
-                    sentiment_label = "positive"
-                elif 'negative' in label:
-                    sentiment_score = -score
-                    sentiment_label = "negative"
-                else:
-                    sentiment_score = 0.0
-                    sentiment_label = "neutral"
-                
+        # Resolve cache hits and group identical texts under one key
+        keys = {}
+        for i in pending:
+            key = self.cache_key(texts[i])
+            cached = get_cached_sentiment(key) if check_cache else None
+            if cached is not None:
+                results[i] = cached
             else:
-                # Fallback: simple keyword-based sentiment
-                sentiment_score, sentiment_label = self._simple_sentiment(text)
-            
+                keys.setdefault(key, []).append(i)
+        to_run = [indices[0] for indices in keys.values()]
+        
+        computed = {}
+        if self.backend:
+            batch_size = batch_size or settings.SENTIMENT_MAX_BATCH_SIZE
+            to_run.sort(key=lambda i: len(texts[i]))
+            for start in range(0, len(to_run), batch_size):
+                bucket = to_run[start:start + batch_size]
+                try:
+                    predictions = self._run_forward([texts[i] for i in bucket])
+                    for i, (label, score) in zip(bucket, predictions):
+                        computed[i] = self._format_prediction(label, score)
+                except Exception as e:
+                    logger.error(f"Error in sentiment analysis: {e}")
+                    # On error, fall back to simple sentiment (not cached)
+                    for i in bucket:
+                        results[i] = self._fallback_result(texts[i])
+        else:
+            # Fallback: simple keyword-based sentiment
+            for i in to_run:
+                computed[i] = self._fallback_result(texts[i])
+        
+        for key, indices in keys.items():
+            result = computed.get(indices[0])
+            if result is None:
+                continue
+            cache_sentiment(key, result)
+            for i in indices:
+                results[i] = dict(result)
+        
+        return results
+    
+    def cached_result(self, text: str) -> Optional[Dict]:
+        """Cached result for text, if any (None until the model has been loaded)"""
+        if not self._model_loaded or not text or not text.strip():
+            return None
+        return get_cached_sentiment(self.cache_key(text))
+    
+    def cache_key(self, text: str) -> str:
+        """
+        Hash of the text as the model sees it: case-folded, whitespace
+        collapsed and, for model backends, cut where the tokenizer truncates.
+        """
+        normalized = normalize_text(text)
+        model_id = "keyword"
+        try:
+            if self.backend == "onnx":
+                model_id = f"onnx:{self.onnx_model_file}"
+                offsets = self.tokenizer.encode(normalized).offsets
+                normalized = normalized[:max((end for _, end in offsets), default=0)]
+            elif self.backend == "torch":
+                model_id = f"torch:{self.model_name}"
+                offsets = self.tokenizer(
+                    normalized, truncation=True, max_length=512, return_offsets_mapping=True
+                )["offset_mapping"]
+                normalized = normalized[:max((end for _, end in offsets), default=0)]
+        except Exception as e:
+            logger.debug(f"Could not truncate text for the sentiment cache key: {e}")
+        return sentiment_cache_key(normalized, model_id)
+    
+    def _run_forward(self, texts: List[str]) -> List[tuple]:
+        """Forward pass in the inference pool when it is enabled, otherwise in this process"""
+        pool = get_inference_pool()
+        if pool is not None:
+            return pool.run_sentiment(texts)
+        return self._forward_batch(texts)
+    
+    def _forward_batch(self, texts: List[str]) -> List[tuple]:
+        """Run one padded forward pass; returns (label, probability) per text"""
+        if self.backend == "onnx":
+            return self._forward_batch_onnx(texts)
+        
+        import torch
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=512, return_tensors="pt"
+        ).to(self.model.device)
+        with torch.inference_mode():
+            logits = self.model(**encoded).logits
+        probabilities = torch.softmax(logits, dim=-1)
+        scores, label_ids = probabilities.max(dim=-1)
+        id2label = self.model.config.id2label
+        return [(id2label[int(label_id)], float(score)) for label_id, score in zip(label_ids, scores)]
+    
+    def _forward_batch_onnx(self, texts: List[str]) -> List[tuple]:
+        """ONNX Runtime forward pass with a NumPy softmax (no torch)"""
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if 'token_type_ids' in self.onnx_inputs:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        logits = self.onnx_session.run(None, {k: v for k, v in feeds.items() if k in self.onnx_inputs})[0]
+        
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=-1, keepdims=True)
+        label_ids = probabilities.argmax(axis=-1)
+        return [(self.id2label[int(i)], float(probabilities[row, i])) for row, i in enumerate(label_ids)]
+    
+    def _format_prediction(self, label: str, score: float) -> Dict:
+        """Convert a model label/probability to our format"""
+        label = label.lower()
+        if 'positive' in label:
+            sentiment_score = score
+            sentiment_label = "positive"
+        elif 'negative' in label:
+            sentiment_score = -score
+            sentiment_label = "negative"
+        else:
+            sentiment_score = 0.0
+            sentiment_label = "neutral"
+        
+        return {
+            "sentiment_score": round(sentiment_score, 3),
+            "label": sentiment_label
+        }
+    
+    def _fallback_result(self, text: str) -> Dict:
+        """Keyword-based result, neutral if even that fails"""
+        try:
+            sentiment_score, sentiment_label = self._simple_sentiment(text)
             return {
                 "sentiment_score": round(sentiment_score, 3),
                 "label": sentiment_label
             }
-            
-        except Exception as e:
-            logger.error(f"Error in sentiment analysis: {e}")
-            # On error, fall back to simple sentiment
-            try:
-                sentiment_score, sentiment_label = self._simple_sentiment(text)
-                return {
-                    "sentiment_score": round(sentiment_score, 3),
-                    "label": sentiment_label
-                }
-            except Exception as fallback_error:
-                logger.error(f"Fallback sentiment analysis also failed: {fallback_error}")
-                return {
-                    "sentiment_score": 0.0,
-                    "label": "neutral"
-                }
+        except Exception as fallback_error:
+            logger.error(f"Fallback sentiment analysis also failed: {fallback_error}")
+            return {
+                "sentiment_score": 0.0,
+                "label": "neutral"
+            }
     
     def _simple_sentiment(self, text: str) -> tuple:
         """Simple keyword-based sentiment analysis fallback"""
@@ -0,0 +1,176 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+from loguru import logger
+from config.config import settings
+from inference.sentiment_analyzer import SentimentAnalyzer
+from utils.executors import run_blocking
+
+
+class SentimentBatcher:
+    """
+    Micro-batching queue in front of the sentiment model.
+
+    Requests are queued and a single worker thread collects up to
+    max_batch_size of them (waiting at most max_wait_ms after the first one)
+    and runs them through SentimentAnalyzer.analyze_batch together.
+    """
+
+    def __init__(self, analyzer: SentimentAnalyzer = None, max_batch_size: int = None, max_wait_ms: float = None):
+        self.analyzer = analyzer or SentimentAnalyzer()
+        self.max_batch_size = max(1, max_batch_size or settings.SENTIMENT_MAX_BATCH_SIZE)
+        self.max_wait = (settings.SENTIMENT_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+
+    def _ensure_started(self):
+        """Start the worker thread on first use"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+                self._thread.start()
+                logger.info(f"✅ Sentiment batcher started (max batch {self.max_batch_size}, max wait {self.max_wait * 1000:.0f}ms)")
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the future resolves to the analyze() result"""
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("Sentiment batcher is closed"))
+            return future
+        self._ensure_started()
+        self._queue.put((text, future))
+        return future
+
+    def analyze(self, text: str) -> Dict:
+        """Blocking helper for sync callers"""
+        return self.submit(text).result()
+
+    async def analyze_async(self, text: str) -> Dict:
+        """Await the result without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self) -> list:
+        """Block for one request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if any(item is None for item in batch):
+                # Shutdown sentinel: finish the real requests, then stop
+                batch = [item for item in batch if item is not None]
+                self._process(batch)
+                return
+            self._process(batch)
+
+    def _process(self, batch: list):
+        # Skip requests whose caller has already given up
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            # Callers go through analyze_sentiment_async, which already checked the cache
+            results = self.analyzer.analyze_batch(
+                [text for text, _ in batch], batch_size=self.max_batch_size, check_cache=False
+            )
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            logger.error(f"Error in batched sentiment analysis: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    def close(self):
+        """Stop the worker after the queued requests are done"""
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_size_seen': self.max_batch_seen,
+            'queue_depth': self._queue.qsize(),
+        }
+
+
+# One batcher (and worker thread) per process
+_batcher: Optional[SentimentBatcher] = None
+_batcher_pid: Optional[int] = None
+_batcher_lock = threading.Lock()
+
+
+def get_sentiment_batcher() -> SentimentBatcher:
+    """Return the process-wide sentiment batcher"""
+    global _batcher, _batcher_pid
+    pid = os.getpid()
+    if _batcher is not None and _batcher_pid == pid:
+        return _batcher
+
+    with _batcher_lock:
+        if _batcher is None or _batcher_pid != pid:
+            # Threads do not survive a fork
+            _batcher = SentimentBatcher()
+            _batcher_pid = pid
+        return _batcher
+
+
+def close_sentiment_batcher():
+    """Stop the batcher of the current process"""
+    global _batcher, _batcher_pid
+    with _batcher_lock:
+        if _batcher is not None and _batcher_pid == os.getpid():
+            _batcher.close()
+        _batcher = None
+        _batcher_pid = None
+
+
+async def analyze_sentiment_async(text: str) -> Dict:
+    """
+    Analyze one text from async code.
+
+    Cache hits are answered directly; with the transformer model, misses go
+    through the batcher (or the cpu executor when batching is disabled). The
+    keyword fallback is cheap enough to run inline.
+    """
+    analyzer = SentimentAnalyzer()
+    if not analyzer.uses_transformer or not text or not text.strip():
+        return analyzer.analyze(text)
+    cached = analyzer.cached_result(text)
+    if cached is not None:
+        return cached
+    if settings.SENTIMENT_BATCHING_ENABLED:
+        return await get_sentiment_batcher().analyze_async(text)
+    return await run_blocking("cpu", analyzer.analyze, text)
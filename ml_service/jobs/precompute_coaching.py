@@ -0,0 +1,188 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import schedule
+import time
+from datetime import date
+from typing import Dict, List, Optional
+from loguru import logger
+from config.config import settings
+from inference.coach_service import CoachService, COACH_SYSTEM_PROMPT, COACH_LLM_OPTIONS
+from inference.llm_gateway import LLMUnavailable
+from utils.precomputed_coaching import coaching_signature, is_fresh, read_precomputed, write_precomputed
+
+# Users who completed a session, touched a task or logged a mood recently
+ACTIVE_USERS_QUERY = """
+    SELECT user_id FROM timer_sessions WHERE completed_at >= NOW() - make_interval(hours => %(hours)s)
+    UNION
+    SELECT user_id FROM tasks WHERE updated_at >= NOW() - make_interval(hours => %(hours)s)
+    UNION
+    SELECT user_id FROM mood_logs WHERE created_at >= NOW() - make_interval(hours => %(hours)s)
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); the gateway does not report usage"""
+    return max(1, len(text) // 4)
+
+
+class TokenBudget:
+    """Estimated tokens spent today, persisted with the precomputed answers"""
+
+    def __init__(self, limit: int, state: Dict):
+        self.limit = limit
+        self.day = date.today().isoformat()
+        self.used = state.get('tokens_used', 0) if state.get('date') == self.day else 0
+
+    def reserve(self, tokens: int) -> bool:
+        if self.limit and self.used + tokens > self.limit:
+            return False
+        self.used += tokens
+        return True
+
+    def settle(self, reserved: int, actual: int):
+        self.used += actual - reserved
+
+    def state(self) -> Dict:
+        return {'date': self.day, 'tokens_used': self.used}
+
+
+class RateLimiter:
+    """Spaces out call starts to stay under the provider's requests-per-minute limit"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(loop.time(), self._next) + self.interval
+
+
+def find_active_users(coach: CoachService, hours: int) -> List[int]:
+    with coach.data_loader.pool.cursor() as cur:
+        cur.execute(ACTIVE_USERS_QUERY, {'hours': hours})
+        return sorted(row['user_id'] for row in cur.fetchall())
+
+
+def build_jobs(coach: CoachService, user_ids: List[int], entries: Dict[str, Dict]) -> List[Dict]:
+    """The proactive coaching prompt of each user, skipping users whose stored answer still matches"""
+    features_by_user = coach.data_loader.get_users_features(user_ids)
+    moods = coach.data_loader.get_user_moods(days=1)  # same window as CoachService.get_coaching
+    jobs = []
+    for user_id in user_ids:
+        user_moods = moods[moods['user_id'] == user_id] if not moods.empty else moods
+        features, mood_text, _ = coach._prepare_context(dict(features_by_user[user_id]), user_moods)
+        prompt = coach._build_context_prompt(features, mood_text)
+        signature = coaching_signature(COACH_SYSTEM_PROMPT, prompt)
+        entry = entries.get(str(user_id))
+        if entry and entry.get('signature') == signature and is_fresh(entry):
+            continue
+        jobs.append({'user_id': user_id, 'features': features, 'prompt': prompt, 'signature': signature})
+    return jobs
+
+
+async def generate_all(coach: CoachService, jobs: List[Dict], budget: TokenBudget) -> Dict[str, Dict]:
+    """Generate answers with at most COACHING_PRECOMPUTE_CONCURRENCY calls in flight"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    limiter = RateLimiter(settings.COACHING_PRECOMPUTE_RPM)
+    results: Dict[str, Dict] = {}
+    stop: Optional[str] = None
+
+    async def worker():
+        nonlocal stop
+        while stop is None and not queue.empty():
+            job = queue.get_nowait()
+            prompt_tokens = estimate_tokens(COACH_SYSTEM_PROMPT) + estimate_tokens(job['prompt'])
+            reserved = prompt_tokens + COACH_LLM_OPTIONS['max_tokens']
+            if not budget.reserve(reserved):
+                stop = f"daily token budget reached ({budget.used}/{budget.limit})"
+                return
+            await limiter.wait()
+            try:
+                result = await coach.llm.generate(COACH_SYSTEM_PROMPT, job['prompt'], **COACH_LLM_OPTIONS)
+            except LLMUnavailable as e:
+                budget.settle(reserved, 0)
+                stop = str(e)
+                return
+            except Exception as e:
+                # Blocked or failed: the user keeps getting live answers
+                budget.settle(reserved, prompt_tokens)
+                logger.warning(f"⚠️ Could not precompute coaching for user {job['user_id']}: {e}")
+                continue
+            budget.settle(reserved, prompt_tokens + estimate_tokens(result.text))
+            results[str(job['user_id'])] = {
+                'message': result.text,
+                'suggested_action': coach._extract_action(result.text, job['features']),
+                'signature': job['signature'],
+                'generated_at': time.time(),
+                'provider': result.provider,
+            }
+
+    await asyncio.gather(*(worker() for _ in range(max(1, settings.COACHING_PRECOMPUTE_CONCURRENCY))))
+    if stop:
+        logger.warning(f"⚠️ Stopped precomputing coaching early: {stop}")
+    return results
+
+
+def precompute_coaching(hours: int = None) -> Dict:
+    """Precompute coaching for users active in the last `hours` and store it for /ml/coach"""
+    hours = hours or settings.COACHING_PRECOMPUTE_ACTIVE_HOURS
+    logger.info(f"🔄 Precomputing coaching for users active in the last {hours}h...")
+    coach = CoachService()
+    if not coach.llm.available:
+        logger.info("No LLM provider configured; the rule-based coach needs no precomputing")
+        return {'users': 0, 'generated': 0}
+
+    stored = read_precomputed()
+    now = time.time()
+    entries = {user_id: entry for user_id, entry in stored['entries'].items() if is_fresh(entry, now)}
+    budget = TokenBudget(settings.COACHING_PRECOMPUTE_DAILY_TOKENS, stored['budget'])
+
+    try:
+        user_ids = find_active_users(coach, hours)
+        jobs = build_jobs(coach, user_ids, entries)
+        logger.info(f"{len(user_ids)} active users, {len(jobs)} need a new answer")
+        results = asyncio.run(generate_all(coach, jobs, budget)) if jobs else {}
+    except Exception as e:
+        logger.error(f"❌ Error precomputing coaching: {e}")
+        return {'error': str(e)}
+
+    entries.update(results)
+    write_precomputed({'version': 1, 'budget': budget.state(), 'entries': entries})
+    logger.info(f"✅ Precomputed coaching for {len(results)} users "
+                f"({len(entries)} stored, ~{budget.used} tokens used today)")
+    return {'users': len(user_ids), 'generated': len(results), 'stored': len(entries), 'tokens_used_today': budget.used}
+
+
+def run_scheduler():
+    """Run the precompute job every COACHING_PRECOMPUTE_INTERVAL_MINUTES"""
+    logger.info(f"⏰ Starting coaching precompute scheduler (interval: {settings.COACHING_PRECOMPUTE_INTERVAL_MINUTES} minutes)")
+    schedule.every(settings.COACHING_PRECOMPUTE_INTERVAL_MINUTES).minutes.do(precompute_coaching)
+    precompute_coaching()
+    while True:
+        schedule.run_pending()
+        time.sleep(60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute coaching for recently active users")
+    parser.add_argument("--once", action="store_true", help="run once instead of on a schedule")
+    parser.add_argument("--hours", type=int, default=None, help="activity window (default COACHING_PRECOMPUTE_ACTIVE_HOURS)")
+    args = parser.parse_args()
+    if args.once:
+        precompute_coaching(args.hours)
+    else:
+        run_scheduler()
@@ -16,6 +16,12 @@ import uvicorn
 from config.config import settings
 
 if __name__ == "__main__":
+    if settings.ML_WORKERS > 1:
+        # Load models once and fork workers that share them
+        from app.prefork import run_prefork
+        run_prefork()
+        sys.exit(0)
+    
     # Run uvicorn directly with the app
     import uvicorn
     uvicorn.run(
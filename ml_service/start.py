@@ -22,6 +22,12 @@ if __name__ == "__main__":
     print(f"📚 API docs: http://{settings.ML_SERVICE_HOST}:{settings.ML_SERVICE_PORT}/docs")
     print("")
     
+    if settings.ML_WORKERS > 1:
+        # Load models once and fork workers that share them
+        from app.prefork import run_prefork
+        run_prefork()
+        sys.exit(0)
+    
     uvicorn.run(
         app,
         host=settings.ML_SERVICE_HOST,
@@ -0,0 +1,81 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+from loguru import logger
+
+from config.config import settings
+from inference.sentiment_analyzer import resolve_model_source, ONNX_MODEL_FILE, ONNX_INT8_FILE
+
+
+def export_sentiment_onnx(output_dir: str = None, quantize: bool = True, opset: int = 14) -> str:
+    """
+    Export the sentiment model used by SentimentAnalyzer to ONNX.
+
+    Writes model.onnx (fp32), optionally model.int8.onnx (dynamic int8
+    quantization), plus tokenizer.json and config.json so the ONNX backend
+    can serve without transformers or torch.
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    output_dir = output_dir or settings.SENTIMENT_ONNX_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    model_source = resolve_model_source()
+    logger.info(f"🚀 Exporting sentiment model {model_source} to ONNX...")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_source)
+    model = AutoModelForSequenceClassification.from_pretrained(model_source)
+    model.eval()
+
+    if not tokenizer.is_fast:
+        raise ValueError("A fast tokenizer (tokenizer.json) is required for the ONNX backend")
+
+    sample = tokenizer(["an example sentence", "a second, longer example sentence"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    logger.info(f"✅ ONNX model saved to {model_path}")
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, "tokenizer.json"))
+    with open(os.path.join(output_dir, "config.json"), "w") as f:
+        json.dump({
+            "source": model_source,
+            "id2label": {str(k): v for k, v in model.config.id2label.items()},
+            "input_names": input_names,
+        }, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        int8_path = os.path.join(output_dir, ONNX_INT8_FILE)
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+        logger.info(f"✅ Quantized int8 model saved to {int8_path}")
+
+    return output_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the sentiment model to ONNX")
+    parser.add_argument("--output-dir", default=None, help=f"Output directory (default: {settings.SENTIMENT_ONNX_DIR})")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 quantized variant")
+    parser.add_argument("--opset", type=int, default=14, help="ONNX opset version")
+    args = parser.parse_args()
+
+    export_sentiment_onnx(args.output_dir, quantize=not args.no_quantize, opset=args.opset)
@@ -12,8 +12,10 @@ import joblib
 from loguru import logger
 
 from utils.data_loaders import DataLoader
-from utils.feature_engineering import FeatureEngineer
+from training.training_set import build_distraction_training_set
 from utils.model_versioning import ModelVersioning
+from utils.model_artifacts import save_artifact
+from utils.feature_engineering import DISTRACTION_FEATURE_NAMES
 from config.config import settings
 
 def train_distraction_model():
@@ -38,65 +40,8 @@ def train_distraction_model():
         gamification_df = data_loader.get_user_gamification()
         
         # Prepare training data
-        # For distraction, we'll simulate based on session patterns
-        X = []
-        y = []
-        
-        for _, session in sessions_df.iterrows():
-            user_id = session['user_id']
-            
-            # Get user features
-            user_features = {
-                'user_id': user_id,
-                'avg_focus_duration': 25,
-                'avg_break_duration': 5,
-                'completion_rate': 50,
-                'current_streak': 0,
-                'level': 1,
-                'total_sessions': 0,
-                'sessions_today': 0,
-                'recent_mood': 'neutral',
-                'hour_of_day': session.get('hour', 12),
-                'day_of_week': session.get('day_of_week', 0),
-                'is_weekend': session.get('is_weekend', 0),
-                'pending_tasks': 0,
-                'high_priority_tasks': 0,
-            }
-            
-            # Enhance with actual data
-            user_tasks = tasks_df[tasks_df['user_id'] == user_id] if not tasks_df.empty else pd.DataFrame()
-            if not user_tasks.empty:
-                user_features['completion_rate'] = (user_tasks['is_completed'].mean() * 100) if 'is_completed' in user_tasks.columns else 50
-                user_features['pending_tasks'] = len(user_tasks[user_tasks['status'] == 'pending'])
-                user_features['high_priority_tasks'] = len(user_tasks[user_tasks['priority'] == 'high'])
-            
-            user_moods = moods_df[moods_df['user_id'] == user_id] if not moods_df.empty else pd.DataFrame()
-            if not user_moods.empty:
-                user_features['recent_mood'] = user_moods.iloc[0]['mood'] if 'mood' in user_moods.columns else 'neutral'
-            
-            user_gam = gamification_df[gamification_df['user_id'] == user_id] if not gamification_df.empty else pd.DataFrame()
-            if not user_gam.empty:
-                user_features['current_streak'] = user_gam.iloc[0].get('streak', 0)
-                user_features['level'] = user_gam.iloc[0].get('level', 1)
-            
-            user_sessions = sessions_df[sessions_df['user_id'] == user_id]
-            if not user_sessions.empty:
-                user_features['total_sessions'] = len(user_sessions)
-                user_features['sessions_today'] = len(user_sessions[user_sessions['completed_at'].dt.date == pd.Timestamp.now().date()])
-            
-            # Prepare features
-            session_duration = session['duration']
-            features = FeatureEngineer.prepare_distraction_features(user_features, session_duration)
-            X.append(features[0])
-            
-            # Simulate distraction label based on heuristics
-            # In real scenario, this would come from interruption data
-            distraction_prob = calculate_distraction_probability(user_features, session_duration)
-            distraction_label = 1 if distraction_prob > 0.5 else 0
-            y.append(distraction_label)
-        
-        X = np.array(X)
-        y = np.array(y)
+        # For distraction, we simulate labels based on session patterns
+        X, y = build_distraction_training_set(sessions_df, tasks_df, moods_df, gamification_df)
         
         if len(X) == 0:
             raise ValueError("No training data available")
@@ -148,9 +93,23 @@ def train_distraction_model():
         joblib.dump(model_data, model_path)
         logger.info(f"✅ Model saved to {model_path}")
         
-        # Register with versioning
+        # Pickle-free copy for the service (see utils/model_artifacts.py)
         versioning = ModelVersioning()
-        version = versioning.register_model("distraction_predictor", model_path, model_data['metrics'])
+        version = versioning.new_version()
+        try:
+            artifact_path = save_artifact(
+                versioning.artifact_dir("distraction_predictor", version), "distraction_predictor",
+                model_data['model'], model_data['scaler'], DISTRACTION_FEATURE_NAMES, model_data['metrics'],
+                model_data['feature_mean'], model_data['feature_std'],
+            )
+        except Exception as e:
+            # The artifact is an optional serving format; the service falls back to the joblib model
+            logger.warning(f"⚠️ Could not export model artifact, registering the joblib model only: {e}")
+            artifact_path = None
+        
+        # Register with versioning
+        versioning.register_model("distraction_predictor", model_path, model_data['metrics'],
+                                  version=version, artifact_path=artifact_path)
         logger.info(f"✅ Model version {version} registered")
         
         data_loader.close()
@@ -0,0 +1,131 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import numpy as np
+from typing import Tuple
+
+from utils.feature_engineering import FeatureEngineer
+
+# Feature values used for a user without tasks, moods or gamification rows
+DEFAULT_TRAINING_FEATURES = {
+    'avg_focus_duration': 25,
+    'avg_break_duration': 5,
+    'completion_rate': 50,
+    'current_streak': 0,
+    'level': 1,
+    'total_sessions': 0,
+    'sessions_today': 0,
+    'recent_mood': 'neutral',
+    'pending_tasks': 0,
+    'high_priority_tasks': 0,
+}
+
+
+def _map_per_user(user_ids: pd.Series, per_user: pd.Series, default) -> pd.Series:
+    """Look up a per-user aggregate for every session row"""
+    return user_ids.map(per_user).fillna(default)
+
+
+def build_session_features(sessions_df: pd.DataFrame, tasks_df: pd.DataFrame,
+                           moods_df: pd.DataFrame, gamification_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row of user features per training session.
+
+    Per-user aggregates are computed once with groupby and joined onto the
+    sessions, instead of re-filtering every frame for every session.
+    """
+    user_ids = sessions_df['user_id'].reset_index(drop=True)
+    features = pd.DataFrame({'user_id': user_ids})
+
+    for name, default in DEFAULT_TRAINING_FEATURES.items():
+        features[name] = default
+    features['hour_of_day'] = sessions_df['hour'].to_numpy() if 'hour' in sessions_df.columns else 12
+    features['day_of_week'] = sessions_df['day_of_week'].to_numpy() if 'day_of_week' in sessions_df.columns else 0
+
+    # Task aggregates
+    if not tasks_df.empty:
+        if 'is_completed' in tasks_df.columns:
+            completion_rate = tasks_df.groupby('user_id')['is_completed'].mean() * 100
+            features['completion_rate'] = _map_per_user(user_ids, completion_rate, 50)
+        pending = (tasks_df['status'] == 'pending').groupby(tasks_df['user_id']).sum()
+        high_priority = (tasks_df['priority'] == 'high').groupby(tasks_df['user_id']).sum()
+        features['pending_tasks'] = _map_per_user(user_ids, pending, 0)
+        features['high_priority_tasks'] = _map_per_user(user_ids, high_priority, 0)
+
+    # Most recent mood (mood logs are ordered newest first)
+    if not moods_df.empty and 'mood' in moods_df.columns:
+        recent_mood = moods_df.drop_duplicates('user_id', keep='first').set_index('user_id')['mood']
+        features['recent_mood'] = _map_per_user(user_ids, recent_mood, 'neutral')
+
+    # Gamification (first row per user)
+    if not gamification_df.empty:
+        gamification = gamification_df.drop_duplicates('user_id', keep='first').set_index('user_id')
+        if 'streak' in gamification.columns:
+            features['current_streak'] = _map_per_user(user_ids, gamification['streak'], 0)
+        if 'level' in gamification.columns:
+            features['level'] = _map_per_user(user_ids, gamification['level'], 1)
+
+    # Aggregates over the user's own sessions
+    sessions = sessions_df.reset_index(drop=True)
+    features['total_sessions'] = _map_per_user(user_ids, sessions.groupby('user_id').size(), 0)
+
+    work = sessions[sessions['session_type'] == 'work']
+    breaks = sessions[sessions['session_type'].isin(['shortBreak', 'longBreak'])]
+    features['avg_focus_duration'] = _map_per_user(user_ids, work.groupby('user_id')['duration'].mean(), 25)
+    features['avg_break_duration'] = _map_per_user(user_ids, breaks.groupby('user_id')['duration'].mean(), 5)
+
+    if 'completed_at' in sessions.columns:
+        is_today = sessions['completed_at'].dt.date == pd.Timestamp.now().date()
+        features['sessions_today'] = _map_per_user(user_ids, is_today.groupby(sessions['user_id']).sum(), 0)
+
+    return features
+
+
+def calculate_distraction_probabilities(features: pd.DataFrame, session_durations: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_distraction_probability() over a session feature frame"""
+    mood = features['recent_mood']
+    hour = features['hour_of_day'].to_numpy()
+
+    # Terms are added in the same order as the scalar version so the floats match exactly
+    prob = np.full(len(features), 0.3)
+    prob += np.where(mood.isin(['anxious', 'tired']), 0.2, np.where(mood == 'happy', -0.1, 0.0))
+    prob += np.where((hour >= 22) | (hour < 6), 0.15, np.where((hour >= 14) & (hour <= 16), 0.1, 0.0))
+    prob += np.where(features['pending_tasks'].to_numpy() > 5, 0.15, 0.0)
+    prob += np.where(features['current_streak'].to_numpy() < 2, 0.1, 0.0)
+    prob += np.where(np.asarray(session_durations) > 30, 0.1, 0.0)
+
+    return np.clip(prob, 0, 1)
+
+
+def build_pomodoro_training_set(sessions_df: pd.DataFrame, tasks_df: pd.DataFrame,
+                                moods_df: pd.DataFrame, gamification_df: pd.DataFrame,
+                                dtype=np.float64) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Build (X, y_focus, y_break) for the Pomodoro model"""
+    features = build_session_features(sessions_df, tasks_df, moods_df, gamification_df)
+    features['sessions_today'] = 0  # the Pomodoro model has always been trained without it
+    X = FeatureEngineer.prepare_pomodoro_features_batch(features, 'medium', dtype=dtype)
+
+    # Target: actual session duration (default break / focus for the other one)
+    is_work = (sessions_df['session_type'] == 'work').to_numpy()
+    duration = sessions_df['duration'].to_numpy()
+    y_focus = np.where(is_work, duration, 25)
+    y_break = np.where(is_work, 5, duration)
+
+    return X, y_focus, y_break
+
+
+def build_distraction_training_set(sessions_df: pd.DataFrame, tasks_df: pd.DataFrame,
+                                   moods_df: pd.DataFrame, gamification_df: pd.DataFrame,
+                                   dtype=np.float64) -> Tuple[np.ndarray, np.ndarray]:
+    """Build (X, y) for the distraction model, with heuristic labels"""
+    features = build_session_features(sessions_df, tasks_df, moods_df, gamification_df)
+    session_durations = sessions_df['duration'].to_numpy()
+    X = FeatureEngineer.prepare_distraction_features_batch(features, session_durations, dtype=dtype)
+
+    # Simulate distraction label based on heuristics
+    # In real scenario, this would come from interruption data
+    y = (calculate_distraction_probabilities(features, session_durations) > 0.5).astype(int)
+
+    return X, y
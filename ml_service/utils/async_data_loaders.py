@@ -0,0 +1,308 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+import pandas as pd
+from loguru import logger
+from config.config import settings
+from utils.db_pool import get_connection_params
+from utils.executors import run_blocking
+from utils.feature_cache import begin_features_load, get_cached_features, cache_features
+from utils.data_loaders import (
+    DataLoader,
+    USER_FEATURES_QUERY,
+    build_features_from_row,
+    default_user_features,
+    prepare_sessions_frame,
+    prepare_tasks_frame,
+    prepare_moods_frame,
+    prepare_daily_focus_frame,
+)
+
+# Try to import asyncpg (optional)
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+    logger.warning("asyncpg not available - async data access will run the sync DataLoader in a thread")
+
+# asyncpg uses positional $n placeholders
+ASYNC_USER_FEATURES_QUERY = (
+    USER_FEATURES_QUERY
+    .replace("%(user_ids)s", "$1")
+    .replace("%(today)s", "$2")
+)
+
+SESSIONS_QUERY = """
+    SELECT
+        ts.id,
+        ts.user_id,
+        ts.session_type,
+        ts.duration,
+        ts.completed_at,
+        u.id as user_id_ref
+    FROM timer_sessions ts
+    JOIN users u ON ts.user_id = u.id
+    WHERE ts.completed_at >= NOW() - make_interval(days => $1)
+        AND ($2::int IS NULL OR ts.user_id = $2)
+    ORDER BY ts.completed_at DESC
+"""
+
+TASKS_QUERY = """
+    SELECT
+        t.id,
+        t.user_id,
+        t.title,
+        t.description,
+        t.priority,
+        t.status,
+        t.tag,
+        t.due_date,
+        t.created_at,
+        t.updated_at,
+        CASE
+            WHEN t.status = 'completed' THEN t.updated_at
+            ELSE NULL
+        END as completed_at
+    FROM tasks t
+    JOIN users u ON t.user_id = u.id
+    WHERE t.created_at >= NOW() - make_interval(days => $1)
+        AND ($2::int IS NULL OR t.user_id = $2)
+    ORDER BY t.created_at DESC
+"""
+
+MOODS_QUERY = """
+    SELECT
+        ml.id,
+        ml.user_id,
+        ml.mood,
+        ml.note,
+        ml.created_at
+    FROM mood_logs ml
+    JOIN users u ON ml.user_id = u.id
+    WHERE ml.created_at >= NOW() - make_interval(days => $1)
+        AND ($2::int IS NULL OR ml.user_id = $2)
+    ORDER BY ml.created_at DESC
+"""
+
+GAMIFICATION_QUERY = """
+    SELECT
+        ug.user_id,
+        ug.level,
+        ug.points,
+        ug.total_points,
+        ug.streak,
+        ug.last_activity_date
+    FROM user_gamification ug
+    JOIN users u ON ug.user_id = u.id
+    WHERE ($1::int IS NULL OR ug.user_id = $1)
+"""
+
+DAILY_FOCUS_QUERY = """
+    SELECT
+        DATE(completed_at) as date,
+        SUM(duration) / 60.0 as total_focus_minutes
+    FROM timer_sessions
+    WHERE user_id = $1
+        AND session_type = 'work'
+        AND completed_at >= NOW() - make_interval(days => $2)
+    GROUP BY DATE(completed_at)
+    ORDER BY date DESC
+    LIMIT $2
+"""
+
+
+# One asyncpg pool per process and event loop
+_async_pool = None
+_async_pool_key = None
+_async_pool_lock: Optional[asyncio.Lock] = None
+
+
+async def get_async_pool():
+    """Return the process-wide asyncpg pool, creating it on first use"""
+    global _async_pool, _async_pool_key, _async_pool_lock
+    key = (os.getpid(), id(asyncio.get_running_loop()))
+    if _async_pool is not None and _async_pool_key == key:
+        return _async_pool
+
+    if _async_pool_lock is None or _async_pool_key != key:
+        _async_pool_lock = asyncio.Lock()
+        _async_pool_key = key
+        _async_pool = None
+
+    async with _async_pool_lock:
+        if _async_pool is None:
+            params = get_connection_params()
+            _async_pool = await asyncpg.create_pool(
+                host=params['host'],
+                port=params['port'],
+                database=params['database'],
+                user=params['user'],
+                password=params.get('password'),
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=max(1, settings.DB_POOL_MAX_SIZE),
+                timeout=params['connect_timeout'],
+                max_inactive_connection_lifetime=settings.DB_POOL_HEALTHCHECK_INTERVAL * 10,
+            )
+            logger.info(f"✅ Async database pool ready (max {settings.DB_POOL_MAX_SIZE})")
+        return _async_pool
+
+
+async def close_async_pool():
+    """Close the asyncpg pool of the current process"""
+    global _async_pool, _async_pool_key, _async_pool_lock
+    if _async_pool is not None and _async_pool_key == (os.getpid(), id(asyncio.get_running_loop())):
+        await _async_pool.close()
+        logger.info("Async database pool closed")
+    _async_pool = None
+    _async_pool_key = None
+    _async_pool_lock = None
+
+
+class AsyncDataLoader:
+    """
+    Async mirror of DataLoader backed by an asyncpg pool.
+
+    Falls back to running the sync DataLoader in a worker thread when
+    asyncpg is not installed, so callers can always await it.
+    """
+
+    def __init__(self):
+        self._sync_loader = None
+
+    async def _run_sync(self, method: str, *args, **kwargs):
+        """Run a DataLoader method in a thread (asyncpg unavailable)"""
+        if self._sync_loader is None:
+            self._sync_loader = DataLoader()
+        return await run_blocking("db", getattr(self._sync_loader, method), *args, **kwargs)
+
+    async def _fetch_frame(self, query: str, *args) -> pd.DataFrame:
+        """Run a query and return the rows as a DataFrame"""
+        pool = await get_async_pool()
+        async with pool.acquire(timeout=settings.DB_POOL_TIMEOUT) as conn:
+            stmt = await conn.prepare(query)
+            records = await stmt.fetch(*args)
+            columns = [attr.name for attr in stmt.get_attributes()]
+        return pd.DataFrame.from_records([tuple(r) for r in records], columns=columns, coerce_float=True)
+
+    async def get_user_sessions(self, user_id: Optional[int] = None, days: int = 30) -> pd.DataFrame:
+        """Load timer sessions"""
+        if not ASYNCPG_AVAILABLE:
+            return await self._run_sync('get_user_sessions', user_id=user_id, days=days)
+        try:
+            df = prepare_sessions_frame(await self._fetch_frame(SESSIONS_QUERY, days, user_id or None))
+            logger.info(f"Loaded {len(df)} timer sessions")
+            return df
+        except Exception as e:
+            logger.error(f"Error loading sessions: {e}")
+            return pd.DataFrame()
+
+    async def get_user_tasks(self, user_id: Optional[int] = None, days: int = 30) -> pd.DataFrame:
+        """Load tasks"""
+        if not ASYNCPG_AVAILABLE:
+            return await self._run_sync('get_user_tasks', user_id=user_id, days=days)
+        try:
+            df = prepare_tasks_frame(await self._fetch_frame(TASKS_QUERY, days, user_id or None))
+            logger.info(f"Loaded {len(df)} tasks")
+            return df
+        except Exception as e:
+            logger.error(f"Error loading tasks: {e}")
+            return pd.DataFrame()
+
+    async def get_user_moods(self, user_id: Optional[int] = None, days: int = 30) -> pd.DataFrame:
+        """Load mood logs"""
+        if not ASYNCPG_AVAILABLE:
+            return await self._run_sync('get_user_moods', user_id=user_id, days=days)
+        try:
+            df = prepare_moods_frame(await self._fetch_frame(MOODS_QUERY, days, user_id or None))
+            logger.info(f"Loaded {len(df)} mood logs")
+            return df
+        except Exception as e:
+            logger.error(f"Error loading moods: {e}")
+            return pd.DataFrame()
+
+    async def get_user_gamification(self, user_id: Optional[int] = None) -> pd.DataFrame:
+        """Load gamification data"""
+        if not ASYNCPG_AVAILABLE:
+            return await self._run_sync('get_user_gamification', user_id=user_id)
+        try:
+            df = await self._fetch_frame(GAMIFICATION_QUERY, user_id or None)
+            logger.info(f"Loaded {len(df)} gamification records")
+            return df
+        except Exception as e:
+            logger.error(f"Error loading gamification: {e}")
+            return pd.DataFrame()
+
+    async def get_daily_focus_time(self, user_id: int, days: int = 7) -> pd.DataFrame:
+        """Get daily total focus time for trend analysis"""
+        if not ASYNCPG_AVAILABLE:
+            return await self._run_sync('get_daily_focus_time', user_id=user_id, days=days)
+        try:
+            df = prepare_daily_focus_frame(await self._fetch_frame(DAILY_FOCUS_QUERY, user_id, days))
+            logger.info(f"Loaded daily focus time for user {user_id}: {len(df)} days")
+            return df
+        except Exception as e:
+            logger.error(f"Error loading daily focus time: {e}")
+            return pd.DataFrame(columns=['date', 'total_focus_minutes'])
+
+    async def get_user_features(self, user_id: int) -> Dict:
+        """Get comprehensive user features for inference (single round trip, cached)"""
+        cached = get_cached_features(user_id)
+        if cached is not None:
+            return cached
+
+        if not ASYNCPG_AVAILABLE:
+            return await self._run_sync('get_user_features', user_id)
+
+        token = begin_features_load()
+        try:
+            features = (await self._get_users_features([user_id]))[user_id]
+        except Exception as e:
+            logger.error(f"Error getting user features: {e}")
+            return default_user_features(user_id)
+
+        cache_features(user_id, features, token)
+        return features
+
+    async def get_users_features(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Get inference features for many users at once, keyed by user_id"""
+        if not ASYNCPG_AVAILABLE:
+            return await self._run_sync('get_users_features', user_ids)
+
+        results = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = get_cached_features(user_id)
+            if cached is not None:
+                results[user_id] = cached
+            else:
+                missing.append(user_id)
+
+        if not missing:
+            return results
+
+        token = begin_features_load()
+        try:
+            loaded = await self._get_users_features(missing)
+        except Exception as e:
+            logger.error(f"Error getting features for {len(missing)} users: {e}")
+            results.update({user_id: default_user_features(user_id) for user_id in missing})
+            return results
+
+        for user_id, features in loaded.items():
+            cache_features(user_id, features, token)
+        results.update(loaded)
+        return results
+
+    async def _get_users_features(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Run the bulk feature query"""
+        now = datetime.now()
+        pool = await get_async_pool()
+        async with pool.acquire(timeout=settings.DB_POOL_TIMEOUT) as conn:
+            rows = await conn.fetch(ASYNC_USER_FEATURES_QUERY, list(user_ids), now.date())
+
+        return {row['user_id']: build_features_from_row(row['user_id'], dict(row), now) for row in rows}
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with optional per-entry TTL.
+
+    Tracks hits, misses and evictions. Loads that race with an invalidation
+    can pass the token from begin_load() to set() so stale values are dropped.
+    """
+
+    def __init__(self, capacity: int, ttl: Optional[float] = None, name: str = "cache"):
+        self.capacity = max(1, capacity)
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.name = name
+
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._epoch = 0  # bumped on every invalidation
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def begin_load(self) -> int:
+        """Token to pass to set() for a value loaded from the source of truth"""
+        with self._lock:
+            return self._epoch
+
+    def set(self, key: Hashable, value: Any, token: Optional[int] = None, ttl: Optional[float] = None) -> bool:
+        """Store a value; skipped if an invalidation happened since `token` was taken"""
+        ttl = ttl if ttl is not None else self.ttl
+        with self._lock:
+            if token is not None and token != self._epoch:
+                return False
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop one key; returns True if it was cached"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += 1
+            return self._data.pop(key, None) is not None
+
+    def clear(self) -> int:
+        """Drop every entry; returns how many were removed"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += 1
+            count = len(self._data)
+            self._data.clear()
+            return count
+
+    def snapshot(self) -> List[Tuple[Hashable, Any]]:
+        """Live (key, value) pairs, least recently used first"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value) for key, (value, expires_at) in self._data.items()
+                if expires_at is None or expires_at > now
+            ]
+
+    def load(self, items: Iterable[Tuple[Hashable, Any]]) -> int:
+        """Bulk-insert (key, value) pairs in LRU order (e.g. from snapshot()); returns how many were kept"""
+        count = 0
+        for key, value in items:
+            self.set(key, value)
+            count += 1
+        return min(count, self.capacity)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'pid': os.getpid(),  # entries and counters are per process (per prefork worker)
+                'size': len(self._data),
+                'capacity': self.capacity,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,127 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+import numpy as np
+from loguru import logger
+from config.config import settings
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one upstream dependency.
+
+    Outcomes of the last `window_seconds` are kept. Once there are at least
+    `min_calls` of them, the circuit opens if the error rate reaches
+    `error_rate` or the p95 latency reaches `p95_ms`. While open, allow()
+    returns False so callers fail fast. After `open_seconds` the circuit is
+    half-open and lets `half_open_probes` calls through; a success closes
+    it, a failure opens it again.
+    """
+
+    def __init__(self, name: str, window_seconds: float = None, min_calls: int = None, error_rate: float = None,
+                 p95_ms: float = None, open_seconds: float = None, half_open_probes: int = None):
+        self.name = name
+        self.window_seconds = window_seconds or settings.LLM_BREAKER_WINDOW_SECONDS
+        self.min_calls = min_calls or settings.LLM_BREAKER_MIN_CALLS
+        self.error_rate = error_rate or settings.LLM_BREAKER_ERROR_RATE
+        self.p95_ms = settings.LLM_BREAKER_P95_MS if p95_ms is None else p95_ms  # 0 = ignore latency
+        self.open_seconds = open_seconds or settings.LLM_BREAKER_OPEN_SECONDS
+        self.half_open_probes = half_open_probes or settings.LLM_BREAKER_HALF_OPEN_PROBES
+
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.open_reason: Optional[str] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes = deque()  # (monotonic time, ok, latency_ms)
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, now: float, reason: str):
+        self.state = OPEN
+        self.opened_at = now
+        self.open_reason = reason
+        self.times_opened += 1
+        self._probes = 0
+        logger.warning(f"⚠️ Circuit for {self.name} opened: {reason}")
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; in half-open state this reserves a probe"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probes = 0
+                logger.info(f"Circuit for {self.name} half-open, probing")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """A call allowed by allow() ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, ok: bool, latency_ms: float):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if ok and (not self.p95_ms or latency_ms < self.p95_ms):
+                    self.state = CLOSED
+                    self.opened_at = None
+                    self.open_reason = None
+                    self._outcomes.clear()
+                    logger.info(f"✅ Circuit for {self.name} closed")
+                else:
+                    self._open(now, "half-open probe failed")
+                return
+            if self.state == OPEN:
+                return  # a call that started before the circuit opened
+
+            self._outcomes.append((now, ok, latency_ms))
+            self._prune(now)
+            if len(self._outcomes) < self.min_calls:
+                return
+            error_rate = sum(not ok for _, ok, _ in self._outcomes) / len(self._outcomes)
+            if error_rate >= self.error_rate:
+                self._open(now, f"error rate {error_rate:.0%} over {len(self._outcomes)} calls")
+                return
+            if self.p95_ms:
+                p95 = float(np.percentile([latency for _, _, latency in self._outcomes], 95))
+                if p95 >= self.p95_ms:
+                    self._open(now, f"p95 latency {p95:.0f}ms over {len(self._outcomes)} calls")
+
+    def status(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            latencies = [latency for _, _, latency in self._outcomes]
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'open_reason': self.open_reason,
+                'retry_in_s': round(max(0.0, self.open_seconds - (now - self.opened_at)), 1) if self.state == OPEN else None,
+                'window_calls': calls,
+                'window_error_rate': round(sum(not ok for _, ok, _ in self._outcomes) / calls, 3) if calls else 0.0,
+                'window_p50_ms': round(float(np.percentile(latencies, 50)), 1) if latencies else None,
+                'window_p95_ms': round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
@@ -2,53 +2,227 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 import pandas as pd
 from datetime import datetime, timedelta
 from config.config import settings
 from loguru import logger
+from utils.db_pool import get_pool
+from utils.feature_cache import begin_features_load, get_cached_features, cache_features
+
+# All inference features for a set of users in a single round trip (one row per user).
+# Mirrors the five-query pandas path in DataLoader._get_user_features_multi_query.
+USER_FEATURES_QUERY = """
+    WITH requested AS (
+        SELECT DISTINCT unnest(%(user_ids)s::int[]) AS user_id
+    ),
+    session_stats AS (
+        SELECT
+            ts.user_id,
+            COUNT(*) AS total_sessions,
+            AVG(ts.duration) AS avg_session_duration,
+            AVG(ts.duration) FILTER (WHERE ts.session_type = 'work') AS avg_focus_duration,
+            AVG(ts.duration) FILTER (WHERE ts.session_type = 'shortBreak') AS avg_break_duration,
+            COUNT(*) FILTER (WHERE ts.completed_at::date = %(today)s::date) AS sessions_today,
+            SUM(ts.duration) FILTER (WHERE ts.session_type = 'work' AND ts.completed_at::date = %(today)s::date - 1) / 60.0 AS focus_time_yesterday,
+            SUM(ts.duration) FILTER (WHERE ts.session_type = 'work' AND ts.completed_at::date = %(today)s::date - 2) / 60.0 AS focus_time_day_before,
+            SUM(ts.duration) FILTER (WHERE ts.session_type = 'work' AND ts.completed_at::date = %(today)s::date - 3) / 60.0 AS focus_time_three_days_ago
+        FROM timer_sessions ts
+        JOIN users u ON ts.user_id = u.id
+        WHERE ts.user_id = ANY(%(user_ids)s::int[])
+            AND ts.completed_at >= NOW() - INTERVAL '7 days'
+        GROUP BY ts.user_id
+    ),
+    task_stats AS (
+        SELECT
+            t.user_id,
+            AVG(CASE WHEN t.status = 'completed' THEN 1.0 ELSE 0.0 END) * 100 AS completion_rate,
+            COUNT(*) FILTER (WHERE t.status = 'pending') AS pending_tasks,
+            COUNT(*) FILTER (WHERE t.priority = 'high') AS high_priority_tasks,
+            AVG(EXTRACT(EPOCH FROM (t.updated_at - t.created_at)) / 60) FILTER (WHERE t.status = 'completed') AS avg_task_completion_time
+        FROM tasks t
+        JOIN users u ON t.user_id = u.id
+        WHERE t.user_id = ANY(%(user_ids)s::int[])
+            AND t.created_at >= NOW() - INTERVAL '7 days'
+        GROUP BY t.user_id
+    ),
+    recent_moods AS (
+        SELECT DISTINCT ON (ml.user_id)
+            ml.user_id,
+            ml.mood
+        FROM mood_logs ml
+        JOIN users u ON ml.user_id = u.id
+        WHERE ml.user_id = ANY(%(user_ids)s::int[])
+            AND ml.created_at >= NOW() - INTERVAL '7 days'
+        ORDER BY ml.user_id, ml.created_at DESC
+    )
+    SELECT
+        r.user_id,
+        ss.total_sessions,
+        ss.avg_session_duration,
+        ss.avg_focus_duration,
+        ss.avg_break_duration,
+        ss.sessions_today,
+        ss.focus_time_yesterday,
+        ss.focus_time_day_before,
+        ss.focus_time_three_days_ago,
+        tk.completion_rate,
+        tk.pending_tasks,
+        tk.high_priority_tasks,
+        tk.avg_task_completion_time,
+        rm.mood AS recent_mood,
+        ug.streak AS current_streak,
+        ug.level
+    FROM requested r
+    LEFT JOIN session_stats ss ON ss.user_id = r.user_id
+    LEFT JOIN task_stats tk ON tk.user_id = r.user_id
+    LEFT JOIN recent_moods rm ON rm.user_id = r.user_id
+    LEFT JOIN user_gamification ug ON ug.user_id = r.user_id
+"""
+
+def default_user_features(user_id: int) -> Dict:
+    """Neutral feature dict used when user data cannot be loaded"""
+    return {
+        'user_id': user_id,
+        'avg_focus_duration': 25,
+        'avg_break_duration': 5,
+        'completion_rate': 50,
+        'current_streak': 0,
+        'level': 1,
+        'hour_of_day': datetime.now().hour,
+        'day_of_week': datetime.now().weekday(),
+        'is_weekend': 0,
+        'pending_tasks': 0,
+        'high_priority_tasks': 0,
+        'focus_time_yesterday': 0,
+        'focus_time_day_before': 0,
+        'focus_time_three_days_ago': 0,
+        'daily_trend': 0,
+        'avg_focus_last_3_days': 25,
+    }
+
+
+def add_daily_trend_features(features: Dict) -> Dict:
+    """Derive daily_trend and avg_focus_last_3_days from the last three days of focus time"""
+    yesterday = features['focus_time_yesterday']
+    day_before = features['focus_time_day_before']
+
+    # Calculate trend (positive if increasing, negative if decreasing)
+    if yesterday > 0 and day_before > 0:
+        features['daily_trend'] = yesterday - day_before
+    elif yesterday > 0:
+        features['daily_trend'] = yesterday  # New pattern starting
+    else:
+        features['daily_trend'] = 0
+
+    # Average of last 3 days (for baseline)
+    last_3_days = [yesterday, day_before, features['focus_time_three_days_ago']]
+    last_3_days = [x for x in last_3_days if x > 0]
+    features['avg_focus_last_3_days'] = sum(last_3_days) / len(last_3_days) if last_3_days else 25
+
+    return features
+
+
+def build_features_from_row(user_id: int, row: Optional[Dict], now: datetime = None) -> Dict:
+    """Turn one USER_FEATURES_QUERY row into the inference feature dict"""
+    now = now or datetime.now()
+    row = row or {}
+
+    def value(key, default):
+        v = row.get(key)
+        if v is None:
+            return default
+        # NUMERIC aggregates come back as Decimal
+        return float(v) if not isinstance(v, (int, str)) else v
+
+    features = {
+        'user_id': user_id,
+        'total_sessions': value('total_sessions', 0),
+        'avg_session_duration': value('avg_session_duration', 25),
+        'completion_rate': value('completion_rate', 50),
+        'current_streak': value('current_streak', 0),
+        'level': value('level', 1),
+        'recent_mood': value('recent_mood', 'neutral'),
+        'hour_of_day': now.hour,
+        'day_of_week': now.weekday(),
+        'is_weekend': 1 if now.weekday() >= 5 else 0,
+        'pending_tasks': value('pending_tasks', 0),
+        'high_priority_tasks': value('high_priority_tasks', 0),
+        'avg_task_completion_time': value('avg_task_completion_time', 0),
+        'avg_focus_duration': value('avg_focus_duration', 25),
+        'avg_break_duration': value('avg_break_duration', 5),
+        'sessions_today': value('sessions_today', 0),
+        'focus_time_yesterday': value('focus_time_yesterday', 0),
+        'focus_time_day_before': value('focus_time_day_before', 0),
+        'focus_time_three_days_ago': value('focus_time_three_days_ago', 0),
+    }
+
+    return add_daily_trend_features(features)
+
+
+def prepare_sessions_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Add time-of-day columns to a timer_sessions frame"""
+    if not df.empty:
+        df['completed_at'] = pd.to_datetime(df['completed_at'])
+        df['hour'] = df['completed_at'].dt.hour
+        df['day_of_week'] = df['completed_at'].dt.dayofweek
+        df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    return df
+
+
+def prepare_tasks_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Add completion columns to a tasks frame"""
+    if not df.empty:
+        df['created_at'] = pd.to_datetime(df['created_at'])
+        df['updated_at'] = pd.to_datetime(df['updated_at'])
+        df['completed_at'] = pd.to_datetime(df['completed_at'], errors='coerce')
+        df['completion_time'] = (df['completed_at'] - df['created_at']).dt.total_seconds() / 60
+        df['is_completed'] = (df['status'] == 'completed').astype(int)
+    return df
+
+
+def prepare_moods_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse timestamps in a mood_logs frame"""
+    if not df.empty:
+        df['created_at'] = pd.to_datetime(df['created_at'])
+    return df
+
+
+def prepare_daily_focus_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort daily focus totals oldest first"""
+    if not df.empty:
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values('date')
+        df['total_focus_minutes'] = df['total_focus_minutes'].fillna(0)
+    return df
+
 
 class DataLoader:
     def __init__(self):
-        self.conn = None
-        self.connect()
+        # The pool opens on the first query, so processes that never query
+        # (inference workers) hold no connections
+        pass
     
     def connect(self):
-        """Establish database connection"""
-        try:
-            # Get password from settings, default to "postgres" if not set
-            password = settings.DB_PASSWORD
-            if not password or password == '':
-                password = "postgres"  # Default PostgreSQL password
-            
-            # Build connection parameters
-            conn_params = {
-                'host': settings.DB_HOST,
-                'port': settings.DB_PORT,
-                'database': settings.DB_NAME,
-                'user': settings.DB_USER,
-            }
-            
-            # Only add password if it's not None
-            if password:
-                conn_params['password'] = password
-            
-            self.conn = psycopg2.connect(**conn_params)
-            logger.info("✅ Connected to database")
-        except Exception as e:
-            logger.error(f"❌ Database connection failed: {e}")
-            logger.error(f"   Trying to connect to: {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME} as {settings.DB_USER}")
-            raise
+        """Attach to the shared database connection pool"""
+        get_pool()
+    
+    @property
+    def pool(self):
+        """The pool of the current process, so a forked worker never uses its parent's connections"""
+        return get_pool()
+    
+    @contextmanager
+    def connection(self):
+        """Check out a pooled connection for the duration of one query"""
+        with self.pool.connection() as conn:
+            yield conn
     
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
-            logger.info("Database connection closed")
+        """Release this loader (the shared pool stays open for other services)"""
     
-    def get_user_sessions(self, user_id: Optional[int] = None, days: int = 30) -> pd.DataFrame:
+    def get_user_sessions(self, user_id: Optional[int] = None, days: int = 30, raise_errors: bool = False) -> pd.DataFrame:
         """Load timer sessions for training"""
         try:
             query = """
@@ -69,22 +243,21 @@ class DataLoader:
             
             query += " ORDER BY ts.completed_at DESC"
             
-            df = pd.read_sql_query(query, self.conn)
+            with self.connection() as conn:
+                df = pd.read_sql_query(query, conn)
             
-            if not df.empty:
-                df['completed_at'] = pd.to_datetime(df['completed_at'])
-                df['hour'] = df['completed_at'].dt.hour
-                df['day_of_week'] = df['completed_at'].dt.dayofweek
-                df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+            df = prepare_sessions_frame(df)
             
             logger.info(f"Loaded {len(df)} timer sessions")
             return df
             
         except Exception as e:
             logger.error(f"Error loading sessions: {e}")
+            if raise_errors:
+                raise
             return pd.DataFrame()
     
-    def get_user_tasks(self, user_id: Optional[int] = None, days: int = 30) -> pd.DataFrame:
+    def get_user_tasks(self, user_id: Optional[int] = None, days: int = 30, raise_errors: bool = False) -> pd.DataFrame:
         """Load tasks for training"""
         try:
             query = """
@@ -113,23 +286,21 @@ class DataLoader:
             
             query += " ORDER BY t.created_at DESC"
             
-            df = pd.read_sql_query(query, self.conn)
+            with self.connection() as conn:
+                df = pd.read_sql_query(query, conn)
             
-            if not df.empty:
-                df['created_at'] = pd.to_datetime(df['created_at'])
-                df['updated_at'] = pd.to_datetime(df['updated_at'])
-                df['completed_at'] = pd.to_datetime(df['completed_at'], errors='coerce')
-                df['completion_time'] = (df['completed_at'] - df['created_at']).dt.total_seconds() / 60
-                df['is_completed'] = (df['status'] == 'completed').astype(int)
+            df = prepare_tasks_frame(df)
             
             logger.info(f"Loaded {len(df)} tasks")
             return df
             
         except Exception as e:
             logger.error(f"Error loading tasks: {e}")
+            if raise_errors:
+                raise
             return pd.DataFrame()
     
-    def get_user_moods(self, user_id: Optional[int] = None, days: int = 30) -> pd.DataFrame:
+    def get_user_moods(self, user_id: Optional[int] = None, days: int = 30, raise_errors: bool = False) -> pd.DataFrame:
         """Load mood logs for training"""
         try:
             query = """
@@ -149,19 +320,21 @@ class DataLoader:
             
             query += " ORDER BY ml.created_at DESC"
             
-            df = pd.read_sql_query(query, self.conn)
+            with self.connection() as conn:
+                df = pd.read_sql_query(query, conn)
             
-            if not df.empty:
-                df['created_at'] = pd.to_datetime(df['created_at'])
+            df = prepare_moods_frame(df)
             
             logger.info(f"Loaded {len(df)} mood logs")
             return df
             
         except Exception as e:
             logger.error(f"Error loading moods: {e}")
+            if raise_errors:
+                raise
             return pd.DataFrame()
     
-    def get_user_gamification(self, user_id: Optional[int] = None) -> pd.DataFrame:
+    def get_user_gamification(self, user_id: Optional[int] = None, raise_errors: bool = False) -> pd.DataFrame:
         """Load gamification data"""
         try:
             query = """
@@ -179,16 +352,19 @@ class DataLoader:
             if user_id:
                 query += " WHERE ug.user_id = %s" % user_id
             
-            df = pd.read_sql_query(query, self.conn)
+            with self.connection() as conn:
+                df = pd.read_sql_query(query, conn)
             
             logger.info(f"Loaded {len(df)} gamification records")
             return df
             
         except Exception as e:
             logger.error(f"Error loading gamification: {e}")
+            if raise_errors:
+                raise
             return pd.DataFrame()
     
-    def get_daily_focus_time(self, user_id: int, days: int = 7) -> pd.DataFrame:
+    def get_daily_focus_time(self, user_id: int, days: int = 7, raise_errors: bool = False) -> pd.DataFrame:
         """Get daily total focus time for trend analysis"""
         try:
             # Use parameterized query - days is safe as it's always an integer from code
@@ -206,126 +382,140 @@ class DataLoader:
                 LIMIT %s
             """
             
-            df = pd.read_sql_query(query, self.conn, params=[user_id, days, days])
+            with self.connection() as conn:
+                df = pd.read_sql_query(query, conn, params=[user_id, days, days])
             
-            if not df.empty:
-                df['date'] = pd.to_datetime(df['date'])
-                df = df.sort_values('date')
-                df['total_focus_minutes'] = df['total_focus_minutes'].fillna(0)
+            df = prepare_daily_focus_frame(df)
             
             logger.info(f"Loaded daily focus time for user {user_id}: {len(df)} days")
             return df
             
         except Exception as e:
             logger.error(f"Error loading daily focus time: {e}")
+            if raise_errors:
+                raise
             return pd.DataFrame(columns=['date', 'total_focus_minutes'])
     
     def get_user_features(self, user_id: int) -> Dict:
-        """Get comprehensive user features for inference"""
+        """Get comprehensive user features for inference (served from the feature cache when fresh)"""
+        cached = get_cached_features(user_id)
+        if cached is not None:
+            return cached
+        
+        token = begin_features_load()
         try:
-            # Get recent data
-            sessions = self.get_user_sessions(user_id=user_id, days=7)
-            tasks = self.get_user_tasks(user_id=user_id, days=7)
-            moods = self.get_user_moods(user_id=user_id, days=7)
-            gamification = self.get_user_gamification(user_id=user_id)
-            
-            # Get daily focus time patterns for trend analysis
-            daily_focus = self.get_daily_focus_time(user_id=user_id, days=7)
-            
-            features = {
-                'user_id': user_id,
-                'total_sessions': len(sessions),
-                'avg_session_duration': sessions['duration'].mean() if not sessions.empty else 25,
-                'completion_rate': (tasks['is_completed'].mean() * 100) if not tasks.empty and 'is_completed' in tasks.columns else 50,
-                'current_streak': gamification['streak'].iloc[0] if not gamification.empty else 0,
-                'level': gamification['level'].iloc[0] if not gamification.empty else 1,
-                'recent_mood': moods['mood'].iloc[0] if not moods.empty else 'neutral',
-                'hour_of_day': datetime.now().hour,
-                'day_of_week': datetime.now().weekday(),
-                'is_weekend': 1 if datetime.now().weekday() >= 5 else 0,
-            }
-            
-            # Task-related features
-            if not tasks.empty:
-                features['pending_tasks'] = len(tasks[tasks['status'] == 'pending'])
-                features['high_priority_tasks'] = len(tasks[tasks['priority'] == 'high'])
-                features['avg_task_completion_time'] = tasks['completion_time'].mean() if 'completion_time' in tasks.columns else 0
-            else:
-                features['pending_tasks'] = 0
-                features['high_priority_tasks'] = 0
-                features['avg_task_completion_time'] = 0
-            
-            # Session-related features
-            if not sessions.empty:
-                features['avg_focus_duration'] = sessions[sessions['session_type'] == 'work']['duration'].mean() if 'work' in sessions['session_type'].values else 25
-                features['avg_break_duration'] = sessions[sessions['session_type'] == 'shortBreak']['duration'].mean() if 'shortBreak' in sessions['session_type'].values else 5
-                features['sessions_today'] = len(sessions[sessions['completed_at'].dt.date == datetime.now().date()])
+            if settings.FEATURES_SINGLE_QUERY:
+                features = self._get_users_features_single_query([user_id])[user_id]
             else:
-                features['avg_focus_duration'] = 25
-                features['avg_break_duration'] = 5
-                features['sessions_today'] = 0
-            
-            # Daily focus time trend features
-            if not daily_focus.empty and len(daily_focus) >= 1:
-                # Get last 3 days of focus time (excluding today)
-                today = datetime.now().date()
-                daily_focus['date_only'] = daily_focus['date'].dt.date
-                
-                # Get yesterday's focus time
-                yesterday = today - timedelta(days=1)
-                yesterday_data = daily_focus[daily_focus['date_only'] == yesterday]
-                features['focus_time_yesterday'] = yesterday_data['total_focus_minutes'].iloc[0] if not yesterday_data.empty else 0
-                
-                # Get day before yesterday's focus time
-                day_before = today - timedelta(days=2)
-                day_before_data = daily_focus[daily_focus['date_only'] == day_before]
-                features['focus_time_day_before'] = day_before_data['total_focus_minutes'].iloc[0] if not day_before_data.empty else 0
-                
-                # Get 3 days ago focus time
-                three_days_ago = today - timedelta(days=3)
-                three_days_ago_data = daily_focus[daily_focus['date_only'] == three_days_ago]
-                features['focus_time_three_days_ago'] = three_days_ago_data['total_focus_minutes'].iloc[0] if not three_days_ago_data.empty else 0
-                
-                # Calculate trend (positive if increasing, negative if decreasing)
-                if features['focus_time_yesterday'] > 0 and features['focus_time_day_before'] > 0:
-                    features['daily_trend'] = features['focus_time_yesterday'] - features['focus_time_day_before']
-                elif features['focus_time_yesterday'] > 0:
-                    features['daily_trend'] = features['focus_time_yesterday']  # New pattern starting
-                else:
-                    features['daily_trend'] = 0
-                
-                # Average of last 3 days (for baseline)
-                last_3_days = [features['focus_time_yesterday'], features['focus_time_day_before'], features['focus_time_three_days_ago']]
-                last_3_days = [x for x in last_3_days if x > 0]
-                features['avg_focus_last_3_days'] = sum(last_3_days) / len(last_3_days) if last_3_days else 25
-            else:
-                # No historical data
-                features['focus_time_yesterday'] = 0
-                features['focus_time_day_before'] = 0
-                features['focus_time_three_days_ago'] = 0
-                features['daily_trend'] = 0
-                features['avg_focus_last_3_days'] = 25
-            
-            return features
-            
+                features = self._get_user_features_multi_query(user_id)
         except Exception as e:
+            # Defaults are a stand-in for this request only; never cache them
             logger.error(f"Error getting user features: {e}")
-            return {
-                'user_id': user_id,
-                'avg_focus_duration': 25,
-                'avg_break_duration': 5,
-                'completion_rate': 50,
-                'current_streak': 0,
-                'level': 1,
-                'hour_of_day': datetime.now().hour,
-                'day_of_week': datetime.now().weekday(),
-                'is_weekend': 0,
-                'pending_tasks': 0,
-                'high_priority_tasks': 0,
-                'focus_time_yesterday': 0,
-                'focus_time_day_before': 0,
-                'focus_time_three_days_ago': 0,
-                'daily_trend': 0,
-                'avg_focus_last_3_days': 25,
-            }
-
+            return default_user_features(user_id)
+        
+        cache_features(user_id, features, token)
+        return features
+    
+    def get_users_features(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Get inference features for many users at once, keyed by user_id"""
+        results = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = get_cached_features(user_id)
+            if cached is not None:
+                results[user_id] = cached
+            else:
+                missing.append(user_id)
+        
+        if not missing:
+            return results
+        
+        if not settings.FEATURES_SINGLE_QUERY:
+            for user_id in missing:
+                results[user_id] = self.get_user_features(user_id)
+            return results
+        
+        token = begin_features_load()
+        try:
+            loaded = self._get_users_features_single_query(missing)
+        except Exception as e:
+            logger.error(f"Error getting features for {len(missing)} users: {e}")
+            results.update({user_id: default_user_features(user_id) for user_id in missing})
+            return results
+        
+        for user_id, features in loaded.items():
+            cache_features(user_id, features, token)
+        results.update(loaded)
+        return results
+    
+    def _get_users_features_single_query(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Compute feature dicts for a set of users in one round trip, without pandas"""
+        now = datetime.now()
+        with self.pool.cursor() as cur:
+            cur.execute(USER_FEATURES_QUERY, {'user_ids': list(user_ids), 'today': now.date()})
+            rows = cur.fetchall()
+        
+        return {row['user_id']: build_features_from_row(row['user_id'], row, now) for row in rows}
+    
+    def _get_user_features_multi_query(self, user_id: int) -> Dict:
+        """Get user features from five separate queries (legacy pandas path); raises on DB errors"""
+        # Get recent data
+        sessions = self.get_user_sessions(user_id=user_id, days=7, raise_errors=True)
+        tasks = self.get_user_tasks(user_id=user_id, days=7, raise_errors=True)
+        moods = self.get_user_moods(user_id=user_id, days=7, raise_errors=True)
+        gamification = self.get_user_gamification(user_id=user_id, raise_errors=True)
+        
+        # Get daily focus time patterns for trend analysis
+        daily_focus = self.get_daily_focus_time(user_id=user_id, days=7, raise_errors=True)
+        
+        features = {
+            'user_id': user_id,
+            'total_sessions': len(sessions),
+            'avg_session_duration': sessions['duration'].mean() if not sessions.empty else 25,
+            'completion_rate': (tasks['is_completed'].mean() * 100) if not tasks.empty and 'is_completed' in tasks.columns else 50,
+            'current_streak': gamification['streak'].iloc[0] if not gamification.empty else 0,
+            'level': gamification['level'].iloc[0] if not gamification.empty else 1,
+            'recent_mood': moods['mood'].iloc[0] if not moods.empty else 'neutral',
+            'hour_of_day': datetime.now().hour,
+            'day_of_week': datetime.now().weekday(),
+            'is_weekend': 1 if datetime.now().weekday() >= 5 else 0,
+        }
+        
+        # Task-related features
+        if not tasks.empty:
+            features['pending_tasks'] = len(tasks[tasks['status'] == 'pending'])
+            features['high_priority_tasks'] = len(tasks[tasks['priority'] == 'high'])
+            features['avg_task_completion_time'] = tasks['completion_time'].mean() if 'completion_time' in tasks.columns else 0
+        else:
+            features['pending_tasks'] = 0
+            features['high_priority_tasks'] = 0
+            features['avg_task_completion_time'] = 0
+        
+        # Session-related features
+        if not sessions.empty:
+            features['avg_focus_duration'] = sessions[sessions['session_type'] == 'work']['duration'].mean() if 'work' in sessions['session_type'].values else 25
+            features['avg_break_duration'] = sessions[sessions['session_type'] == 'shortBreak']['duration'].mean() if 'shortBreak' in sessions['session_type'].values else 5
+            features['sessions_today'] = len(sessions[sessions['completed_at'].dt.date == datetime.now().date()])
+        else:
+            features['avg_focus_duration'] = 25
+            features['avg_break_duration'] = 5
+            features['sessions_today'] = 0
+        
+        # Daily focus time trend features
+        if not daily_focus.empty and len(daily_focus) >= 1:
+            # Get last 3 days of focus time (excluding today)
+            today = datetime.now().date()
+            daily_focus['date_only'] = daily_focus['date'].dt.date
+            
+            for key, days_ago in (('focus_time_yesterday', 1), ('focus_time_day_before', 2), ('focus_time_three_days_ago', 3)):
+                day_data = daily_focus[daily_focus['date_only'] == today - timedelta(days=days_ago)]
+                features[key] = day_data['total_focus_minutes'].iloc[0] if not day_data.empty else 0
+        else:
+            # No historical data
+            features['focus_time_yesterday'] = 0
+            features['focus_time_day_before'] = 0
+            features['focus_time_three_days_ago'] = 0
+        
+        add_daily_trend_features(features)
+        
+        return features
@@ -0,0 +1,247 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from loguru import logger
+from config.config import settings
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out within the timeout"""
+
+
+def get_connection_params() -> Dict:
+    """Build psycopg2 connection parameters from settings"""
+    # Get password from settings, default to "postgres" if not set
+    password = settings.DB_PASSWORD
+    if not password or password == '':
+        password = "postgres"  # Default PostgreSQL password
+
+    conn_params = {
+        'host': settings.DB_HOST,
+        'port': settings.DB_PORT,
+        'database': settings.DB_NAME,
+        'user': settings.DB_USER,
+        'connect_timeout': settings.DB_CONNECT_TIMEOUT,
+    }
+
+    # Only add password if it's not None
+    if password:
+        conn_params['password'] = password
+
+    return conn_params
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections shared by every DataLoader.
+
+    Connections are handed out one per checkout, health-checked before reuse
+    and transparently replaced when the server has dropped them.
+    """
+
+    def __init__(self, min_size: int = None, max_size: int = None, timeout: float = None,
+                 healthcheck_interval: float = None, conn_params: Dict = None):
+        self.min_size = settings.DB_POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = max(1, settings.DB_POOL_MAX_SIZE if max_size is None else max_size)
+        self.timeout = settings.DB_POOL_TIMEOUT if timeout is None else timeout
+        self.healthcheck_interval = (
+            settings.DB_POOL_HEALTHCHECK_INTERVAL if healthcheck_interval is None else healthcheck_interval
+        )
+        self.conn_params = conn_params or get_connection_params()
+
+        self._idle = deque()  # (connection, last_used_at)
+        self._size = 0  # open connections, idle + checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._prefill()
+
+    def _prefill(self):
+        """Open min_size connections up front (best effort)"""
+        for _ in range(min(self.min_size, self.max_size)):
+            try:
+                conn = self._open()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not pre-open pooled connection: {e}")
+                break
+            with self._cond:
+                self._size += 1
+                self._idle.append((conn, time.monotonic()))
+        logger.info(f"✅ Database pool ready ({self._size} open, max {self.max_size})")
+
+    def _open(self):
+        """Open a new autocommit connection"""
+        try:
+            conn = psycopg2.connect(**self.conn_params)
+        except Exception as e:
+            logger.error(f"❌ Database connection failed: {e}")
+            logger.error(f"   Trying to connect to: {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME} as {settings.DB_USER}")
+            raise
+        # Read-only workload: avoid leaving connections idle in transaction
+        conn.autocommit = True
+        return conn
+
+    def _is_healthy(self, conn, last_used_at: float) -> bool:
+        """Check that an idle connection is still usable"""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used_at < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Dropping stale pooled connection: {e}")
+            return False
+
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self, timeout: float = None):
+        """Check out a connection, waiting up to `timeout` seconds for a free slot"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No database connection available within {timeout:.1f}s "
+                            f"(pool max {self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, last_used_at = self._idle.pop()
+                else:
+                    # Reserve a slot, open outside the lock
+                    self._size += 1
+                    conn, last_used_at = None, None
+
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_healthy(conn, last_used_at):
+                return conn
+
+            # Stale connection (e.g. Postgres restarted) - replace it and retry
+            self._discard(conn)
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool"""
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """Context manager yielding a pooled connection for one unit of work"""
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Connection-level failure - never hand this connection out again
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    @contextmanager
+    def cursor(self, cursor_factory=RealDictCursor, timeout: float = None):
+        """Context manager yielding a fresh cursor on a pooled connection"""
+        with self.connection(timeout) as conn:
+            with conn.cursor(cursor_factory=cursor_factory) as cur:
+                yield cur
+
+    def stats(self) -> Dict:
+        """Current pool occupancy"""
+        with self._cond:
+            return {
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def close(self):
+        """Close all idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._cond.notify_all()
+        logger.info("Database pool closed")
+
+
+# Process-wide pool shared by every DataLoader
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            # Connections must never be shared across a fork
+            _pool = ConnectionPool()
+            _pool_pid = pid
+        return _pool
+
+
+def close_pool():
+    """Close the process-wide connection pool"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+        _pool_pid = None
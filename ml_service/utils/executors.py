@@ -0,0 +1,165 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from loguru import logger
+from config.config import settings
+
+
+class ExecutorBusy(Exception):
+    """An executor's queue is full"""
+
+
+class BoundedExecutor:
+    """
+    Thread pool for one kind of blocking work, with a cap on queued calls.
+
+    Each dependency (database, CPU inference, LLM providers) gets its own
+    executor, so a backlog of slow calls to one of them cannot take the
+    threads the others need, and nothing blocking runs on the event loop.
+    Submitting while max_workers calls are running and max_queue are
+    waiting raises ExecutorBusy instead of growing the queue.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-executor")
+        self._capacity = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.active = 0
+        self.queued = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        if not self._capacity.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorBusy(f"{self.name} executor is busy ({self.max_workers} running, {self.max_queue} queued)")
+
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+
+        def call():
+            started = time.perf_counter()
+            wait_ms = (started - submitted_at) * 1000
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.total_run_ms += (time.perf_counter() - started) * 1000
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                self._capacity.release()
+
+        try:
+            return self._executor.submit(call)
+        except RuntimeError:
+            # Shut down
+            with self._lock:
+                self.queued -= 1
+            self._capacity.release()
+            raise
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Await fn(*args, **kwargs) running on this executor"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self.completed + self.failed + self.active
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'queued': self.queued,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.total_wait_ms / started, 2) if started else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 2),
+                'avg_run_ms': round(self.total_run_ms / (self.completed + self.failed), 2) if self.completed + self.failed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _executor_limits() -> Dict[str, tuple]:
+    return {
+        'db': (settings.DB_EXECUTOR_WORKERS, settings.DB_EXECUTOR_QUEUE),
+        'cpu': (settings.CPU_EXECUTOR_WORKERS or os.cpu_count() or 1, settings.CPU_EXECUTOR_QUEUE),
+        'llm': (settings.LLM_EXECUTOR_WORKERS, settings.LLM_EXECUTOR_QUEUE),
+    }
+
+
+# Executors of the current process (threads do not survive a fork)
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_pid: Optional[int] = None
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Return the executor for 'db', 'cpu' or 'llm' work"""
+    global _executors, _executors_pid
+    if _executors_pid != os.getpid():
+        with _executors_lock:
+            if _executors_pid != os.getpid():
+                _executors = {}
+                _executors_pid = os.getpid()
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                max_workers, max_queue = _executor_limits()[name]
+                executor = _executors[name] = BoundedExecutor(name, max_workers, max_queue)
+                logger.debug(f"Started {name} executor ({executor.max_workers} threads, queue {executor.max_queue})")
+    return executor
+
+
+async def run_blocking(name: str, fn: Callable, *args, **kwargs):
+    """Run a blocking call on the named executor without blocking the event loop"""
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict]:
+    if _executors_pid != os.getpid():
+        return {}
+    return {name: executor.stats() for name, executor in _executors.items()}
+
+
+def shutdown_executors():
+    global _executors
+    with _executors_lock:
+        if _executors_pid == os.getpid():
+            for executor in _executors.values():
+                executor.shutdown()
+        _executors = {}
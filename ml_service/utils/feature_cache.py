@@ -0,0 +1,56 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from typing import Dict, Optional, Tuple
+from config.config import settings
+from utils.cache import LRUCache
+from utils.shared_state import SharedStamps
+
+# Per-user inference features shared by the sync and async data loaders.
+# Entries are invalidated by the backend whenever it writes a timer session,
+# task or mood log (POST /ml/features/{user_id}/invalidate).
+feature_cache = LRUCache(
+    capacity=settings.FEATURE_CACHE_SIZE,
+    ttl=settings.FEATURE_CACHE_TTL_SECONDS,
+    name="user_features",
+)
+
+# The cache itself is per process, but an invalidation reaches only the prefork
+# worker that served it. It is also stamped here, in memory every worker
+# shares, and entries loaded before a user's stamp are treated as misses.
+_invalidations = SharedStamps(settings.FEATURE_CACHE_INVALIDATION_SLOTS)
+
+
+def begin_features_load() -> Tuple[int, float]:
+    """Token to pass to cache_features() for features about to be loaded from the DB"""
+    return feature_cache.begin_load(), time.time()
+
+
+def get_cached_features(user_id: int) -> Optional[Dict]:
+    """Return a copy of the cached feature dict (callers may mutate it)"""
+    if not settings.FEATURE_CACHE_ENABLED:
+        return None
+    entry = feature_cache.get(user_id)
+    if entry is None:
+        return None
+    loaded_at, features = entry
+    if _invalidations.changed_since(user_id, loaded_at):
+        # Invalidated through another worker
+        feature_cache.invalidate(user_id)
+        return None
+    return dict(features)
+
+
+def cache_features(user_id: int, features: Dict, token: Tuple[int, float] = None):
+    """Store a freshly loaded feature dict"""
+    if settings.FEATURE_CACHE_ENABLED:
+        epoch, loaded_at = token if token is not None else (None, time.time())
+        feature_cache.set(user_id, (loaded_at, dict(features)), token=epoch)
+
+
+def invalidate_features(user_id: int) -> bool:
+    """Forget the cached features of one user, in every worker"""
+    _invalidations.touch(user_id)
+    return feature_cache.invalidate(user_id)
@@ -1,31 +1,54 @@
 import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Sequence, Union
 from datetime import datetime
 
+MOOD_MAP = {
+    'happy': 2,
+    'calm': 1,
+    'neutral': 0,
+    'tired': -1,
+    'anxious': -2,
+    'sad': -2
+}
+
+PRIORITY_MAP = {
+    'high': 3,
+    'medium': 2,
+    'low': 1
+}
+
+# Column order of the model matrices
+POMODORO_FEATURE_NAMES = [
+    'avg_focus_duration', 'avg_break_duration', 'completion_rate', 'current_streak',
+    'level', 'total_sessions', 'sessions_today',
+    'focus_time_yesterday', 'focus_time_day_before', 'focus_time_three_days_ago',
+    'daily_trend', 'avg_focus_last_3_days',
+    'mood',
+    'hour', 'day_of_week', 'is_weekend', 'is_morning', 'is_afternoon', 'is_evening',
+    'pending_tasks', 'high_priority_tasks', 'task_priority',
+    'productivity_score',
+]
+
+DISTRACTION_FEATURE_NAMES = [
+    'session_duration', 'sessions_today', 'avg_session_duration',
+    'current_streak', 'level', 'completion_rate',
+    'mood',
+    'hour', 'is_weekend', 'is_afternoon',
+    'pending_tasks', 'high_priority_tasks',
+    'stress_score',
+]
+
 class FeatureEngineer:
     @staticmethod
     def encode_mood(mood: str) -> int:
         """Encode mood to numeric value"""
-        mood_map = {
-            'happy': 2,
-            'calm': 1,
-            'neutral': 0,
-            'tired': -1,
-            'anxious': -2,
-            'sad': -2
-        }
-        return mood_map.get(mood.lower(), 0)
+        return MOOD_MAP.get(mood.lower(), 0)
     
     @staticmethod
     def encode_priority(priority: str) -> int:
         """Encode priority to numeric value"""
-        priority_map = {
-            'high': 3,
-            'medium': 2,
-            'low': 1
-        }
-        return priority_map.get(priority.lower(), 2)
+        return PRIORITY_MAP.get(priority.lower(), 2)
     
     @staticmethod
     def encode_session_type(session_type: str) -> int:
@@ -51,100 +74,181 @@ class FeatureEngineer:
         }
     
     @staticmethod
-    def prepare_pomodoro_features(user_features: Dict, task_priority: str = 'medium') -> np.ndarray:
-        """Prepare features for Pomodoro recommendation model"""
-        features = []
+    def _to_frame(users: Union[pd.DataFrame, Sequence[Dict], np.ndarray]) -> pd.DataFrame:
+        """Accept a DataFrame, a list of feature dicts or a NumPy record array"""
+        if isinstance(users, pd.DataFrame):
+            return users.reset_index(drop=True)
+        return pd.DataFrame.from_records(users) if len(users) else pd.DataFrame()
+    
+    @staticmethod
+    def _column(df: pd.DataFrame, name: str, default) -> np.ndarray:
+        """Float64 column with missing values (or a missing column) replaced by the default"""
+        if name not in df.columns:
+            return np.full(len(df), default, dtype=np.float64)
+        return pd.to_numeric(df[name], errors='coerce').fillna(default).to_numpy(dtype=np.float64)
+    
+    @staticmethod
+    def _broadcast(values, n: int) -> np.ndarray:
+        """Broadcast a scalar or per-row sequence to length n"""
+        if isinstance(values, str) or np.ndim(values) == 0:
+            return np.full(n, values, dtype=object if isinstance(values, str) else np.float64)
+        values = np.asarray(values)
+        if len(values) != n:
+            raise ValueError(f"Expected {n} values, got {len(values)}")
+        return values
+    
+    @staticmethod
+    def encode_moods(moods: pd.Series) -> np.ndarray:
+        """Vectorized encode_mood()"""
+        return moods.astype(str).str.lower().map(MOOD_MAP).fillna(0).to_numpy(dtype=np.float64)
+    
+    @staticmethod
+    def encode_priorities(priorities: pd.Series) -> np.ndarray:
+        """Vectorized encode_priority()"""
+        return priorities.astype(str).str.lower().map(PRIORITY_MAP).fillna(2).to_numpy(dtype=np.float64)
+    
+    @staticmethod
+    def _time_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Vectorized get_time_features() over the hour_of_day / day_of_week columns"""
+        now = datetime.now()
+        hour = FeatureEngineer._column(df, 'hour_of_day', now.hour)
+        day_of_week = FeatureEngineer._column(df, 'day_of_week', now.weekday())
+        return {
+            'hour': hour,
+            'day_of_week': day_of_week,
+            'is_weekend': (day_of_week >= 5).astype(np.float64),
+            'is_morning': ((hour >= 6) & (hour < 12)).astype(np.float64),
+            'is_afternoon': ((hour >= 12) & (hour < 18)).astype(np.float64),
+            'is_evening': ((hour >= 18) & (hour < 22)).astype(np.float64),
+            'is_night': ((hour >= 22) | (hour < 6)).astype(np.float64),
+        }
+    
+    @staticmethod
+    def _recent_moods(df: pd.DataFrame) -> pd.Series:
+        if 'recent_mood' not in df.columns:
+            return pd.Series(['neutral'] * len(df), dtype=object)
+        return df['recent_mood'].fillna('neutral')
+    
+    @staticmethod
+    def prepare_pomodoro_features_batch(users: Union[pd.DataFrame, Sequence[Dict], np.ndarray],
+                                        task_priority: Union[str, Sequence[str]] = 'medium',
+                                        dtype=np.float32) -> np.ndarray:
+        """
+        Prepare the Pomodoro model matrix for N users at once.
         
-        # User stats
-        features.append(user_features.get('avg_focus_duration', 25))
-        features.append(user_features.get('avg_break_duration', 5))
-        features.append(user_features.get('completion_rate', 50))
-        features.append(user_features.get('current_streak', 0))
-        features.append(user_features.get('level', 1))
-        features.append(user_features.get('total_sessions', 0))
-        features.append(user_features.get('sessions_today', 0))
+        Returns an (N, len(POMODORO_FEATURE_NAMES)) array; task_priority may be
+        a single value or one per user.
+        """
+        df = FeatureEngineer._to_frame(users)
+        n = len(df)
+        col = lambda name, default: FeatureEngineer._column(df, name, default)
         
-        # Daily trend features (NEW - for learning from daily patterns)
-        features.append(user_features.get('focus_time_yesterday', 0))
-        features.append(user_features.get('focus_time_day_before', 0))
-        features.append(user_features.get('focus_time_three_days_ago', 0))
-        features.append(user_features.get('daily_trend', 0))  # Positive = increasing, negative = decreasing
-        features.append(user_features.get('avg_focus_last_3_days', 25))
+        completion_rate = col('completion_rate', 50)
+        current_streak = col('current_streak', 0)
+        level = col('level', 1)
+        time_feats = FeatureEngineer._time_columns(df)
+        priorities = pd.Series(FeatureEngineer._broadcast(task_priority, n), dtype=object)
         
-        # Mood encoding
-        mood = user_features.get('recent_mood', 'neutral')
-        features.append(FeatureEngineer.encode_mood(mood))
+        # Productivity score (composite)
+        productivity_score = (
+            completion_rate * 0.4 +
+            current_streak * 2 * 0.3 +
+            (level / 10) * 0.3
+        )
         
-        # Time features
-        hour = user_features.get('hour_of_day', datetime.now().hour)
-        day_of_week = user_features.get('day_of_week', datetime.now().weekday())
-        time_feats = FeatureEngineer.get_time_features(hour, day_of_week)
-        features.extend([
+        columns = [
+            # User stats
+            col('avg_focus_duration', 25),
+            col('avg_break_duration', 5),
+            completion_rate,
+            current_streak,
+            level,
+            col('total_sessions', 0),
+            col('sessions_today', 0),
+            # Daily trend features
+            col('focus_time_yesterday', 0),
+            col('focus_time_day_before', 0),
+            col('focus_time_three_days_ago', 0),
+            col('daily_trend', 0),
+            col('avg_focus_last_3_days', 25),
+            # Mood encoding
+            FeatureEngineer.encode_moods(FeatureEngineer._recent_moods(df)),
+            # Time features
             time_feats['hour'],
             time_feats['day_of_week'],
             time_feats['is_weekend'],
             time_feats['is_morning'],
             time_feats['is_afternoon'],
             time_feats['is_evening'],
-        ])
-        
-        # Task features
-        features.append(user_features.get('pending_tasks', 0))
-        features.append(user_features.get('high_priority_tasks', 0))
-        features.append(FeatureEngineer.encode_priority(task_priority))
-        
-        # Productivity score (composite)
-        productivity_score = (
-            user_features.get('completion_rate', 50) * 0.4 +
-            user_features.get('current_streak', 0) * 2 * 0.3 +
-            (user_features.get('level', 1) / 10) * 0.3
-        )
-        features.append(productivity_score)
-        
-        return np.array(features).reshape(1, -1)
+            # Task features
+            col('pending_tasks', 0),
+            col('high_priority_tasks', 0),
+            FeatureEngineer.encode_priorities(priorities),
+            productivity_score,
+        ]
+        if n == 0:
+            return np.empty((0, len(POMODORO_FEATURE_NAMES)), dtype=dtype)
+        return np.column_stack(columns).astype(dtype, copy=False)
     
     @staticmethod
-    def prepare_distraction_features(user_features: Dict, session_duration: int) -> np.ndarray:
-        """Prepare features for distraction prediction"""
-        features = []
-        
-        # Session features
-        features.append(session_duration)
-        features.append(user_features.get('sessions_today', 0))
-        features.append(user_features.get('avg_session_duration', 25))
-        
-        # User state
-        features.append(user_features.get('current_streak', 0))
-        features.append(user_features.get('level', 1))
-        features.append(user_features.get('completion_rate', 50))
+    def prepare_distraction_features_batch(users: Union[pd.DataFrame, Sequence[Dict], np.ndarray],
+                                           session_duration: Union[float, Sequence[float]] = 25,
+                                           dtype=np.float32) -> np.ndarray:
+        """
+        Prepare the distraction model matrix for N users at once.
         
-        # Mood
-        mood = user_features.get('recent_mood', 'neutral')
-        features.append(FeatureEngineer.encode_mood(mood))
+        Returns an (N, len(DISTRACTION_FEATURE_NAMES)) array; session_duration
+        may be a single value or one per user.
+        """
+        df = FeatureEngineer._to_frame(users)
+        n = len(df)
+        col = lambda name, default: FeatureEngineer._column(df, name, default)
         
-        # Time features
-        hour = user_features.get('hour_of_day', datetime.now().hour)
-        day_of_week = user_features.get('day_of_week', datetime.now().weekday())
-        time_feats = FeatureEngineer.get_time_features(hour, day_of_week)
-        features.extend([
-            time_feats['hour'],
-            time_feats['is_weekend'],
-            time_feats['is_afternoon'],  # Afternoon distraction is common
-        ])
-        
-        # Task load
-        features.append(user_features.get('pending_tasks', 0))
-        features.append(user_features.get('high_priority_tasks', 0))
+        moods = FeatureEngineer._recent_moods(df)
+        pending_tasks = col('pending_tasks', 0)
+        high_priority_tasks = col('high_priority_tasks', 0)
+        time_feats = FeatureEngineer._time_columns(df)
         
         # Stress indicator
         stress_score = (
-            (1 if mood in ['anxious', 'tired'] else 0) * 0.5 +
-            (user_features.get('high_priority_tasks', 0) > 3) * 0.3 +
-            (user_features.get('pending_tasks', 0) > 5) * 0.2
+            moods.isin(['anxious', 'tired']).to_numpy(dtype=np.float64) * 0.5 +
+            (high_priority_tasks > 3) * 0.3 +
+            (pending_tasks > 5) * 0.2
         )
-        features.append(stress_score)
         
-        return np.array(features).reshape(1, -1)
+        columns = [
+            # Session features
+            FeatureEngineer._broadcast(session_duration, n).astype(np.float64),
+            col('sessions_today', 0),
+            col('avg_session_duration', 25),
+            # User state
+            col('current_streak', 0),
+            col('level', 1),
+            col('completion_rate', 50),
+            # Mood
+            FeatureEngineer.encode_moods(moods),
+            # Time features (afternoon distraction is common)
+            time_feats['hour'],
+            time_feats['is_weekend'],
+            time_feats['is_afternoon'],
+            # Task load
+            pending_tasks,
+            high_priority_tasks,
+            stress_score,
+        ]
+        if n == 0:
+            return np.empty((0, len(DISTRACTION_FEATURE_NAMES)), dtype=dtype)
+        return np.column_stack(columns).astype(dtype, copy=False)
+    
+    @staticmethod
+    def prepare_pomodoro_features(user_features: Dict, task_priority: str = 'medium') -> np.ndarray:
+        """Prepare features for Pomodoro recommendation model (single user, shape (1, n))"""
+        return FeatureEngineer.prepare_pomodoro_features_batch([user_features], task_priority, dtype=np.float64)
+    
+    @staticmethod
+    def prepare_distraction_features(user_features: Dict, session_duration: int) -> np.ndarray:
+        """Prepare features for distraction prediction (single user, shape (1, n))"""
+        return FeatureEngineer.prepare_distraction_features_batch([user_features], session_duration, dtype=np.float64)
     
     @staticmethod
     def normalize_features(features: np.ndarray, mean: np.ndarray = None, std: np.ndarray = None) -> np.ndarray:
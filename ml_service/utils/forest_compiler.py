@@ -0,0 +1,255 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Dict, Optional
+
+import numpy as np
+from loguru import logger
+
+# sklearn is only imported to compile a fitted model (which already loaded it);
+# serving from a model artifact never imports it
+
+_ARRAY_NAMES = ("roots", "feature", "threshold", "left", "right", "missing_left", "value")
+
+
+class CompiledForest:
+    """
+    A fitted random forest flattened into contiguous NumPy arrays.
+
+    All trees are walked at once, one level per step, so a prediction costs
+    max_depth vectorized steps instead of sklearn's per-tree Python calls.
+    Inputs are compared as float32 against float64 thresholds and leaf values
+    are summed tree by tree in estimator order, exactly like sklearn, so the
+    output is bit-identical.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], kind: str, n_outputs: int, max_depth: int,
+                 n_features: int, classes: Optional[np.ndarray] = None):
+        self.roots = arrays["roots"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+
+        self.kind = kind  # "regressor" or "classifier"
+        self.n_outputs = n_outputs
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.classes_ = classes
+        self.n_trees = len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompiledForest":
+        """Flatten a fitted RandomForestRegressor / single-output RandomForestClassifier"""
+        import sklearn
+        from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+        
+        # Before 1.4 classifier trees stored class counts and normalized them in predict_proba
+        normalizes_proba = tuple(int(p) for p in sklearn.__version__.split(".")[:2]) < (1, 4)
+        
+        if isinstance(forest, RandomForestClassifier):
+            if forest.n_outputs_ != 1:
+                raise NotImplementedError("Multi-output classifiers are not supported")
+            kind = "classifier"
+        elif isinstance(forest, RandomForestRegressor):
+            kind = "regressor"
+        else:
+            raise TypeError(f"Cannot compile {type(forest).__name__}")
+
+        roots, feature, threshold, left, right, missing_left, value = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point to themselves so a walk of max_depth steps settles on them
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            right.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            missing = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(n_nodes, dtype=bool) if missing is None else np.asarray(missing, dtype=bool))
+
+            if kind == "classifier":
+                proba = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+                if normalizes_proba:
+                    normalizer = proba.sum(axis=1)[:, np.newaxis]
+                    normalizer[normalizer == 0.0] = 1.0
+                    proba = proba / normalizer
+                value.append(proba)
+            else:
+                value.append(tree.value[:, :, 0].astype(np.float64))
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            "roots": np.asarray(roots, dtype=np.intp),
+            "feature": np.concatenate(feature).astype(np.intp),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "left": np.concatenate(left).astype(np.intp),
+            "right": np.concatenate(right).astype(np.intp),
+            "missing_left": np.concatenate(missing_left),
+            "value": np.ascontiguousarray(np.concatenate(value)),
+        }
+        classes = np.asarray(forest.classes_) if kind == "classifier" else None
+        return cls(arrays, kind, forest.n_outputs_, max_depth, forest.n_features_in_, classes)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Flat arrays (for saving); rebuild with from_arrays(arrays, **metadata())"""
+        return {name: getattr(self, name) for name in _ARRAY_NAMES}
+
+    def metadata(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "n_outputs": self.n_outputs,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "classes": None if self.classes_ is None else self.classes_.tolist(),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], kind: str, n_outputs: int, max_depth: int,
+                    n_features: int, classes=None) -> "CompiledForest":
+        return cls({name: arrays[name] for name in _ARRAY_NAMES}, kind, n_outputs, max_depth,
+                   n_features, None if classes is None else np.asarray(classes))
+
+    def _leaf_values(self, X) -> np.ndarray:
+        """Leaf values of every tree for every row, shape (n_trees, n_rows, n_values)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n, {self.n_features}), got {X.shape}")
+
+        rows = np.arange(X.shape[0])[np.newaxis, :]
+        node = np.broadcast_to(self.roots[:, np.newaxis], (self.n_trees, X.shape[0]))
+        has_nan = np.isnan(X).any()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node]
+
+    def _accumulate(self, X) -> np.ndarray:
+        # Reducing over the outer axis adds the trees one after another (numpy
+        # only sums pairwise along the innermost axis), matching sklearn's
+        # in-order accumulation; verify_compiled() checks this at load time
+        total = np.add.reduce(self._leaf_values(X), axis=0)
+        total /= self.n_trees
+        return total
+
+    def predict(self, X) -> np.ndarray:
+        if self.kind == "classifier":
+            return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+        total = self._accumulate(X)
+        return total[:, 0] if self.n_outputs == 1 else total
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.kind != "classifier":
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._accumulate(X)
+
+
+class CompiledScaler:
+    """StandardScaler.transform without sklearn's per-call validation"""
+
+    def __init__(self, mean: Optional[np.ndarray], scale: Optional[np.ndarray]):
+        self.mean = mean
+        self.scale = scale
+
+    @classmethod
+    def from_sklearn(cls, scaler) -> "CompiledScaler":
+        return cls(scaler.mean_ if scaler.with_mean else None, scaler.scale_ if scaler.with_std else None)
+
+    def transform(self, X) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+
+def _probe_inputs(forest: CompiledForest, n_rows: int = 64, seed: int = 0) -> np.ndarray:
+    """Rows whose values sit on and around the split thresholds"""
+    rng = np.random.default_rng(seed)
+    is_split = np.isfinite(forest.threshold)
+    X = rng.normal(size=(n_rows, forest.n_features))
+    for f in range(forest.n_features):
+        thresholds = forest.threshold[is_split & (forest.feature == f)]
+        if len(thresholds):
+            picks = rng.choice(thresholds, size=n_rows)
+            X[:, f] = picks + rng.choice([-1e-6, 0.0, 1e-6], size=n_rows)
+    return X
+
+
+def _forest_matches(forest: CompiledForest, estimator, n_rows: int) -> bool:
+    """Raw output of one compiled forest against its sklearn estimator, probed at its own thresholds"""
+    X = _probe_inputs(forest, n_rows)
+    if hasattr(estimator, "predict_proba") and hasattr(forest, "predict_proba"):
+        return np.array_equal(forest.predict_proba(X), estimator.predict_proba(X))
+    return np.array_equal(forest.predict(X), estimator.predict(X))
+
+
+def verify_compiled(compiled, model, n_rows: int = 64) -> bool:
+    """Check the compiled model reproduces the sklearn model bit for bit"""
+    if isinstance(compiled, CompiledForest):
+        return _forest_matches(compiled, model, n_rows)
+
+    # Wrappers: every forest against its own estimator (before any clipping), then the combined output
+    if hasattr(model, "sklearn_forests"):
+        estimators = model.sklearn_forests()
+        if len(estimators) != len(compiled.forests):
+            return False
+        if not all(_forest_matches(forest, estimator, n_rows) for forest, estimator in zip(compiled.forests, estimators)):
+            return False
+    X = np.vstack([_probe_inputs(forest, n_rows) for forest in compiled.forests])
+    return np.array_equal(compiled.predict(X), model.predict(X))
+
+
+def compile_model(model, verify: bool = True):
+    """
+    Compile a fitted forest (or a model wrapping forests) for fast inference.
+
+    Wrapper models can provide a compile() method returning an object with
+    predict() and a `forests` list of CompiledForest, and sklearn_forests()
+    returning the matching estimators so each forest is verified. Returns None when the
+    model type is not supported or the compiled version does not reproduce
+    the original, so callers can keep using it.
+    """
+    if model is None:
+        return None
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    try:
+        if isinstance(model, (RandomForestRegressor, RandomForestClassifier)):
+            compiled = CompiledForest.from_sklearn(model)
+        elif hasattr(model, "compile"):
+            compiled = model.compile()
+        else:
+            return None
+    except Exception as e:
+        logger.warning(f"⚠️ Could not compile {type(model).__name__}: {e}")
+        return None
+
+    if verify and compiled is not None and not verify_compiled(compiled, model):
+        logger.warning(f"⚠️ Compiled {type(model).__name__} does not match sklearn output - not using it")
+        return None
+    return compiled
+
+
+def compile_scaler(scaler):
+    """Fast transform for a fitted StandardScaler (None for other scalers)"""
+    if scaler is None:
+        return None
+    from sklearn.preprocessing import StandardScaler
+    if isinstance(scaler, StandardScaler):
+        return CompiledScaler.from_sklearn(scaler)
+    return None
@@ -0,0 +1,83 @@
+import builtins
+import importlib.util
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Helpers for keeping heavy optional libraries (LLM SDKs, sklearn, joblib,
+# torch) off the import path of the service: check that a library is
+# installed without importing it, and import it inside the code that needs it.
+
+
+def module_available(name: str) -> bool:
+    """True if `name` can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # find_spec imports parent packages, which may be missing themselves
+        return False
+
+
+class ImportProfiler:
+    """
+    Records how long each module takes to import while active.
+
+    Times are inclusive of the module's own imports (like `python -X importtime`)
+    and only first imports are recorded, so the report shows what a cold
+    start actually pays for.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.total_ms = 0.0
+        self._original_import = builtins.__import__
+        self._active = False
+        self._started = 0.0
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Modules imported while active may keep a reference to this function
+        # (logging.config does), so it must keep working after stop()
+        if not self._active or level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            if name in sys.modules and name not in self.timings:
+                self.timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def start(self):
+        if self._active:
+            return
+        self._active = True
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        self._started = time.perf_counter()
+
+    def stop(self):
+        if not self._active:
+            return
+        self._active = False
+        builtins.__import__ = self._original_import
+        self.total_ms = round(self.total_ms + (time.perf_counter() - self._started) * 1000, 2)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def slowest(self, limit: int = 10) -> List[Tuple[str, float]]:
+        return sorted(self.timings.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def report(self, limit: int = 15) -> Dict:
+        return {
+            'total_ms': self.total_ms,
+            'modules_ms': dict(self.slowest(limit)),
+        }
+
+
+# Profiles the imports of app.main (see the top of that module)
+import_profiler = ImportProfiler()
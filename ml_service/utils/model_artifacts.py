@@ -0,0 +1,155 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import shutil
+import struct
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from utils.forest_compiler import CompiledForest, CompiledScaler, compile_model, compile_scaler
+from utils.pomodoro_models import CompiledPomodoroModel
+
+# Pickle-free model artifact: a directory holding manifest.json (metadata,
+# feature order, metrics) and arrays.npz (flattened forests, scaler stats).
+# The npz is stored uncompressed so every array can be memory-mapped in place.
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+ARRAYS_FILE = "arrays.npz"
+
+
+class ModelArtifact:
+    """A loaded artifact: compiled model, scaler and metadata"""
+
+    def __init__(self, manifest: Dict, model, scaler: Optional[CompiledScaler],
+                 feature_mean: Optional[np.ndarray], feature_std: Optional[np.ndarray]):
+        self.manifest = manifest
+        self.model = model
+        self.scaler = scaler
+        self.feature_mean = feature_mean
+        self.feature_std = feature_std
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.manifest.get("feature_names", [])
+
+    @property
+    def metrics(self) -> Dict:
+        return self.manifest.get("metrics", {})
+
+
+def save_artifact(artifact_dir: str, model_name: str, model, scaler=None, feature_names: List[str] = None,
+                  metrics: Dict = None, feature_mean: np.ndarray = None, feature_std: np.ndarray = None) -> str:
+    """Write a model (sklearn forest or Pomodoro wrapper) as a manifest + npz artifact"""
+    compiled = compile_model(model)
+    if compiled is None:
+        raise ValueError(f"Cannot export {type(model).__name__} as an artifact")
+    forests = compiled.forests if isinstance(compiled, CompiledPomodoroModel) else [compiled]
+
+    arrays = {}
+    for i, forest in enumerate(forests):
+        for name, array in forest.to_arrays().items():
+            # Fixed-width dtypes so artifacts load the same on every platform
+            if array.dtype.kind == "i":
+                array = array.astype(np.int64)
+            arrays[f"forest{i}_{name}"] = np.ascontiguousarray(array)
+
+    compiled_scaler = compile_scaler(scaler)
+    if scaler is not None and compiled_scaler is None:
+        raise ValueError(f"Cannot export scaler {type(scaler).__name__} as an artifact")
+    if compiled_scaler is not None:
+        if compiled_scaler.mean is not None:
+            arrays["scaler_mean"] = np.asarray(compiled_scaler.mean, dtype=np.float64)
+        if compiled_scaler.scale is not None:
+            arrays["scaler_scale"] = np.asarray(compiled_scaler.scale, dtype=np.float64)
+    if feature_mean is not None:
+        arrays["feature_mean"] = np.asarray(feature_mean, dtype=np.float64)
+    if feature_std is not None:
+        arrays["feature_std"] = np.asarray(feature_std, dtype=np.float64)
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "model_name": model_name,
+        "model_type": "pomodoro" if isinstance(compiled, CompiledPomodoroModel) else "forest",
+        "forests": [forest.metadata() for forest in forests],
+        "has_scaler": compiled_scaler is not None,
+        "feature_names": list(feature_names or []),
+        "metrics": metrics or {},
+        "created_at": datetime.now().isoformat(),
+        "arrays_file": ARRAYS_FILE,
+    }
+
+    # Write into a temp dir and rename, so readers never see half an artifact
+    tmp_dir = f"{artifact_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.savez(os.path.join(tmp_dir, ARRAYS_FILE), **arrays)
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    if os.path.exists(artifact_dir):
+        shutil.rmtree(artifact_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(artifact_dir)), exist_ok=True)
+    os.replace(tmp_dir, artifact_dir)
+
+    logger.info(f"✅ Model artifact saved to {artifact_dir}")
+    return artifact_dir
+
+
+def _mmap_npz(path: str) -> Dict[str, np.ndarray]:
+    """Memory-map every array of an uncompressed .npz without copying it"""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} is compressed and cannot be memory-mapped")
+            # Skip the local file header to reach the .npy bytes
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if dtype.hasobject:
+                raise ValueError(f"{name} holds Python objects")
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                     order="F" if fortran_order else "C")
+    return arrays
+
+
+def _load_npz(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_artifact(artifact_dir: str, mmap: bool = True) -> ModelArtifact:
+    """Load an artifact written by save_artifact()"""
+    with open(os.path.join(artifact_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format_version')}")
+
+    arrays_path = os.path.join(artifact_dir, manifest.get("arrays_file", ARRAYS_FILE))
+    arrays = _mmap_npz(arrays_path) if mmap else _load_npz(arrays_path)
+
+    forests = []
+    for i, metadata in enumerate(manifest["forests"]):
+        prefix = f"forest{i}_"
+        forest_arrays = {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+        forests.append(CompiledForest.from_arrays(forest_arrays, **metadata))
+    model = CompiledPomodoroModel(forests) if manifest["model_type"] == "pomodoro" else forests[0]
+
+    scaler = None
+    if manifest.get("has_scaler"):
+        scaler = CompiledScaler(arrays.get("scaler_mean"), arrays.get("scaler_scale"))
+
+    return ModelArtifact(manifest, model, scaler, arrays.get("feature_mean"), arrays.get("feature_std"))
@@ -25,12 +25,24 @@ class ModelVersioning:
     
     def _save_versions(self):
         """Save version information"""
-        with open(self.version_file, 'w') as f:
+        # Write and rename so the running service never reads a half-written file
+        tmp_file = self.version_file.with_name(f"{self.version_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
             json.dump(self.versions, f, indent=2)
+        os.replace(tmp_file, self.version_file)
     
-    def register_model(self, model_name: str, model_path: str, metrics: Dict = None) -> str:
+    def new_version(self) -> str:
+        """Version id for a model about to be registered"""
+        return datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    def artifact_dir(self, model_name: str, version: str) -> str:
+        """Where the pickle-free artifact of a model version lives"""
+        return str(self.model_dir / "artifacts" / model_name / version)
+    
+    def register_model(self, model_name: str, model_path: str, metrics: Dict = None,
+                       version: str = None, artifact_path: str = None) -> str:
         """Register a new model version"""
-        version = datetime.now().strftime("%Y%m%d_%H%M%S")
+        version = version or self.new_version()
         
         if model_name not in self.versions:
             self.versions[model_name] = {}
@@ -41,6 +53,8 @@ class ModelVersioning:
             'metrics': metrics or {},
             'is_current': False
         }
+        if artifact_path:
+            self.versions[model_name][version]['artifact'] = artifact_path
         
         # Set as current version
         self._set_current_version(model_name, version)
@@ -83,6 +97,30 @@ class ModelVersioning:
         
         return None
     
+    def get_artifact_path(self, model_name: str, version: str = None) -> Optional[str]:
+        """Get the artifact directory of a model version (None for joblib-only versions)"""
+        if model_name not in self.versions:
+            return None
+        
+        if version is None:
+            version = self.get_current_version(model_name)
+        
+        if version and version in self.versions[model_name]:
+            return self.versions[model_name][version].get('artifact')
+        
+        return None
+    
+    def load_artifact(self, model_name: str, version: str = None, mmap: bool = None):
+        """Load the pickle-free artifact of a model version, or None if it has none"""
+        from utils.model_artifacts import load_artifact
+        
+        artifact_path = self.get_artifact_path(model_name, version)
+        if not artifact_path or not os.path.isdir(artifact_path):
+            return None
+        
+        mmap = settings.MODEL_ARTIFACT_MMAP if mmap is None else mmap
+        return load_artifact(artifact_path, mmap=mmap)
+    
     def list_versions(self, model_name: str) -> Dict:
         """List all versions of a model"""
         return self.versions.get(model_name, {})
@@ -114,6 +152,10 @@ class ModelVersioning:
                 shutil.move(str(old_path), str(archive_path))
                 logger.info(f"Archived {model_name} version {version}")
             
+            artifact_path = version_info.get('artifact')
+            if artifact_path and Path(artifact_path).exists():
+                shutil.move(artifact_path, str(archive_dir / f"{model_name}_{version}_artifact"))
+            
             del self.versions[model_name][version]
         
         self._save_versions()
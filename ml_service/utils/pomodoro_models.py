@@ -0,0 +1,75 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import List
+
+import numpy as np
+
+from utils.forest_compiler import CompiledForest
+
+# Recommendations are clipped to these ranges (minutes)
+FOCUS_RANGE = (5, 60)
+BREAK_RANGE = (1, 30)
+
+
+def _clip_predictions(focus_pred: np.ndarray, break_pred: np.ndarray) -> np.ndarray:
+    return np.column_stack([np.clip(focus_pred, *FOCUS_RANGE), np.clip(break_pred, *BREAK_RANGE)])
+
+
+class MultiOutputPomodoroModel:
+    """One multi-output forest predicting [focus, break] in a single pass"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, X) -> np.ndarray:
+        pred = self.model.predict(X)
+        return _clip_predictions(pred[:, 0], pred[:, 1])
+
+    def compile(self) -> "CompiledPomodoroModel":
+        return CompiledPomodoroModel([CompiledForest.from_sklearn(self.model)])
+
+    def sklearn_forests(self) -> list:
+        return [self.model]
+
+
+class CombinedModel:
+    """Separate focus and break forests (models trained before multi-output support)"""
+
+    def __init__(self, focus_model, break_model):
+        self.focus_model = focus_model
+        self.break_model = break_model
+
+    def predict(self, X) -> np.ndarray:
+        focus_pred = self.focus_model.predict(X)
+        break_pred = self.break_model.predict(X)
+        # Clip to reasonable ranges
+        return _clip_predictions(focus_pred, break_pred)
+
+    def compile(self) -> "CompiledPomodoroModel":
+        return CompiledPomodoroModel([
+            CompiledForest.from_sklearn(self.focus_model),
+            CompiledForest.from_sklearn(self.break_model),
+        ])
+
+    def sklearn_forests(self) -> list:
+        return [self.focus_model, self.break_model]
+
+
+class CompiledPomodoroModel:
+    """Compiled form of either Pomodoro model, with the same (n, 2) output"""
+
+    def __init__(self, forests: List[CompiledForest]):
+        self.forests = forests
+
+    @property
+    def n_trees(self) -> int:
+        return sum(forest.n_trees for forest in self.forests)
+
+    def predict(self, X) -> np.ndarray:
+        if len(self.forests) == 1:
+            pred = self.forests[0].predict(X)
+            return _clip_predictions(pred[:, 0], pred[:, 1])
+        focus_forest, break_forest = self.forests
+        return _clip_predictions(focus_forest.predict(X), break_forest.predict(X))
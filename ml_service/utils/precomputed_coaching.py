@@ -0,0 +1,139 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Optional
+from loguru import logger
+from config.config import settings
+from utils.shared_state import SharedCounters
+
+# Coaching answers written by jobs/precompute_coaching.py. Each entry holds the
+# signature of the prompt it answered; an answer is served only while the
+# user's current prompt has the same signature and the entry is fresh.
+# The web workers keep an in-memory copy, reloaded by a background thread
+# (start_precomputed_refresher) so lookups never touch the file on the event loop.
+_entries: Dict[str, Dict] = {}
+_loaded_mtime: Optional[float] = None
+_lock = threading.Lock()
+_refresher: Optional[threading.Thread] = None
+_stop = threading.Event()
+_counters = SharedCounters(['hits', 'misses', 'stale', 'changed'])  # summed over prefork workers
+
+
+def coaching_signature(system_prompt: str, prompt: str) -> str:
+    """Hash of the exact prompts an answer was generated for"""
+    return hashlib.sha256(f"{system_prompt}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def read_precomputed(path: str = None) -> Dict:
+    """The stored document ({"version", "budget", "entries"}); empty if missing or unreadable"""
+    path = path or settings.COACHING_PRECOMPUTE_PATH
+    if not path or not os.path.exists(path):
+        return {"version": 1, "budget": {}, "entries": {}}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        data.setdefault("budget", {})
+        data.setdefault("entries", {})
+        return data
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read precomputed coaching from {path}: {e}")
+        return {"version": 1, "budget": {}, "entries": {}}
+
+
+def write_precomputed(data: Dict, path: str = None):
+    """Replace the stored document atomically, so readers never see a half-written file"""
+    path = path or settings.COACHING_PRECOMPUTE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(entry: Dict, now: float = None) -> bool:
+    max_age = settings.COACHING_PRECOMPUTE_MAX_AGE_HOURS * 3600
+    return (now or time.time()) - entry.get('generated_at', 0) <= max_age
+
+
+def _refresh():
+    """Reload the entries when the job has written a new file"""
+    global _entries, _loaded_mtime
+    try:
+        mtime = os.stat(settings.COACHING_PRECOMPUTE_PATH).st_mtime
+    except OSError:
+        mtime = None
+    if mtime == _loaded_mtime:
+        return
+    with _lock:
+        if mtime != _loaded_mtime:
+            _entries = read_precomputed()["entries"] if mtime is not None else {}
+            _loaded_mtime = mtime
+            if mtime is not None:
+                logger.info(f"✅ Loaded {len(_entries)} precomputed coaching answers")
+
+
+def _run_refresher():
+    while True:
+        try:
+            _refresh()
+        except Exception as e:
+            logger.error(f"Error reloading precomputed coaching: {e}")
+        if _stop.wait(settings.COACHING_PRECOMPUTE_REFRESH_SECONDS):
+            return
+
+
+def start_precomputed_refresher():
+    """Load the stored answers and reload them every COACHING_PRECOMPUTE_REFRESH_SECONDS (no-op when disabled)"""
+    global _refresher
+    if not settings.COACHING_PRECOMPUTE_ENABLED or (_refresher is not None and _refresher.is_alive()):
+        return
+    _stop.clear()
+    _refresher = threading.Thread(target=_run_refresher, name="precomputed-coaching", daemon=True)
+    _refresher.start()
+
+
+def stop_precomputed_refresher():
+    global _refresher
+    _stop.set()
+    if _refresher is not None:
+        _refresher.join(timeout=5)
+        _refresher = None
+
+
+def get_precomputed_coaching(user_id: int, signature: str) -> Optional[Dict]:
+    """Stored {"message", "suggested_action"} for this user if it answers the same prompt and is fresh"""
+    if not settings.COACHING_PRECOMPUTE_ENABLED:
+        return None
+    entry = _entries.get(str(user_id))
+    if entry is None:
+        _counters.incr('misses')
+        return None
+    if entry.get('signature') != signature:
+        # The user's features or mood notes changed since the job ran
+        _counters.incr('changed')
+        return None
+    if not is_fresh(entry):
+        _counters.incr('stale')
+        return None
+    _counters.incr('hits')
+    return {"message": entry['message'], "suggested_action": entry['suggested_action']}
+
+
+def precomputed_stats() -> Dict:
+    """Entries loaded in this worker and lookup outcomes across all workers"""
+    now = time.time()
+    generated = [entry.get('generated_at', 0) for entry in _entries.values()]
+    return {
+        'enabled': settings.COACHING_PRECOMPUTE_ENABLED,
+        'path': settings.COACHING_PRECOMPUTE_PATH,
+        'refresher_running': _refresher is not None and _refresher.is_alive(),
+        'entries': len(_entries),
+        'fresh_entries': sum(is_fresh(entry, now) for entry in _entries.values()),
+        'newest_age_s': round(now - max(generated), 1) if generated else None,
+        **_counters.snapshot(),
+    }
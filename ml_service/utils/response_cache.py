@@ -0,0 +1,158 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy
+import random
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Dict, Hashable, List, Optional
+from config.config import settings
+from utils.cache import LRUCache
+from utils.shared_state import SharedCounters
+
+# Bucket edges for the features the coach and mood prompts are built from
+STREAK_EDGES = (1, 2, 3, 5, 7, 14, 30)
+LEVEL_EDGES = (2, 3, 5, 10, 20)
+PENDING_TASK_EDGES = (1, 2, 4, 7, 11)
+SESSIONS_TODAY_EDGES = (1, 2, 3, 5, 8)
+COMPLETION_RATE_STEP = 10  # percent
+
+
+class ResponseCache:
+    """
+    LLM responses shared between prompts with the same bucketed features.
+
+    Each key collects up to `max_variants` distinct responses. Until it has
+    that many, lookups miss so the next LLM response is added ("fill");
+    after that a random variant is served, so users in the same bucket do
+    not all see the same text. A key expires `ttl` seconds after its first
+    response, and then fills again. Entries are per process; the counters
+    are shared, so stats() covers every prefork worker.
+    """
+
+    def __init__(self, capacity: int, ttl: float, max_variants: int, name: str = "llm_responses"):
+        self.ttl = ttl
+        self.max_variants = max(1, max_variants)
+        self._entries = LRUCache(capacity=capacity, ttl=ttl, name=name)  # key -> (created_at, [variants])
+        self._lock = threading.Lock()
+        self.counters = SharedCounters(['hits', 'misses', 'fills', 'stored'])
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """A random cached variant once the key is full, else None"""
+        entry = self._entries.get(key)
+        with self._lock:
+            if entry is None:
+                self.counters.incr('misses')
+                return None
+            variants = entry[1]
+            if len(variants) < self.max_variants:
+                self.counters.incr('fills')
+                return None
+            self.counters.incr('hits')
+            return copy.deepcopy(random.choice(variants))
+
+    def add(self, key: Hashable, value: Any):
+        """Keep a fresh LLM response as one of the key's variants"""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is None:
+                created_at, variants = now, []
+            else:
+                created_at, variants = entry
+            if len(variants) >= self.max_variants or value in variants:
+                return
+            variants = variants + [copy.deepcopy(value)]
+            # Adding a variant must not extend the key's lifetime
+            remaining = self.ttl - (now - created_at) if self.ttl and self.ttl > 0 else None
+            self._entries.set(key, (created_at, variants), ttl=remaining)
+            self.counters.incr('stored')
+
+    def clear(self) -> int:
+        return self._entries.clear()
+
+    def stats(self) -> Dict:
+        entries = self._entries.stats()
+        counters = self.counters.snapshot()
+        lookups = counters['hits'] + counters['misses'] + counters['fills']
+        return {
+            'name': entries['name'],
+            'keys_in_this_worker': entries['size'],
+            'capacity': entries['capacity'],
+            'ttl_seconds': entries['ttl_seconds'],
+            'max_variants': self.max_variants,
+            **counters,
+            'hit_rate': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+            'evictions_in_this_worker': entries['evictions'],
+        }
+
+
+response_cache = ResponseCache(
+    capacity=settings.LLM_RESPONSE_CACHE_SIZE,
+    ttl=settings.LLM_RESPONSE_CACHE_TTL_SECONDS,
+    max_variants=settings.LLM_RESPONSE_CACHE_VARIANTS,
+)
+
+
+def _number(value, default: float = 0.0) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def feature_signature(features: Dict) -> tuple:
+    """Quantized (streak, level, completion rate, pending tasks, mood, sessions today)"""
+    completion_rate = min(max(_number(features.get('completion_rate'), 50.0), 0.0), 100.0)
+    return (
+        bisect_right(STREAK_EDGES, _number(features.get('current_streak'))),
+        bisect_right(LEVEL_EDGES, _number(features.get('level'), 1.0)),
+        int(completion_rate // COMPLETION_RATE_STEP),
+        bisect_right(PENDING_TASK_EDGES, _number(features.get('pending_tasks'))),
+        str(features.get('recent_mood') or 'neutral').lower(),
+        bisect_right(SESSIONS_TODAY_EDGES, _number(features.get('sessions_today'))),
+    )
+
+
+def _range_label(value: float, edges: tuple, minimum: int) -> str:
+    bucket = bisect_right(edges, value)
+    lower = edges[bucket - 1] if bucket > 0 else minimum
+    if bucket == len(edges):
+        return f"{lower}+"
+    upper = edges[bucket] - 1
+    return str(lower) if lower == upper else f"{lower}-{upper}"
+
+
+def bucket_labels(features: Dict) -> Dict[str, str]:
+    """
+    The bucket of each signature feature as text, e.g. {"current_streak": "7-13"}.
+
+    Prompts whose responses are cached are built from these, so a shared
+    response cannot quote one user's exact streak or task count to another.
+    """
+    completion_bucket = feature_signature(features)[2]
+    low = completion_bucket * COMPLETION_RATE_STEP
+    return {
+        'current_streak': _range_label(_number(features.get('current_streak')), STREAK_EDGES, 0),
+        'level': _range_label(_number(features.get('level'), 1.0), LEVEL_EDGES, 1),
+        'completion_rate': "100" if low >= 100 else f"{low}-{low + COMPLETION_RATE_STEP - 1}",
+        'pending_tasks': _range_label(_number(features.get('pending_tasks')), PENDING_TASK_EDGES, 0),
+        'recent_mood': str(features.get('recent_mood') or 'neutral').lower(),
+        'sessions_today': _range_label(_number(features.get('sessions_today')), SESSIONS_TODAY_EDGES, 0),
+    }
+
+
+def coach_cache_key(features: Dict, mood_text: str = "", user_message: Optional[str] = None) -> Optional[tuple]:
+    """Cache key of a coaching prompt, or None if it is disabled or the prompt has free text"""
+    if not settings.LLM_RESPONSE_CACHE_ENABLED or mood_text or user_message:
+        return None
+    return ("coach",) + feature_signature(features)
+
+
+def mood_cache_key(mood: str, note: str, features: Dict, mood_history: List, time_of_day: str) -> Optional[tuple]:
+    """Cache key of a mood suggestions prompt, or None if it is disabled or there is a note"""
+    if not settings.LLM_RESPONSE_CACHE_ENABLED or note:
+        return None
+    return ("mood", str(mood).lower(), time_of_day, tuple(mood_history[-3:])) + feature_signature(features)
@@ -0,0 +1,93 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib
+import json
+import re
+import threading
+from typing import Dict, Optional
+from loguru import logger
+from config.config import settings
+from utils.cache import LRUCache
+
+# Sentiment results keyed by a hash of the normalized text. Results never go
+# stale for a given model, so entries have no TTL; the model id is part of
+# the key so a persisted cache is not reused across backends.
+sentiment_cache = LRUCache(
+    capacity=settings.SENTIMENT_CACHE_SIZE,
+    name="sentiment",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace (the default DistilBERT model is uncased)"""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def sentiment_cache_key(normalized_text: str, model_id: str) -> str:
+    """Content hash of the (normalized, truncated) text for one model"""
+    return hashlib.sha256(f"{model_id}\0{normalized_text}".encode("utf-8")).hexdigest()
+
+
+def get_cached_sentiment(key: str) -> Optional[Dict]:
+    if not settings.SENTIMENT_CACHE_ENABLED:
+        return None
+    _ensure_loaded()
+    result = sentiment_cache.get(key)
+    return dict(result) if result is not None else None
+
+
+def cache_sentiment(key: str, result: Dict):
+    if settings.SENTIMENT_CACHE_ENABLED:
+        sentiment_cache.set(key, dict(result))
+
+
+def _ensure_loaded():
+    """Load the persisted cache once per process"""
+    global _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if not _loaded:
+            load_sentiment_cache()
+            _loaded = True
+
+
+def load_sentiment_cache(path: str = None) -> int:
+    """Load entries saved by save_sentiment_cache(); returns how many were loaded"""
+    path = path or settings.SENTIMENT_CACHE_PATH
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        count = sentiment_cache.load((key, value) for key, value in data.get("entries", []))
+        logger.info(f"✅ Loaded {count} cached sentiment results from {path}")
+        return count
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load sentiment cache from {path}: {e}")
+        return 0
+
+
+def save_sentiment_cache(path: str = None) -> int:
+    """Persist the cache to disk (no-op unless SENTIMENT_CACHE_PATH is set); returns how many were saved"""
+    path = path or settings.SENTIMENT_CACHE_PATH
+    if not path or not settings.SENTIMENT_CACHE_ENABLED:
+        return 0
+    try:
+        entries = sentiment_cache.snapshot()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "entries": entries}, f)
+        os.replace(tmp_path, path)  # atomic, so a crash never leaves a half-written file
+        logger.info(f"💾 Saved {len(entries)} cached sentiment results to {path}")
+        return len(entries)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save sentiment cache to {path}: {e}")
+        return 0
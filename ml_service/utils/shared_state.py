@@ -0,0 +1,118 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ctypes
+import multiprocessing
+import threading
+import time
+import zlib
+from typing import Dict, Hashable, List
+from loguru import logger
+
+# Everything here lives in anonymous shared memory. Objects created at import
+# time are created in the prefork master (app/prefork.py imports the app
+# before forking), so every worker maps the same memory. In a single process
+# they behave like plain counters and stamps.
+
+MAX_PROCESSES = 64  # rows of SharedCounters; more processes than this count locally only
+
+
+def _slot(key: Hashable, size: int) -> int:
+    return zlib.crc32(repr(key).encode("utf-8")) % size
+
+
+class SharedStamps:
+    """
+    Fixed-size table of "last changed at" times (time.time()) keyed by hash.
+
+    Keys that collide share a slot, which can only make a reader treat an
+    entry as changed when it was not. Writes are single aligned doubles, so
+    no lock is needed.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._stamps = multiprocessing.RawArray(ctypes.c_double, self.size)
+        self._all = multiprocessing.RawValue(ctypes.c_double, 0.0)
+
+    def touch(self, key: Hashable):
+        self._stamps[_slot(key, self.size)] = time.time()
+
+    def touch_all(self):
+        self._all.value = time.time()
+
+    def changed_since(self, key: Hashable, since: float) -> bool:
+        """Whether the key (or everything) was touched at or after `since`"""
+        return self._stamps[_slot(key, self.size)] >= since or self._all.value >= since
+
+
+class SharedCounters:
+    """
+    Named counters summed over every process that shares them.
+
+    Each process claims its own row on first use and is the only writer
+    of that row, so no cross-process lock is held while counting (a worker
+    killed mid-update cannot block the others). Rows of exited processes
+    are taken over by new ones, keeping their counts in the totals.
+    """
+
+    _claim_lock = multiprocessing.Lock()  # taken once per process, to claim a row
+
+    def __init__(self, names: List[str]):
+        self.names = list(names)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._values = multiprocessing.RawArray(ctypes.c_longlong, MAX_PROCESSES * len(self.names))
+        self._pids = multiprocessing.RawArray(ctypes.c_long, MAX_PROCESSES)
+        self._local = [0] * len(self.names)  # used if every row is taken
+        self._row = None
+        self._row_pid = None
+        self._lock = threading.Lock()
+
+    def _claim_row(self):
+        pid = os.getpid()
+        # Bounded wait: a process killed while claiming must not block everyone else
+        if self._claim_lock.acquire(timeout=1):
+            try:
+                for row in range(MAX_PROCESSES):
+                    owner = self._pids[row]
+                    if owner == pid or owner == 0 or not _alive(owner):
+                        self._pids[row] = pid
+                        return row
+            finally:
+                self._claim_lock.release()
+        logger.warning(f"⚠️ No shared counter row left for process {pid}; its counts stay local")
+        return -1
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            if self._row_pid != os.getpid():
+                self._row = self._claim_row()
+                self._row_pid = os.getpid()
+                self._local = [0] * len(self.names)
+            index = self._index[name]
+            if self._row < 0:
+                self._local[index] += amount
+            else:
+                self._values[self._row * len(self.names) + index] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        """Totals over all processes"""
+        n = len(self.names)
+        totals = [sum(self._values[row * n + i] for row in range(MAX_PROCESSES)) for i in range(n)]
+        if self._row_pid == os.getpid() and self._row is not None and self._row < 0:
+            totals = [total + local for total, local in zip(totals, self._local)]
+        return dict(zip(self.names, totals))
+
+    def __getitem__(self, name: str) -> int:
+        return self.snapshot()[name]
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True